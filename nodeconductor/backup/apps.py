@@ -2,8 +2,10 @@ from __future__ import unicode_literals
 
 from django.apps import AppConfig
 from django.db.models import signals
+from django_fsm.signals import post_transition
 
 from nodeconductor.backup import handlers
+from nodeconductor.structure import handlers as structure_handlers
 
 
 class BackupConfig(AppConfig):
@@ -12,6 +14,7 @@ class BackupConfig(AppConfig):
 
     # See, https://docs.djangoproject.com/en/1.7/ref/applications/#django.apps.AppConfig.ready
     def ready(self):
+        Backup = self.get_model('Backup')
         BackupSchedule = self.get_model('BackupSchedule')
 
         signals.post_save.connect(
@@ -25,3 +28,30 @@ class BackupConfig(AppConfig):
             sender=BackupSchedule,
             dispatch_uid='nodeconductor.backup.handlers.log_backup_schedule_delete',
         )
+
+        # invalidate ETags of customers of backed up objects, backups are listed along with them
+        for model in (Backup, BackupSchedule):
+            name = model.__name__
+            signals.post_save.connect(
+                structure_handlers.bump_etag_customer_versions,
+                sender=model,
+                dispatch_uid='nodeconductor.backup.handlers.bump_etag_customer_versions_on_%s_save' % name,
+            )
+
+            signals.pre_delete.connect(
+                structure_handlers.collect_etag_customers_before_delete,
+                sender=model,
+                dispatch_uid='nodeconductor.backup.handlers.collect_etag_customers_before_%s_delete' % name,
+            )
+
+            signals.post_delete.connect(
+                structure_handlers.bump_etag_customer_versions,
+                sender=model,
+                dispatch_uid='nodeconductor.backup.handlers.bump_etag_customer_versions_on_%s_delete' % name,
+            )
+
+        post_transition.connect(
+            structure_handlers.bump_etag_customer_versions,
+            sender=Backup,
+            dispatch_uid='nodeconductor.backup.handlers.bump_etag_customer_versions_on_backup_transition',
+        )
@@ -0,0 +1,89 @@
+from __future__ import unicode_literals
+
+import json
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+import nodeconductor
+from nodeconductor.benchmarks import suite
+
+
+class Command(BaseCommand):
+    help = """Seed a data set bound to the dummy OpenStack backend and time the hot paths.
+
+Seeded data is rolled back after the run. Results are printed as JSON and
+can be compared between commits. Use a dedicated database."""
+
+    option_list = BaseCommand.option_list + (
+        make_option('--customers', type='int', default=10,
+                    help='Number of customers to seed, every customer has one dummy cloud.'),
+        make_option('--projects', type='int', default=5,
+                    help='Number of projects per customer.'),
+        make_option('--instances', type='int', default=10,
+                    help='Number of instances per project.'),
+        make_option('--repeat', type='int', default=3,
+                    help='Number of runs of every benchmark.'),
+        make_option('--benchmark', action='append', dest='benchmarks', default=[],
+                    help='Run only the given benchmark, can be used multiple times. '
+                         'Available: %s.' % ', '.join(suite.BENCHMARKS)),
+        make_option('--output', default=None,
+                    help='Write JSON results to the given file instead of standard output.'),
+        make_option('--baseline', default=None,
+                    help='Fail if results regressed compared to JSON results in the given file.'),
+        make_option('--threshold', type='float', default=1.5,
+                    help='Allowed ratio of median time to the baseline one, default is 1.5.'),
+        make_option('--latency', type='float', default=0,
+                    help='Artificial latency of dummy OpenStack calls in seconds.'),
+    )
+
+    def handle(self, *args, **options):
+        unknown_benchmarks = set(options['benchmarks']) - set(suite.BENCHMARKS)
+        if unknown_benchmarks:
+            raise CommandError('Unknown benchmarks: %s' % ', '.join(sorted(unknown_benchmarks)))
+
+        scale = {
+            'customers': options['customers'],
+            'projects': options['projects'],
+            'instances': options['instances'],
+        }
+
+        nodeconductor_settings = dict(getattr(settings, 'NODECONDUCTOR', {}))
+        nodeconductor_settings['OPENSTACK_DUMMY_LATENCY'] = options['latency']
+
+        with override_settings(NODECONDUCTOR=nodeconductor_settings), transaction.atomic():
+            self.stderr.write('Seeding %(customers)s customers, %(projects)s projects per customer '
+                              'and %(instances)s instances per project...' % scale)
+            data = suite.seed(**scale)
+
+            self.stderr.write('Running benchmarks...')
+            results = suite.run_benchmarks(data, options['benchmarks'], options['repeat'])
+
+            transaction.set_rollback(True)
+
+        report = json.dumps({
+            'version': nodeconductor.__version__,
+            'created': timezone.now().isoformat(),
+            'scale': scale,
+            'repeat': options['repeat'],
+            'latency': options['latency'],
+            'results': results,
+        }, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report)
+        else:
+            self.stdout.write(report)
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                baseline_results = json.load(baseline)['results']
+
+            regressions = suite.get_regressions(baseline_results, results, options['threshold'])
+            if regressions:
+                raise CommandError('Performance regressions found:\n%s' % '\n'.join(regressions))
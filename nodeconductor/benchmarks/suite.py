@@ -0,0 +1,320 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+from decimal import Decimal
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from nodeconductor.core.models import SynchronizationStates, User
+from nodeconductor.iaas import models as iaas_models
+from nodeconductor.iaas import serializers as iaas_serializers
+from nodeconductor.iaas import views as iaas_views
+from nodeconductor.iaas.backend import dummy
+from nodeconductor.iaas.tasks import iaas as iaas_tasks
+from nodeconductor.monitoring.zabbix.db_client import ZabbixDBClient
+from nodeconductor.structure.models import Customer, CustomerRole, ProjectRole
+
+# Credentials known to the dummy OpenStack deployment, see nodeconductor.iaas.backend.dummy
+DUMMY_AUTH_URL = 'http://keystone.example.com:5000/v2.0'
+DUMMY_USERNAME = 'test_user'
+DUMMY_PASSWORD = 'test_password'
+DUMMY_TENANT = dummy.DummyDataSet.TENANTS[0]
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """
+    Register function as a benchmark.
+
+    Function receives seeded data and returns a callable to be measured
+    and optionally a callable which prepares every run and is not measured.
+    """
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def seed(customers=10, projects=5, instances=10):
+    """
+    Create deterministic data set bound to the dummy OpenStack backend.
+
+    Every customer has one dummy cloud and given number of projects,
+    every project is connected to the cloud and has given number of instances.
+    """
+    iaas_models.OpenStackSettings.objects.get_or_create(
+        auth_url=DUMMY_AUTH_URL,
+        defaults={
+            'username': DUMMY_USERNAME,
+            'password': DUMMY_PASSWORD,
+            'tenant_name': DUMMY_TENANT['name'],
+        },
+    )
+
+    staff, _ = User.objects.get_or_create(username='benchmark-staff', defaults={'is_staff': True})
+    owner, _ = User.objects.get_or_create(username='benchmark-owner')
+    admin, _ = User.objects.get_or_create(username='benchmark-admin')
+
+    template, _ = iaas_models.Template.objects.get_or_create(
+        name='Benchmark template',
+        defaults={'os': 'CentOS 7', 'is_active': True, 'sla_level': Decimal('99.9')},
+    )
+
+    memberships = []
+    for customer_index in range(customers):
+        customer = Customer.objects.create(
+            name='Benchmark customer %s' % customer_index,
+            abbreviation='BC%s' % customer_index,
+        )
+        if customer_index == 0:
+            customer.add_user(owner, CustomerRole.OWNER)
+
+        cloud = iaas_models.Cloud.objects.create(
+            customer=customer,
+            name='Benchmark cloud %s' % customer_index,
+            auth_url=DUMMY_AUTH_URL,
+            dummy=True,
+            state=SynchronizationStates.IN_SYNC,
+        )
+        cloud.flavors.create(name='m1.tiny', cores=1, ram=512, disk=1024, backend_id='1')
+        cloud.images.create(template=template, backend_id=dummy.DummyDataSet.IMAGES[0]['id'])
+
+        for project_index in range(projects):
+            project = customer.projects.create(name='Benchmark project %s-%s' % (customer_index, project_index))
+            if customer_index == 0 and project_index == 0:
+                project.add_user(admin, ProjectRole.ADMINISTRATOR)
+
+            membership = iaas_models.CloudProjectMembership.objects.create(
+                cloud=cloud,
+                project=project,
+                username=DUMMY_USERNAME,
+                password=DUMMY_PASSWORD,
+                tenant_id=DUMMY_TENANT['id'],
+                state=SynchronizationStates.IN_SYNC,
+            )
+            memberships.append(membership)
+
+            security_group = iaas_models.SecurityGroup.objects.create(
+                name='benchmark-ssh', cloud_project_membership=membership)
+            security_group.rules.create(protocol='tcp', from_port=22, to_port=22, cidr='0.0.0.0/0')
+
+            for instance_index in range(instances):
+                iaas_models.Instance.objects.create(
+                    name='benchmark-%s-%s-%s' % (customer_index, project_index, instance_index),
+                    template=template,
+                    cloud_project_membership=membership,
+                    state=iaas_models.Instance.States.ONLINE,
+                    start_time=timezone.now(),
+                    cores=1,
+                    ram=512,
+                    system_volume_size=1024,
+                    data_volume_size=1024,
+                    agreed_sla=template.sla_level,
+                )
+
+    return {
+        'staff': staff,
+        'owner': owner,
+        'admin': admin,
+        'memberships': memberships,
+    }
+
+
+def _schedule_syncing(memberships):
+    def setup():
+        iaas_models.CloudProjectMembership.objects.filter(
+            pk__in=[membership.pk for membership in memberships],
+        ).update(state=SynchronizationStates.SYNCING_SCHEDULED)
+    return setup
+
+
+@benchmark('pull_cloud_membership')
+def pull_cloud_membership(data):
+    def run():
+        for membership in data['memberships']:
+            iaas_tasks.pull_cloud_membership(membership.pk)
+    return run, _schedule_syncing(data['memberships'])
+
+
+@benchmark('sync_cloud_membership')
+def sync_cloud_membership(data):
+    def run():
+        for membership in data['memberships']:
+            iaas_tasks.sync_cloud_membership(membership.pk)
+    return run, _schedule_syncing(data['memberships'])
+
+
+@benchmark('push_security_groups')
+def push_security_groups(data):
+    def run():
+        for membership in data['memberships']:
+            membership.cloud.get_backend().push_security_groups(membership)
+    return run, None
+
+
+def _api_view_benchmark(view, user, path, **params):
+    factory = APIRequestFactory()
+
+    def run():
+        request = factory.get(path, params)
+        force_authenticate(request, user)
+        response = view(request)
+        response.render()
+        assert response.status_code == 200, 'Unexpected status code %s' % response.status_code
+    return run, None
+
+
+@benchmark('instance_list_api_staff')
+def instance_list_api_staff(data):
+    view = iaas_views.InstanceViewSet.as_view({'get': 'list'})
+    return _api_view_benchmark(view, data['staff'], '/api/instances/', page_size=100)
+
+
+@benchmark('instance_list_api_owner')
+def instance_list_api_owner(data):
+    view = iaas_views.InstanceViewSet.as_view({'get': 'list'})
+    return _api_view_benchmark(view, data['owner'], '/api/instances/', page_size=100)
+
+
+class _ZabbixApiClientStub(object):
+
+    def get_host(self, instance):
+        return {'hostid': instance.pk}
+
+
+class _ZabbixDBClientStub(ZabbixDBClient):
+    """
+    Zabbix DB client answering Zabbix API and database queries from memory with a value per minute,
+    so that usage statistics benchmark measures the NodeConductor side only.
+    """
+
+    def __init__(self):
+        self.zabbix_api_client = _ZabbixApiClientStub()
+
+    def get_item_time_and_value_list(
+            self, host_ids, item_keys, item_table, start_timestamp, end_timestamp, convert_to_mb):
+        return [(clock, len(host_ids)) for clock in range(start_timestamp, end_timestamp, 60)]
+
+
+@benchmark('usage_stats_api')
+def usage_stats_api(data):
+    view = iaas_views.UsageStatsView.as_view()
+    run_view, setup = _api_view_benchmark(view, data['staff'], '/api/stats/usage/', aggregate='customer', item='cpu')
+
+    def run():
+        zabbix_db_client = iaas_serializers.ZabbixDBClient
+        iaas_serializers.ZabbixDBClient = _ZabbixDBClientStub
+        try:
+            run_view()
+        finally:
+            iaas_serializers.ZabbixDBClient = zabbix_db_client
+    return run, setup
+
+
+@benchmark('quota_stats_api')
+def quota_stats_api(data):
+    view = iaas_views.QuotaStatsView.as_view()
+    return _api_view_benchmark(view, data['staff'], '/api/stats/quota/', aggregate='customer')
+
+
+@benchmark('quota_propagation')
+def quota_propagation(data):
+    def run():
+        for membership in data['memberships']:
+            membership.add_quota_usage('vcpu', 1)
+    return run, None
+
+
+def _startup_benchmark(command):
+    """
+    Measure start of a fresh Python process with the current settings,
+    e.g. importing of client libraries by the loaded modules.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+
+    def run():
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(command, env=env, stdout=devnull)
+    return run, None
+
+
+@benchmark('startup_manage_command')
+def startup_manage_command(data):
+    return _startup_benchmark([sys.executable, '-m', 'nodeconductor.server.manage', 'check'])
+
+
+@benchmark('startup_web_worker')
+def startup_web_worker(data):
+    return _startup_benchmark([sys.executable, '-c', (
+        'from nodeconductor.server.wsgi import application; '
+        'from django.core.urlresolvers import get_resolver; '
+        'get_resolver(None).url_patterns'
+    )])
+
+
+def measure(run, setup=None, repeat=3):
+    """
+    Return wall time statistics in seconds and number of SQL queries of the last run.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            run()
+            timings.append(time.time() - start)
+
+    timings.sort()
+    return OrderedDict((
+        ('min', timings[0]),
+        ('median', timings[len(timings) // 2]),
+        ('max', timings[-1]),
+        ('queries', len(queries)),
+    ))
+
+
+def run_benchmarks(data, names=None, repeat=3):
+    """
+    Run registered benchmarks against seeded data, return results keyed by benchmark name.
+    """
+    results = OrderedDict()
+
+    for name, func in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+
+        run, setup = func(data)
+        results[name] = measure(run, setup, repeat)
+
+    return results
+
+
+def get_regressions(baseline_results, results, threshold=1.5):
+    """
+    Return descriptions of benchmarks that run more queries than in baseline
+    or whose median time exceeds the baseline one more than threshold times.
+    """
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline_results:
+            continue
+
+        baseline = baseline_results[name]
+        if result['queries'] > baseline['queries']:
+            regressions.append('%s: %s queries, was %s' % (name, result['queries'], baseline['queries']))
+        if result['median'] > baseline['median'] * threshold:
+            regressions.append('%s: median time %.3fs, was %.3fs' % (name, result['median'], baseline['median']))
+
+    return regressions
@@ -0,0 +1,46 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+
+from nodeconductor.benchmarks import suite
+from nodeconductor.iaas.backend import dummy
+
+
+class BenchmarkSuiteTest(TestCase):
+
+    def setUp(self):
+        # Benchmarks add resources to the dummy OpenStack, which is shared by all tests
+        self.addCleanup(dummy.OPENSTACK.clear)
+
+    def test_all_benchmarks_run_against_seeded_data(self):
+        data = suite.seed(customers=1, projects=1, instances=2)
+
+        results = suite.run_benchmarks(data, repeat=1)
+
+        self.assertEqual(list(results), list(suite.BENCHMARKS))
+        for name, result in results.items():
+            if not name.startswith('startup_'):
+                self.assertGreater(result['queries'], 0, '%s runs no queries' % name)
+            self.assertLessEqual(result['min'], result['max'])
+
+    def test_only_given_benchmarks_are_run(self):
+        data = suite.seed(customers=1, projects=1, instances=2)
+
+        results = suite.run_benchmarks(
+            data, names=['instance_list_api_staff', 'quota_propagation'], repeat=1)
+
+        self.assertEqual(list(results), ['instance_list_api_staff', 'quota_propagation'])
+
+    def test_startup_benchmark_runs_fresh_process(self):
+        results = suite.run_benchmarks({}, names=['startup_web_worker'], repeat=1)
+
+        self.assertEqual(results['startup_web_worker']['queries'], 0)
+        self.assertGreater(results['startup_web_worker']['min'], 0)
+
+    def test_regressions_are_reported_for_additional_queries_and_slower_runs(self):
+        baseline = {'a': {'median': 1.0, 'queries': 10}, 'b': {'median': 1.0, 'queries': 10}}
+        results = {'a': {'median': 1.1, 'queries': 11}, 'b': {'median': 2.0, 'queries': 10}}
+
+        regressions = suite.get_regressions(baseline, results, threshold=1.5)
+
+        self.assertEqual(sorted(regression.split(':')[0] for regression in regressions), ['a', 'b'])
@@ -0,0 +1,57 @@
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nodeconductor.server.celery import app, get_queue_shards_settings, get_shard_queue
+
+
+def get_queue_backlog(connection, queue):
+    """
+    Return number of messages waiting in the queue and number of its consumers.
+    Queue which does not exist yet has no backlog.
+    """
+    channel = connection.channel()
+    try:
+        _, messages_count, consumers_count = channel.queue_declare(queue, passive=True)
+    except connection.channel_errors:
+        return 0, 0
+    finally:
+        channel.close()
+
+    return messages_count, consumers_count
+
+
+class Command(BaseCommand):
+    help = """Show number of messages waiting in every shard of Celery queues
+and worker pools which consume the shards.
+
+Shards are configured in NODECONDUCTOR['CLOUD_QUEUE_SHARDS'] setting."""
+
+    def handle(self, *args, **options):
+        shards_count, pools = get_queue_shards_settings()
+        if shards_count < 2:
+            raise CommandError("Queue sharding is disabled, set NODECONDUCTOR['CLOUD_QUEUE_SHARDS']['COUNT'] "
+                               "to number of shards.")
+
+        shard_pools = defaultdict(list)
+        for pool, shards in sorted(pools.items()):
+            for shard in shards:
+                shard_pools[shard].append(pool)
+
+        row_format = '{:<20} {:>5}  {:<30} {:>8} {:>9}'
+        self.stdout.write(row_format.format('Queue', 'Shard', 'Pools', 'Messages', 'Consumers'))
+
+        with app.connection() as connection:
+            for queue in (settings.CELERY_DEFAULT_QUEUE, 'heavy'):
+                for shard in range(shards_count):
+                    shard_queue = get_shard_queue(queue, shard)
+                    messages_count, consumers_count = get_queue_backlog(connection, shard_queue)
+                    self.stdout.write(row_format.format(
+                        shard_queue, shard, ', '.join(shard_pools[shard]) or '-', messages_count, consumers_count))
+
+        unassigned_shards = set(range(shards_count)) - set(shard_pools)
+        if unassigned_shards:
+            self.stderr.write('Shards not consumed by any pool: %s' % ', '.join(map(str, sorted(unassigned_shards))))
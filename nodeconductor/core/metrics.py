@@ -0,0 +1,170 @@
+from __future__ import unicode_literals
+
+import logging
+
+from celery import current_app
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+TASK_NAMES_KEY = 'nc:metrics:tasks'
+TASK_METRICS_KEY = 'nc:metrics:task:%s'
+RATE_LIMIT_METRICS_KEY = 'nc:metrics:rate_limits'
+
+# Upper bounds of histogram buckets in seconds
+BUCKETS = (0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 600, 1800, 3600, float('inf'))
+
+HISTOGRAMS = (
+    ('wait', 'nodeconductor_task_queue_wait_seconds',
+     'Time from publishing (or ETA) of a task till start of its execution.'),
+    ('run', 'nodeconductor_task_run_seconds',
+     'Execution time of a task.'),
+)
+
+
+def get_redis():
+    """
+    Return Redis client of Celery result backend or None if result backend is not Redis.
+    """
+    return getattr(current_app.backend, 'client', None)
+
+
+def _get_bucket(value):
+    for index, bound in enumerate(BUCKETS):
+        if value <= bound:
+            return index
+
+
+def record_task(task_name, wait_time=None, run_time=None, state=None):
+    """
+    Add queue wait time, run time and final state of task execution to metrics of the task.
+    States are the ones reported by Celery: SUCCESS, FAILURE, RETRY and so on.
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+
+    key = TASK_METRICS_KEY % task_name
+
+    try:
+        pipe = redis.pipeline()
+        pipe.sadd(TASK_NAMES_KEY, task_name)
+
+        for histogram, value in (('wait', wait_time), ('run', run_time)):
+            if value is None:
+                continue
+            pipe.hincrby(key, '%s:%s' % (histogram, _get_bucket(value)), 1)
+            pipe.hincrbyfloat(key, '%s:sum' % histogram, value)
+
+        if state is not None:
+            pipe.hincrby(key, 'state:%s' % state, 1)
+
+        pipe.execute()
+    except RedisError:
+        logger.warning('Failed to record metrics of task %s', task_name, exc_info=True)
+
+
+def get_task_metrics():
+    """
+    Return dictionary of raw metrics keyed by task name.
+    """
+    redis = get_redis()
+    if redis is None:
+        return {}
+
+    task_names = sorted(redis.smembers(TASK_NAMES_KEY))
+    pipe = redis.pipeline()
+    for task_name in task_names:
+        pipe.hgetall(TASK_METRICS_KEY % task_name)
+
+    return dict(zip(task_names, pipe.execute()))
+
+
+def record_rate_limit(bucket_name, wait_time):
+    """
+    Add time spent waiting for a token of rate limiting bucket to metrics of the bucket.
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+
+    try:
+        pipe = redis.pipeline()
+        pipe.hincrby(RATE_LIMIT_METRICS_KEY, '%s:count' % bucket_name, 1)
+        if wait_time > 0:
+            pipe.hincrby(RATE_LIMIT_METRICS_KEY, '%s:throttled' % bucket_name, 1)
+            pipe.hincrbyfloat(RATE_LIMIT_METRICS_KEY, '%s:sum' % bucket_name, wait_time)
+        pipe.execute()
+    except RedisError:
+        logger.warning('Failed to record metrics of rate limit %s', bucket_name, exc_info=True)
+
+
+def get_rate_limit_metrics():
+    """
+    Return dictionary of raw metrics keyed by rate limiting bucket name.
+    """
+    redis = get_redis()
+    if redis is None:
+        return {}
+
+    rate_limit_metrics = {}
+    for field, value in redis.hgetall(RATE_LIMIT_METRICS_KEY).items():
+        bucket_name, metric = field.rsplit(':', 1)
+        rate_limit_metrics.setdefault(bucket_name, {})[metric] = value
+
+    return rate_limit_metrics
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def render_prometheus(task_metrics, rate_limit_metrics=None):
+    """
+    Render task and rate limit metrics in Prometheus text exposition format.
+    """
+    lines = []
+
+    for histogram, metric_name, description in HISTOGRAMS:
+        lines.append('# HELP %s %s' % (metric_name, description))
+        lines.append('# TYPE %s histogram' % metric_name)
+
+        for task_name in sorted(task_metrics):
+            metrics = task_metrics[task_name]
+            count = 0
+
+            for index, bound in enumerate(BUCKETS):
+                count += int(metrics.get('%s:%s' % (histogram, index), 0))
+                lines.append('%s_bucket{task="%s",le="%s"} %s' % (
+                    metric_name, task_name, _format_bound(bound), count))
+
+            lines.append('%s_sum{task="%s"} %s' % (
+                metric_name, task_name, float(metrics.get('%s:sum' % histogram, 0))))
+            lines.append('%s_count{task="%s"} %s' % (metric_name, task_name, count))
+
+    metric_name = 'nodeconductor_task_executions_total'
+    lines.append('# HELP %s Number of task executions by final state, retries included.' % metric_name)
+    lines.append('# TYPE %s counter' % metric_name)
+
+    for task_name in sorted(task_metrics):
+        for field, value in sorted(task_metrics[task_name].items()):
+            if field.startswith('state:'):
+                lines.append('%s{task="%s",state="%s"} %s' % (
+                    metric_name, task_name, field[len('state:'):], int(value)))
+
+    rate_limit_metrics = rate_limit_metrics or {}
+    for metric, convert, metric_name, description in (
+            ('sum', float, 'nodeconductor_rate_limit_wait_seconds_total',
+             'Time spent waiting for a token of rate limiting bucket.'),
+            ('count', int, 'nodeconductor_rate_limit_calls_total',
+             'Number of calls limited by the bucket.'),
+            ('throttled', int, 'nodeconductor_rate_limit_throttled_calls_total',
+             'Number of calls which had to wait for a token.')):
+        lines.append('# HELP %s %s' % (metric_name, description))
+        lines.append('# TYPE %s counter' % metric_name)
+
+        for bucket_name in sorted(rate_limit_metrics):
+            lines.append('%s{bucket="%s"} %s' % (
+                metric_name, bucket_name, convert(rate_limit_metrics[bucket_name].get(metric, 0))))
+
+    return '\n'.join(lines) + '\n'
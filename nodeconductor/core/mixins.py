@@ -1,6 +1,13 @@
 from __future__ import unicode_literals
 
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils import six
 from rest_framework import mixins
+from rest_framework.decorators import list_route
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
 
 from nodeconductor.core.models import SynchronizableMixin, SynchronizationStates
 from nodeconductor.core.exceptions import IncorrectStateException
@@ -33,3 +40,106 @@ class UpdateOnlyStableMixin(object):
                         'Modification allowed in stable states only.')
 
         return super(UpdateOnlyStableMixin, self).initial(request, *args, **kwargs)
+
+
+class EagerLoadMixin(object):
+    """
+    Reduce number of queries to database by eager loading related objects
+    required by serializer, see AugmentedSerializerMixin.eager_load.
+    """
+
+    def get_queryset(self):
+        queryset = super(EagerLoadMixin, self).get_queryset()
+
+        if self.request.method in ('GET', 'HEAD'):
+            serializer = self.get_serializer()
+            if hasattr(serializer, 'eager_load'):
+                queryset = serializer.eager_load(queryset)
+
+        return queryset
+
+
+class _Echo(object):
+    """
+    File-like object returning written value, used to get rows formatted by csv.writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+class ExportMixin(object):
+    """
+    Add "export" list route streaming all objects matching list filters as NDJSON or CSV.
+
+    Format is chosen by "export_format" query parameter, NDJSON is used by default.
+    Objects are serialized in chunks ordered by primary key, so that memory consumption
+    doesn't depend on number of exported objects and each chunk is loaded with one query
+    (plus eager loading queries). Nested values of CSV columns are JSON-encoded.
+    """
+    export_chunk_size = 500
+
+    EXPORT_CONTENT_TYPES = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv; charset=utf-8',
+    }
+
+    @list_route()
+    def export(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in self.EXPORT_CONTENT_TYPES:
+            raise ValidationError({'export_format': 'Must be one of: %s.' % ', '.join(
+                sorted(self.EXPORT_CONTENT_TYPES))})
+
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if export_format == 'csv':
+            content = self._export_csv(queryset)
+        else:
+            content = self._export_ndjson(queryset)
+
+        response = StreamingHttpResponse(content, content_type=self.EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (
+            queryset.model._meta.model_name, export_format)
+        return response
+
+    def iterate_export_chunks(self, queryset):
+        """
+        Yield serialized objects of queryset chunk by chunk using primary key as a cursor.
+        """
+        queryset = queryset.order_by('pk')
+        last_pk = None
+
+        while True:
+            chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk = list(chunk[:self.export_chunk_size])
+            if not chunk:
+                return
+
+            for item in self.get_serializer(chunk, many=True).data:
+                yield item
+
+            last_pk = chunk[-1].pk
+
+    def _export_ndjson(self, queryset):
+        encoder = JSONEncoder(ensure_ascii=False)
+        for item in self.iterate_export_chunks(queryset):
+            yield encoder.encode(item).encode('utf-8') + b'\n'
+
+    def _export_csv(self, queryset):
+        encoder = JSONEncoder(ensure_ascii=False)
+        writer = csv.writer(_Echo())
+
+        def encode(value):
+            if isinstance(value, (dict, list)):
+                value = encoder.encode(value)
+            elif value is None:
+                value = ''
+            value = six.text_type(value)
+            return value.encode('utf-8') if six.PY2 else value
+
+        fields = [name for name, field in self.get_serializer().fields.items() if not field.write_only]
+        yield writer.writerow([encode(name) for name in fields])
+
+        for item in self.iterate_export_chunks(queryset):
+            yield writer.writerow([encode(item.get(name)) for name in fields])
@@ -1,11 +1,20 @@
 from __future__ import unicode_literals
 from collections import OrderedDict
+import re
 
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils import six
 from rest_framework import pagination
 from rest_framework.response import Response
 from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
+def _get_link_header(link_candidates):
+    links = ((rel, get_link()) for rel, get_link in link_candidates.items())
+    return ', '.join('<%s>; rel="%s"' % (link, rel) for rel, link in links if link)
+
+
 class LinkHeaderPagination(pagination.PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -18,15 +27,9 @@ class LinkHeaderPagination(pagination.PageNumberPagination):
             ('last', self.get_last_link),
         ))
 
-        link = ', '.join(
-            '<%s>; rel="%s"' % (get_link(), rel)
-            for rel, get_link in link_candidates.items()
-            if get_link()
-        )
-
         headers = {
             'X-Result-Count': self.page.paginator.count,
-            'Link': link,
+            'Link': _get_link_header(link_candidates),
         }
 
         return Response(data, headers=headers)
@@ -51,3 +54,114 @@ class UnlimitedLinkHeaderPagination(LinkHeaderPagination):
     Should be used only as a temporary workaround!
     """
     page_size = None
+
+
+class KeysetLinkHeaderPagination(pagination.CursorPagination):
+    """
+    A paginator that seeks to the page by ordering key instead of counting and skipping rows.
+
+    It is opt-in: page number pagination of LinkHeaderPagination is used unless "cursor"
+    query parameter is given, an empty "?cursor=" requests the first page. It is used
+    as a fallback as well if the queryset is explicitly ordered, e.g. by "o" query parameter.
+
+    Page links are returned in Link header as LinkHeaderPagination does,
+    but they contain an opaque cursor instead of page number, so there is no "last" link.
+    X-Result-Count header is returned only if it is requested with "?count=estimate",
+    the value is an estimation of the number of results.
+
+    Non-queryset results have to implement filter(), order_by(), slicing
+    and have an "ordered" attribute.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    ordering = ('-created', '-pk')
+    fallback_class = LinkHeaderPagination
+    fallback = None
+
+    def is_keyset_applicable(self, queryset, request):
+        if self.cursor_query_param not in request.query_params:
+            return False
+
+        if isinstance(queryset, QuerySet):
+            return not (queryset.query.order_by or queryset.query.extra_order_by)
+
+        return not queryset.ordered
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_keyset_applicable(queryset, request):
+            self.fallback = self.fallback_class()
+            page = self.fallback.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.fallback.display_page_controls
+            return page
+
+        self.request = request
+        self.queryset = queryset
+        self.page_size = self.get_page_size(request)
+        return super(KeysetLinkHeaderPagination, self).paginate_queryset(queryset, request, view)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+
+        link_candidates = OrderedDict((
+            ('first', self.get_first_link),
+            ('prev', self.get_previous_link),
+            ('next', self.get_next_link),
+        ))
+
+        headers = {
+            'Link': _get_link_header(link_candidates),
+        }
+
+        if self.request.query_params.get(self.count_query_param) == 'estimate':
+            headers['X-Result-Count'] = self.estimate_count(self.queryset)
+
+        return Response(data, headers=headers)
+
+    def get_first_link(self):
+        return replace_query_param(self.base_url, self.cursor_query_param, '')
+
+    def estimate_count(self, queryset):
+        """
+        Return number of rows estimated by PostgreSQL planner or exact count for other databases.
+        """
+        if not isinstance(queryset, QuerySet):
+            return len(queryset)
+
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return queryset.count()
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql, params)
+            plan = cursor.fetchone()[0]
+
+        match = re.search(r'rows=(\d+)', plan)
+        return int(match.group(1)) if match else queryset.count()
+
+    def get_html_context(self):
+        if self.fallback is not None:
+            return self.fallback.get_html_context()
+        return super(KeysetLinkHeaderPagination, self).get_html_context()
+
+    def to_html(self):
+        if self.fallback is not None:
+            return self.fallback.to_html()
+        return super(KeysetLinkHeaderPagination, self).to_html()
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return six.text_type(instance[ordering[0].lstrip('-')])
+        return super(KeysetLinkHeaderPagination, self)._get_position_from_instance(instance, ordering)
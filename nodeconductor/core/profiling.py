@@ -0,0 +1,149 @@
+from __future__ import unicode_literals
+
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_locals = threading.local()
+
+DEFAULT_SETTINGS = {
+    # Fraction of requests and tasks to profile, from 0 (disabled) to 1 (every one)
+    'SAMPLE_RATE': 0,
+    # Number of the slowest queries to log for every profiled request or task
+    'SLOW_QUERIES_LOG_SIZE': 0,
+}
+
+
+def get_profiling_settings():
+    profiling_settings = DEFAULT_SETTINGS.copy()
+    profiling_settings.update(getattr(settings, 'NODECONDUCTOR', {}).get('PROFILING', {}))
+    return profiling_settings
+
+
+class Profile(object):
+    """
+    Number and time of database queries and backend calls made within a request or task.
+    """
+
+    def __init__(self):
+        self.counters = OrderedDict((('db', [0, 0.0]),))
+        self.queries = []
+        self._connection_states = []
+
+        for connection in connections.all():
+            self._connection_states.append((connection, connection.use_debug_cursor, len(connection.queries)))
+            connection.use_debug_cursor = True
+
+    def record(self, name, duration):
+        counter = self.counters.setdefault(name, [0, 0.0])
+        counter[0] += 1
+        counter[1] += duration
+
+    def finish(self):
+        for connection, use_debug_cursor, queries_count in self._connection_states:
+            queries = connection.queries[queries_count:]
+            # forget queries which would not be recorded without profiling
+            if not use_debug_cursor and not settings.DEBUG:
+                del connection.queries[queries_count:]
+            connection.use_debug_cursor = use_debug_cursor
+
+            for query in queries:
+                duration = float(query['time'])
+                self.record('db', duration)
+                self.queries.append((duration, query['sql']))
+
+    def get_slowest_queries(self, count):
+        return sorted(self.queries, key=lambda query: query[0], reverse=True)[:count]
+
+    def get_server_timing(self):
+        """
+        Return value of Server-Timing header, durations are in milliseconds.
+        """
+        return ', '.join(
+            '%s;dur=%.1f;desc="%s calls"' % (name, duration * 1000, count)
+            for name, (count, duration) in self.counters.items()
+        )
+
+
+def get_current_profile():
+    return getattr(_locals, 'profile', None)
+
+
+def start_profiling(sample_rate=None):
+    """
+    Start profiling of the current thread, return profile or None if it was not sampled
+    or the thread is already profiled, e.g. task is executed eagerly within request.
+    """
+    if get_current_profile() is not None:
+        return None
+
+    if sample_rate is None:
+        sample_rate = get_profiling_settings()['SAMPLE_RATE']
+
+    if not sample_rate or random.random() >= sample_rate:
+        return None
+
+    _locals.profile = Profile()
+    return _locals.profile
+
+
+def stop_profiling(profile):
+    """
+    Finish profile started by start_profiling(), log the slowest queries if configured.
+    """
+    if profile is None or profile is not get_current_profile():
+        return None
+
+    del _locals.profile
+    profile.finish()
+
+    slow_queries_log_size = get_profiling_settings()['SLOW_QUERIES_LOG_SIZE']
+    for duration, sql in profile.get_slowest_queries(slow_queries_log_size):
+        logger.info('Slow query (%.1f ms): %s', duration * 1000, sql)
+
+    return profile
+
+
+def profile_requests(http_client, name, method_name='request'):
+    """
+    Record time of requests sent by HTTP client of a backend client under given name in profile of the current thread.
+    The HTTP client is instrumented in place, so that backend client keeps its type and requests made by resources
+    returned by its managers are recorded too.
+    """
+    request = getattr(http_client, method_name)
+
+    def wrapper(*args, **kwargs):
+        profile = get_current_profile()
+        if profile is None:
+            return request(*args, **kwargs)
+
+        start = time.time()
+        try:
+            return request(*args, **kwargs)
+        finally:
+            profile.record(name, time.time() - start)
+
+    setattr(http_client, method_name, wrapper)
+
+
+# noinspection PyMethodMayBeStatic
+class ProfilingMiddleware(object):
+    """
+    Profile sampled requests and expose totals in Server-Timing header.
+    """
+
+    def process_request(self, request):
+        request._profile = start_profiling()
+
+    def process_response(self, request, response):
+        profile = stop_profiling(getattr(request, '_profile', None))
+        if profile is not None:
+            response['Server-Timing'] = profile.get_server_timing()
+        return response
@@ -0,0 +1,95 @@
+from __future__ import unicode_literals
+
+import logging
+import time
+
+from redis.exceptions import RedisError
+
+from nodeconductor.core import metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = 'nc:ratelimit:%s'
+
+# Takes a token from the bucket refilled with `rate` tokens per second up to `burst` tokens.
+# The token is reserved even if the bucket is empty, the caller has to wait until it is refilled,
+# so waiting callers are served in order without polling. Returns the wait time in seconds.
+# Lua numbers are converted to integers in replies, hence the wait time is returned as a string.
+ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'timestamp')
+local tokens = tonumber(bucket[1]) or burst
+local timestamp = tonumber(bucket[2]) or now
+
+if now > timestamp then
+    tokens = math.min(burst, tokens + (now - timestamp) * rate)
+    timestamp = now
+end
+tokens = tokens - 1
+
+redis.call('HMSET', KEYS[1], 'tokens', tokens, 'timestamp', timestamp)
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+
+class TokenBucket(object):
+    """
+    Token bucket shared by all processes through Redis of Celery result backend.
+    Calls are not limited if result backend is not Redis.
+    """
+
+    def __init__(self, name, rate, burst=1):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1)
+
+    def acquire(self):
+        """
+        Take a token, wait until it is available and return the wait time in seconds.
+        """
+        redis = metrics.get_redis()
+        if redis is None:
+            return 0
+
+        try:
+            wait_time = float(redis.eval(ACQUIRE_SCRIPT, 1, BUCKET_KEY % self.name, self.rate, self.burst, time.time()))
+        except RedisError:
+            logger.warning('Failed to take a token from bucket %s, call is not limited', self.name, exc_info=True)
+            return 0
+
+        if wait_time > 0:
+            logger.debug('Waiting %.3f seconds for a token from bucket %s', wait_time, self.name)
+            time.sleep(wait_time)
+
+        metrics.record_rate_limit(self.name, wait_time)
+        profile = profiling.get_current_profile()
+        if profile is not None:
+            profile.record('ratelimit', wait_time)
+
+        return wait_time
+
+
+def rate_limit_requests(http_client, bucket, method_name='request'):
+    """
+    Take a token from the bucket before every request sent by HTTP client of a backend client.
+    Requests of resources returned by client managers, e.g. server.delete(), are limited as well,
+    as they are sent by the same HTTP client. Requests are not limited if bucket is None.
+    """
+    if bucket is None:
+        return
+
+    request = getattr(http_client, method_name)
+
+    def wrapper(*args, **kwargs):
+        bucket.acquire()
+        return request(*args, **kwargs)
+
+    setattr(http_client, method_name, wrapper)
@@ -1,8 +1,10 @@
 import base64
 
+from django.contrib.contenttypes import fields as ct_fields
 from django.core import validators
 from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.core.urlresolvers import reverse, resolve, Resolver404
+from django.db import models
 from rest_framework import serializers
 from rest_framework.fields import Field, ReadOnlyField
 
@@ -214,6 +216,20 @@ class AugmentedSerializerMixin(object):
                         'customer': ('uuid', 'name', 'native_name')
                     }
 
+    3.  Eager loading of related objects required for serialization.
+
+        Relations are derived from the declared fields' sources, including
+        the fields of nested serializers. Forward foreign keys reachable without
+        crossing a to-many relation go to select_related(), the rest goes
+        to prefetch_related().
+
+        Example:
+            class InstanceViewSet(core_mixins.EagerLoadMixin, viewsets.ModelViewSet):
+                ...
+
+            # or explicitly
+            queryset = serializer.eager_load(models.Instance.objects.all())
+
     """
 
     def get_fields(self):
@@ -247,6 +263,23 @@ class AugmentedSerializerMixin(object):
 
         return related_paths
 
+    def get_eager_loading_paths(self):
+        """
+        Return tuple of select_related and prefetch_related lookups required for serialization.
+        """
+        select_related_paths, prefetch_related_paths = set(), set()
+        _collect_related_paths(
+            self, self.Meta.model, [], False, select_related_paths, prefetch_related_paths)
+        return sorted(select_related_paths), sorted(prefetch_related_paths)
+
+    def eager_load(self, queryset):
+        select_related_paths, prefetch_related_paths = self.get_eager_loading_paths()
+        if select_related_paths:
+            queryset = queryset.select_related(*select_related_paths)
+        if prefetch_related_paths:
+            queryset = queryset.prefetch_related(*prefetch_related_paths)
+        return queryset
+
     def build_unknown_field(self, field_name, model_class):
         related_paths = self._get_related_paths()
 
@@ -262,6 +295,71 @@ class AugmentedSerializerMixin(object):
             return super(AugmentedSerializerMixin, self).build_unknown_field(field_name, model_class)
 
 
+def _get_relation(model, attribute):
+    """
+    Return tuple of related model and whether relation is to-many for model attribute.
+
+    Related model is None for generic foreign keys. None is returned if attribute is not a relation.
+    """
+    descriptor = getattr(model, attribute, None)
+
+    if isinstance(descriptor, ct_fields.GenericForeignKey):
+        return None, False
+
+    # Forward foreign keys, many-to-many fields and generic relations
+    field = getattr(descriptor, 'field', None)
+    if field is not None and getattr(field, 'rel', None) is not None:
+        return field.rel.to, not isinstance(field, models.ForeignKey)
+
+    # Reverse foreign keys, one-to-one and many-to-many fields
+    related = getattr(descriptor, 'related', None)
+    if related is not None and hasattr(related, 'field'):
+        return related.model, not isinstance(related.field, models.OneToOneField)
+
+    return None
+
+
+def _collect_related_paths(serializer, model, prefix, is_prefetched, select_related_paths, prefetch_related_paths):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        nested_serializer = getattr(field, 'child', field)
+        if not isinstance(nested_serializer, serializers.BaseSerializer):
+            nested_serializer = None
+
+        if field.source == '*':
+            if nested_serializer is not None:
+                _collect_related_paths(nested_serializer, model, prefix, is_prefetched,
+                                       select_related_paths, prefetch_related_paths)
+            continue
+
+        path = list(prefix)
+        field_model = model
+        field_is_prefetched = is_prefetched
+
+        for attribute in field.source.split('.'):
+            relation = _get_relation(field_model, attribute)
+            if relation is None:
+                break
+
+            field_model, is_many = relation
+            path.append(attribute)
+            field_is_prefetched = field_is_prefetched or is_many or field_model is None
+
+            if field_is_prefetched:
+                prefetch_related_paths.add('__'.join(path))
+            else:
+                select_related_paths.add('__'.join(path))
+
+            if field_model is None:
+                break
+        else:
+            if nested_serializer is not None and path:
+                _collect_related_paths(nested_serializer, field_model, path, field_is_prefetched,
+                                       select_related_paths, prefetch_related_paths)
+
+
 class HyperlinkedRelatedModelSerializer(serializers.HyperlinkedModelSerializer):
     def __init__(self, **kwargs):
         self.queryset = kwargs.pop('queryset', None)
@@ -0,0 +1,54 @@
+from __future__ import unicode_literals
+
+from django.test import SimpleTestCase
+from rest_framework import status
+from rest_framework import test
+
+from nodeconductor.core import metrics
+from nodeconductor.structure.tests.factories import UserFactory
+
+
+class RenderPrometheusTest(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        task_metrics = {
+            'demo': {'run:0': '2', 'run:3': '1', 'run:sum': '1.05', 'state:SUCCESS': '2', 'state:RETRY': '1'},
+        }
+
+        lines = metrics.render_prometheus(task_metrics).splitlines()
+
+        self.assertIn('nodeconductor_task_run_seconds_bucket{task="demo",le="0.05"} 2', lines)
+        self.assertIn('nodeconductor_task_run_seconds_bucket{task="demo",le="0.5"} 2', lines)
+        self.assertIn('nodeconductor_task_run_seconds_bucket{task="demo",le="1.0"} 3', lines)
+        self.assertIn('nodeconductor_task_run_seconds_bucket{task="demo",le="+Inf"} 3', lines)
+        self.assertIn('nodeconductor_task_run_seconds_count{task="demo"} 3', lines)
+        self.assertIn('nodeconductor_task_queue_wait_seconds_count{task="demo"} 0', lines)
+        self.assertIn('nodeconductor_task_executions_total{task="demo",state="RETRY"} 1', lines)
+
+    def test_rate_limit_waits_are_rendered_per_bucket(self):
+        rate_limit_metrics = {'compute:http://keystone.example.com': {'count': '10', 'throttled': '2', 'sum': '0.5'}}
+
+        lines = metrics.render_prometheus({}, rate_limit_metrics).splitlines()
+
+        self.assertIn('nodeconductor_rate_limit_wait_seconds_total{bucket="compute:http://keystone.example.com"} 0.5',
+                      lines)
+        self.assertIn('nodeconductor_rate_limit_calls_total{bucket="compute:http://keystone.example.com"} 10', lines)
+        self.assertIn('nodeconductor_rate_limit_throttled_calls_total{bucket="compute:http://keystone.example.com"} 2',
+                      lines)
+
+
+class MetricsApiPermissionTest(test.APISimpleTestCase):
+    def setUp(self):
+        self.metrics_url = 'http://testserver/api/metrics/'
+
+    def test_staff_can_access_metrics(self):
+        self.client.force_authenticate(user=UserFactory(is_staff=True))
+
+        response = self.client.get(self.metrics_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_user_cannot_access_metrics(self):
+        self.client.force_authenticate(user=UserFactory())
+
+        response = self.client.get(self.metrics_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
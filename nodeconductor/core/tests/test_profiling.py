@@ -0,0 +1,64 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework import test
+
+from nodeconductor.core import profiling
+from nodeconductor.structure.tests import factories
+
+
+class ProfilingMiddlewareTest(test.APITransactionTestCase):
+    def setUp(self):
+        self.client.force_authenticate(factories.UserFactory(is_staff=True))
+        factories.ProjectFactory()
+
+    def get_projects(self):
+        return self.client.get(factories.ProjectFactory.get_list_url())
+
+    @override_settings(NODECONDUCTOR={'PROFILING': {'SAMPLE_RATE': 1}})
+    def test_sampled_request_has_server_timing_header(self):
+        response = self.get_projects()
+
+        self.assertRegexpMatches(response['Server-Timing'], r'^db;dur=[\d.]+;desc="[1-9]\d* calls"')
+
+    @override_settings(NODECONDUCTOR={'PROFILING': {'SAMPLE_RATE': 0}})
+    def test_request_is_not_profiled_if_profiling_is_disabled(self):
+        response = self.get_projects()
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class ProfileRequestsTest(TestCase):
+    class HttpClient(object):
+        def request(self, url, method):
+            return method, url
+
+    class Server(object):
+        def __init__(self, http_client):
+            self.http_client = http_client
+
+        def delete(self):
+            return self.http_client.request('/servers/1', 'DELETE')
+
+    def test_requests_of_resources_returned_by_managers_are_recorded(self):
+        http_client = self.HttpClient()
+        profiling.profile_requests(http_client, 'openstack')
+        server = self.Server(http_client)
+
+        profile = profiling.start_profiling(sample_rate=1)
+        try:
+            self.assertEqual(http_client.request('/servers/1', 'GET'), ('GET', '/servers/1'))
+            self.assertEqual(server.delete(), ('DELETE', '/servers/1'))
+        finally:
+            profiling.stop_profiling(profile)
+
+        self.assertEqual(profile.counters['openstack'][0], 2)
+        self.assertIsInstance(http_client, self.HttpClient)
+
+    def test_requests_are_not_recorded_if_thread_is_not_profiled(self):
+        http_client = self.HttpClient()
+        profiling.profile_requests(http_client, 'openstack')
+
+        self.assertEqual(http_client.request('/servers', 'GET'), ('GET', '/servers'))
+        self.assertIsNone(profiling.get_current_profile())
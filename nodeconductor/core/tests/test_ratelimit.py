@@ -0,0 +1,52 @@
+from __future__ import unicode_literals
+
+from django.test import SimpleTestCase
+import mock
+
+from nodeconductor.core import ratelimit
+
+
+@mock.patch('nodeconductor.core.ratelimit.metrics')
+@mock.patch('nodeconductor.core.ratelimit.time.sleep')
+class TokenBucketTest(SimpleTestCase):
+
+    def test_caller_waits_for_reserved_token_and_wait_time_is_recorded(self, mocked_sleep, mocked_metrics):
+        mocked_metrics.get_redis.return_value.eval.return_value = '0.25'
+        bucket = ratelimit.TokenBucket('compute:http://keystone.example.com', rate=4, burst=8)
+
+        wait_time = bucket.acquire()
+
+        self.assertEqual(wait_time, 0.25)
+        mocked_sleep.assert_called_once_with(0.25)
+        mocked_metrics.record_rate_limit.assert_called_once_with('compute:http://keystone.example.com', 0.25)
+
+    def test_calls_are_not_limited_without_redis(self, mocked_sleep, mocked_metrics):
+        mocked_metrics.get_redis.return_value = None
+        bucket = ratelimit.TokenBucket('compute:http://keystone.example.com', rate=4)
+
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertFalse(mocked_sleep.called)
+
+
+class RateLimitRequestsTest(SimpleTestCase):
+
+    def test_token_is_taken_before_every_request_of_http_client(self):
+        http_client = mock.Mock()
+        request = http_client.request
+        request.return_value = ('response', 'body')
+        bucket = mock.Mock()
+
+        ratelimit.rate_limit_requests(http_client, bucket)
+
+        self.assertEqual(http_client.request('/servers/detail', 'GET'), ('response', 'body'))
+        http_client.request('/servers/1', 'DELETE')
+        self.assertEqual(bucket.acquire.call_count, 2)
+        self.assertEqual(request.call_count, 2)
+
+    def test_requests_are_not_limited_without_bucket(self):
+        http_client = mock.Mock()
+        request = http_client.request
+
+        ratelimit.rate_limit_requests(http_client, None)
+
+        self.assertIs(http_client.request, request)
@@ -3,6 +3,7 @@ from datetime import datetime
 from operator import itemgetter
 import time
 
+from django.db import connections, router
 from django.utils import timezone
 
 
@@ -35,17 +36,24 @@ def format_time_and_value_to_segment_list(time_and_value_list, segments_count, s
         Example:
         [{'from': time1, 'to': time2, 'value': sum_of_values_from_time1_to_time2}, ...]
     """
-    segment_list = []
     time_step = (end_timestamp - start_timestamp) / segments_count
+    segment_sums = [0] * segments_count
+    segment_lengths = [0] * segments_count
+    if time_step:
+        # find segment of every value by its offset instead of scanning the list for every segment
+        for time, value in time_and_value_list:
+            index = int((time - start_timestamp) // time_step)
+            if 0 <= index < segments_count:
+                segment_sums[index] += value
+                segment_lengths[index] += 1
+
+    segment_list = []
     for i in range(segments_count):
         segment_start_timestamp = start_timestamp + time_step * i
         segment_end_timestamp = segment_start_timestamp + time_step
-        value_list = [
-            value for time, value in time_and_value_list
-            if time >= segment_start_timestamp and time < segment_end_timestamp]
-        segment_value = sum(value_list)
-        if average and len(value_list) != 0:
-            segment_value /= len(value_list)
+        segment_value = segment_sums[i]
+        if average and segment_lengths[i] != 0:
+            segment_value /= segment_lengths[i]
 
         segment_list.append({
             'from': segment_start_timestamp,
@@ -61,3 +69,38 @@ def datetime_to_timestamp(datetime):
 
 def timestamp_to_datetime(timestamp):
     return datetime.fromtimestamp(int(timestamp)).replace(tzinfo=timezone.get_current_timezone())
+
+
+def bulk_update(objects, fields, batch_size=50):
+    """
+    Save given fields of model instances with a single UPDATE query per batch of instances.
+    Like QuerySet.update() it doesn't send any signals.
+    """
+    objects = list(objects)
+    if not objects:
+        return
+
+    model = type(objects[0])
+    opts = model._meta
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    pk_column = quote_name(opts.pk.column)
+
+    for start in range(0, len(objects), batch_size):
+        batch = objects[start:start + batch_size]
+        assignments = []
+        params = []
+        for name in fields:
+            field = opts.get_field(name)
+            column = quote_name(field.column)
+            # ELSE branch lets PostgreSQL infer type of NULL values from the column
+            assignments.append('%s = CASE %s %s ELSE %s END' % (
+                column, pk_column, ' '.join(['WHEN %s THEN %s'] * len(batch)), column))
+            for obj in batch:
+                params.extend([obj.pk, field.get_db_prep_save(getattr(obj, field.attname), connection)])
+        params.extend(obj.pk for obj in batch)
+
+        sql = 'UPDATE %s SET %s WHERE %s IN (%s)' % (
+            quote_name(opts.db_table), ', '.join(assignments), pk_column, ', '.join(['%s'] * len(batch)))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
@@ -2,6 +2,7 @@ import logging
 
 from django.contrib import auth
 from django.db.models import ProtectedError
+from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.encoding import force_text
 
@@ -11,13 +12,14 @@ from djangosaml2.utils import get_custom_setting
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.views import exception_handler as rf_exception_handler
 from saml2.client import Saml2Client
 
 from nodeconductor import __version__
+from nodeconductor.core import metrics
 from nodeconductor.core.exceptions import IncorrectStateException
 from nodeconductor.core.log import EventLoggerAdapter
 from nodeconductor.core.serializers import AuthTokenSerializer, Saml2ResponseSerializer
@@ -166,6 +168,17 @@ def version_detail(request):
     return Response({'version': __version__})
 
 
+@api_view(['GET'])
+@permission_classes((IsAdminUser, ))
+def metrics_detail(request):
+    """Retrieve metrics of background tasks and rate limits in Prometheus text format"""
+
+    return HttpResponse(
+        metrics.render_prometheus(metrics.get_task_metrics(), metrics.get_rate_limit_metrics()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
 # noinspection PyProtectedMember
 def exception_handler(exc, context):
     if isinstance(exc, ProtectedError):
@@ -1,10 +1,13 @@
 from __future__ import unicode_literals
 
+import copy
 import logging
 
 from django.conf import settings
 from elasticsearch import Elasticsearch
 
+from nodeconductor.core import profiling
+
 
 logger = logging.getLogger(__name__)
 
@@ -23,23 +26,53 @@ class ElasticsearchResultListError(ElasticsearchError):
 
 class ElasticsearchResultList(object):
 
-    def __init__(self, user, event_types=None, search_text=None, sort='-@timestamp'):
+    def __init__(self, user, event_types=None, search_text=None, sort=None):
         self.client = ElasticsearchClient()
         self.user = user
         self.event_types = event_types
-        self.sort = sort
+        # Ordering is explicit if sort is given
+        self.ordered = sort is not None
+        self.sort = sort or '-@timestamp'
         self.search_text = search_text
+        self.ranges = {}
 
     def _get_events(self, from_, size):
         return self.client.get_user_events(
             user=self.user,
             event_types=self.event_types,
             search_text=self.search_text,
+            ranges=self.ranges,
             from_=from_,
             size=size,
             sort=self.sort
         )
 
+    def _clone(self):
+        clone = copy.copy(self)
+        clone.ranges = copy.deepcopy(self.ranges)
+        clone.__dict__.pop('total', None)
+        return clone
+
+    def order_by(self, *fields):
+        if len(fields) != 1:
+            raise ElasticsearchResultListError('ElasticsearchResultList can be ordered only by one field')
+        clone = self._clone()
+        clone.sort = fields[0]
+        clone.ordered = True
+        return clone
+
+    def filter(self, **kwargs):
+        """
+        Return list filtered by range lookups, for example: filter(**{'@timestamp__lt': '2015-01-01T00:00:00'})
+        """
+        clone = self._clone()
+        for lookup, value in kwargs.items():
+            field, _, operator = lookup.rpartition('__')
+            if operator not in ('lt', 'lte', 'gt', 'gte'):
+                raise ElasticsearchResultListError('ElasticsearchResultList supports only range lookups')
+            clone.ranges.setdefault(field, {})[operator] = value
+        return clone
+
     def __len__(self):
         if not hasattr(self, 'total'):
             self.total = self._get_events(0, 1)['total']
@@ -66,12 +99,13 @@ class ElasticsearchClient(object):
         self.client = self._get_client()
 
     def get_user_events(
-            self, user, event_types=None, search_text=None, sort='-@timestamp', index='_all', from_=0, size=10):
+            self, user, event_types=None, search_text=None, ranges=None, sort='-@timestamp', index='_all',
+            from_=0, size=10):
         """
         Return events filtered for given user and total count of available for user events
         """
         sort = sort[1:] + ':desc' if sort.startswith('-') else sort + ':asc'
-        body = self._get_search_body(user, event_types, search_text)
+        body = self._get_search_body(user, event_types, search_text, ranges)
         search_results = self.client.search(index=index, body=body, from_=from_, size=size, sort=sort)
         return {
             'events': [r['_source'] for r in search_results['hits']['hits']],
@@ -90,11 +124,13 @@ class ElasticsearchClient(object):
         # TODO return dummy client here
         elasticsearch_settings = self._get_elastisearch_settings()
         path = '%(protocol)s://%(username)s:%(password)s@%(host)s:%(port)s' % elasticsearch_settings
-        return Elasticsearch(
+        client = Elasticsearch(
             [path],
             use_ssl=elasticsearch_settings.get('use_ssl', False),
             verify_certs=elasticsearch_settings.get('verify_certs', False),
         )
+        profiling.profile_requests(client.transport, 'elasticsearch', method_name='perform_request')
+        return client
 
     def _get_permitted_objects_uuids(self, user):
         """
@@ -131,7 +167,7 @@ class ElasticsearchClient(object):
         excaped_field_values = [self._escape_elasticsearch_field_value(value) for value in field_values]
         return '%s:("%s")' % (field_name, '", "'.join(excaped_field_values))
 
-    def _get_search_body(self, user, event_types=None, search_text=None):
+    def _get_search_body(self, user, event_types=None, search_text=None, ranges=None):
         permitted_objects_uuids = self._get_permitted_objects_uuids(user)
         # Create query for user-related events
         query = ' OR '.join([
@@ -148,4 +184,9 @@ class ElasticsearchClient(object):
                 [self._format_to_elasticsearch_field_filter(field, [search_text]) for field in self.FTS_FIELDS])
             query += ' AND (' + search_query + ')'
         logger.debug('Getting elasticsearch results for user: "%s" with query: %s', user, query)
-        return {"query": {"query_string": {"query": query}}}
+        query = {"query_string": {"query": query}}
+        # Filter it by field ranges
+        if ranges:
+            range_filters = [{"range": {field: field_range}} for field, field_range in ranges.items()]
+            query = {"filtered": {"query": query, "filter": {"bool": {"must": range_filters}}}}
+        return {"query": query}
@@ -0,0 +1,77 @@
+from __future__ import unicode_literals
+
+import operator
+import re
+
+import mock
+from rest_framework import status, test
+
+from nodeconductor.structure.tests import factories as structure_factories
+
+
+class ElasticsearchClient(object):
+    """ Elasticsearch client returning given events """
+
+    RANGE_OPERATORS = {'lt': operator.lt, 'lte': operator.le, 'gt': operator.gt, 'gte': operator.ge}
+
+    def __init__(self, events):
+        self.events = events
+
+    def get_user_events(self, user, event_types=None, search_text=None, ranges=None, sort='-@timestamp',
+                        from_=0, size=10):
+        events = self.events
+        for field, field_range in (ranges or {}).items():
+            for lookup, value in field_range.items():
+                events = [event for event in events if self.RANGE_OPERATORS[lookup](event[field], value)]
+
+        field = sort.lstrip('-')
+        events = sorted(events, key=lambda event: event[field], reverse=sort.startswith('-'))
+        return {'events': events[from_:from_ + size], 'total': len(events)}
+
+
+class EventListPaginationTest(test.APITransactionTestCase):
+
+    def setUp(self):
+        self.events = [
+            {'@timestamp': '2015-04-%02dT10:00:00' % day, 'message': 'Event %s' % day} for day in range(1, 6)]
+        patcher = mock.patch('nodeconductor.events.elasticsearch_client.ElasticsearchClient',
+                             return_value=ElasticsearchClient(self.events))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client.force_authenticate(structure_factories.UserFactory())
+        self.url = 'http://testserver/api/events/'
+
+    def get_link(self, response, rel):
+        match = re.search(r'<([^>]+)>; rel="%s"' % rel, response['Link'])
+        return match.group(1) if match else None
+
+    def get_messages(self, response):
+        return [event['message'] for event in response.data]
+
+    def test_events_are_paginated_by_page_number_by_default(self):
+        response = self.client.get(self.url, data={'page_size': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_messages(response), ['Event 5', 'Event 4'])
+        self.assertEqual(response['X-Result-Count'], '5')
+        self.assertEqual(self.get_link(response, 'last'), self.url + '?page=3&page_size=2')
+
+    def test_events_are_paginated_by_cursor_newest_first_if_cursor_is_given(self):
+        response = self.client.get(self.url, data={'cursor': '', 'page_size': 2})
+        messages = self.get_messages(response)
+
+        while self.get_link(response, 'next'):
+            response = self.client.get(self.get_link(response, 'next'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            messages.extend(self.get_messages(response))
+
+        self.assertEqual(messages, ['Event 5', 'Event 4', 'Event 3', 'Event 2', 'Event 1'])
+        self.assertNotIn('X-Result-Count', response)
+        self.assertIsNone(self.get_link(response, 'last'))
+
+    def test_page_number_pagination_is_used_for_explicitly_ordered_events(self):
+        response = self.client.get(self.url, data={'cursor': '', 'page_size': 2, 'o': '@timestamp'})
+
+        self.assertEqual(self.get_messages(response), ['Event 1', 'Event 2'])
+        self.assertEqual(response['X-Result-Count'], '5')
@@ -1,12 +1,18 @@
 from rest_framework import generics, response
 
+from nodeconductor.core.pagination import KeysetLinkHeaderPagination
 from nodeconductor.events import elasticsearch_client
 
 
+class EventPagination(KeysetLinkHeaderPagination):
+    ordering = '-@timestamp'
+
+
 class EventListView(generics.GenericAPIView):
+    pagination_class = EventPagination
 
     def list(self, request, *args, **kwargs):
-        order_by = request.GET.get('o', '-@timestamp')
+        order_by = request.GET.get('o')
         event_types = request.GET.getlist('event_type')
         search_text = request.GET.get('search_text')
         elasticsearch_list = elasticsearch_client.ElasticsearchResultList(
@@ -2,12 +2,14 @@ from __future__ import unicode_literals
 
 from django.apps import AppConfig
 from django.db.models import signals
+from django_fsm.signals import post_transition
 
 from nodeconductor.core import handlers as core_handlers
 from nodeconductor.core.models import SshPublicKey
 from nodeconductor.core.signals import pre_serializer_fields
 from nodeconductor.iaas import handlers
 from nodeconductor.quotas import handlers as quotas_handlers
+from nodeconductor.structure import handlers as structure_handlers
 from nodeconductor.structure.models import Project
 from nodeconductor.structure.signals import structure_role_granted
 
@@ -20,6 +22,10 @@ class IaasConfig(AppConfig):
     def ready(self):
         Instance = self.get_model('Instance')
         CloudProjectMembership = self.get_model('CloudProjectMembership')
+        InstanceLicense = self.get_model('InstanceLicense')
+        Cloud = self.get_model('Cloud')
+        SecurityGroup = self.get_model('SecurityGroup')
+        Template = self.get_model('Template')
 
         from nodeconductor.structure.serializers import CustomerSerializer, ProjectSerializer
 
@@ -101,3 +107,56 @@ class IaasConfig(AppConfig):
             sender=Instance,
             dispatch_uid='nodeconductor.iaas.handlers.decrease_cutomer_nc_instances_quota',
         )
+
+        # keep license statistics rollup in sync with instance licenses
+        signals.post_save.connect(
+            handlers.increase_instance_license_stats,
+            sender=InstanceLicense,
+            dispatch_uid='nodeconductor.iaas.handlers.increase_instance_license_stats',
+        )
+
+        signals.post_delete.connect(
+            handlers.decrease_instance_license_stats,
+            sender=InstanceLicense,
+            dispatch_uid='nodeconductor.iaas.handlers.decrease_instance_license_stats',
+        )
+
+        # invalidate ETags of customers on change of objects listed by ETagged endpoints
+        for model in (Cloud, CloudProjectMembership, Instance, InstanceLicense, SecurityGroup):
+            name = model.__name__
+            signals.post_save.connect(
+                structure_handlers.bump_etag_customer_versions,
+                sender=model,
+                dispatch_uid='nodeconductor.iaas.handlers.bump_etag_customer_versions_on_%s_save' % name,
+            )
+
+            signals.pre_delete.connect(
+                structure_handlers.collect_etag_customers_before_delete,
+                sender=model,
+                dispatch_uid='nodeconductor.iaas.handlers.collect_etag_customers_before_%s_delete' % name,
+            )
+
+            signals.post_delete.connect(
+                structure_handlers.bump_etag_customer_versions,
+                sender=model,
+                dispatch_uid='nodeconductor.iaas.handlers.bump_etag_customer_versions_on_%s_delete' % name,
+            )
+
+            post_transition.connect(
+                structure_handlers.bump_etag_customer_versions,
+                sender=model,
+                dispatch_uid='nodeconductor.iaas.handlers.bump_etag_customer_versions_on_%s_transition' % name,
+            )
+
+        # templates are shown in instances of all customers
+        signals.post_save.connect(
+            structure_handlers.bump_etag_all_customer_versions,
+            sender=Template,
+            dispatch_uid='nodeconductor.iaas.handlers.bump_etag_all_customer_versions_on_template_save',
+        )
+
+        signals.post_delete.connect(
+            structure_handlers.bump_etag_all_customer_versions,
+            sender=Template,
+            dispatch_uid='nodeconductor.iaas.handlers.bump_etag_all_customer_versions_on_template_delete',
+        )
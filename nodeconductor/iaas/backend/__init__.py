@@ -1,3 +1,17 @@
+from importlib import import_module
+
+from django.utils.functional import SimpleLazyObject
+
+
+# Importing exceptions runs __init__ of client packages, e.g. glanceclient imports its client and pbr,
+# so they are imported on first use instead, e.g. when an except clause is evaluated.
+# Processes which never talk to OpenStack don't load client libraries then.
+cinder_exceptions = SimpleLazyObject(lambda: import_module('cinderclient.exceptions'))
+glance_exceptions = SimpleLazyObject(lambda: import_module('glanceclient.exc'))
+keystone_exceptions = SimpleLazyObject(lambda: import_module('keystoneclient.exceptions'))
+neutron_exceptions = SimpleLazyObject(lambda: import_module('neutronclient.common.exceptions'))
+nova_exceptions = SimpleLazyObject(lambda: import_module('novaclient.exceptions'))
+
 
 class CloudBackendError(Exception):
     """
@@ -31,5 +45,8 @@ class AbstractCloudBackend(object):
     def push_ssh_public_key(self, membership, public_key):
         raise NotImplementedError()
 
+    def push_ssh_public_keys(self, membership, public_keys):
+        raise NotImplementedError()
+
     def pull_flavors(self, membership):
         raise NotImplementedError()
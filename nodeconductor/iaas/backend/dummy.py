@@ -8,24 +8,28 @@ from __future__ import unicode_literals
 #    tenant_name = 'test_tenant'
 
 import re
+import time
 import uuid
 import base64
 import hashlib
+import functools
 import threading
 
+from collections import defaultdict, OrderedDict
 from datetime import datetime, timedelta
 
-from keystoneclient.auth.identity import v2
-from keystoneclient.service_catalog import ServiceCatalog
-from keystoneclient import exceptions as keystone_exceptions
-from neutronclient.client import exceptions as neutron_exceptions
-from cinderclient import exceptions as cinder_exceptions
-from glanceclient import exc as glance_exceptions
-from novaclient import exceptions as nova_exceptions
+from django.conf import settings
+
+from nodeconductor.iaas.backend import (
+    cinder_exceptions, glance_exceptions, keystone_exceptions, neutron_exceptions, nova_exceptions)
 
 
 OPENSTACK = threading.local().openstack_instance = {}
 
+_latency_state = threading.local()
+
+_UNHASHABLE = object()
+
 
 class OpenStackResource(object):
     """ Generic OpenStack resource like flavor, image, server, user, role, etc. """
@@ -126,18 +130,44 @@ class OpenStackCustomResources(object):
             return "<Snapshot: %s>" % self.id
 
 
+def _simulate_latency(func):
+    """ Delay outermost call of resource list method by OPENSTACK_DUMMY_LATENCY seconds
+        configured in settings.NODECONDUCTOR, in order to emulate network round trip.
+    """
+    @functools.wraps(func)
+    def wrapped(*args, **kwargs):
+        depth = getattr(_latency_state, 'depth', 0)
+        if depth == 0:
+            latency = getattr(settings, 'NODECONDUCTOR', {}).get('OPENSTACK_DUMMY_LATENCY')
+            if latency:
+                time.sleep(latency)
+
+        _latency_state.depth = depth + 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _latency_state.depth = depth
+    return wrapped
+
+
 class OpenStackResourceList(object):
     """ Generic class to work with OpenStack resources.
         Initialized from DummyDataSet during first access and stays in
         local thread for future use.
+
+        Resources are stored by id, lookups by attributes listed in
+        INDEXED_ATTRIBUTES use secondary indexes instead of full scan.
     """
 
+    INDEXED_ATTRIBUTES = ('name', 'image', 'fingerprint', 'status')
+
     def __new__(cls, *args, **kwargs):
         key = '%ss' % cls.__name__.lower()
         instance = OPENSTACK.get(key)
         if not instance:
             instance = object.__new__(cls, *args, **kwargs)
-            setattr(instance, '_objects', set())
+            setattr(instance, '_objects', OrderedDict())
+            setattr(instance, '_indexes', {attr: defaultdict(set) for attr in cls.INDEXED_ATTRIBUTES})
             OPENSTACK[key] = instance
         return instance
 
@@ -148,7 +178,9 @@ class OpenStackResourceList(object):
             dataset_name += 'S'
         dummy_objects = getattr(DummyDataSet, dataset_name, [])
         for obj in dummy_objects:
-            self._objects.add(self._create(**obj))
+            obj = self._create(**obj)
+            if self._get_key(obj) not in self._objects:
+                self._add(obj)
 
     def __repr__(self):
         resources = ", ".join(sorted(r.name for r in self.list()))
@@ -165,18 +197,64 @@ class OpenStackResourceList(object):
             base_cls = getattr(OpenStackCustomResources, cls_name)
         return type(cls_name, (base_cls,), {})(**kwargs)
 
+    @staticmethod
+    def _get_key(resource):
+        # There's only one resource represented by single object
+        if isinstance(resource, OpenStackSingleObjectResource):
+            return None
+        return resource.id
+
+    @staticmethod
+    def _is_hashable(value):
+        try:
+            hash(value)
+        except TypeError:
+            return False
+        return True
+
+    def _get_index_value(self, resource, attr_name):
+        value = getattr(resource, attr_name, None)
+        # Resources with unhashable values are indexed together and never looked up in index
+        return value if self._is_hashable(value) else _UNHASHABLE
+
+    def _index(self, resource):
+        key = self._get_key(resource)
+        for attr_name, index in self._indexes.items():
+            index[self._get_index_value(resource, attr_name)].add(key)
+
+    def _unindex(self, resource):
+        key = self._get_key(resource)
+        for attr_name, index in self._indexes.items():
+            value = self._get_index_value(resource, attr_name)
+            index[value].discard(key)
+            if not index[value]:
+                del index[value]
+
+    def _add(self, resource):
+        self._objects[self._get_key(resource)] = resource
+        self._index(resource)
+
+    def _remove(self, resource):
+        self._unindex(resource)
+        del self._objects[self._get_key(resource)]
+
     def _update(self, resource, **kwargs):
+        self._unindex(resource)
         resource.__dict__.update(**kwargs)
+        self._index(resource)
 
+    @_simulate_latency
     def list(self):
-        return list(self._objects)
+        return list(self._objects.values())
 
+    @_simulate_latency
     def get(self, obj_id):
         try:
-            return next(obj for obj in self.list() if obj.id == obj_id)
-        except StopIteration:
+            return self._objects[obj_id]
+        except (KeyError, TypeError):
             self.client._raise('NotFound', "OpenStack resource not found (404)")
 
+    @_simulate_latency
     def find(self, **kwargs):
         results = self.findall(**kwargs)
         if not results:
@@ -185,35 +263,47 @@ class OpenStackResourceList(object):
             self.client._raise('NoUniqueMatch')
         return results[0]
 
+    @_simulate_latency
     def findall(self, **kwargs):
-        results = []
-        for obj in self.list():
-            found = True
-            for attr_name, attr_val in kwargs.items():
-                if attr_name == 'is_public':
-                    attr_name = 'os-flavor-access:is_public'
-
-                found = found and getattr(obj, attr_name) == attr_val
-                if not found:
-                    break
-            if found:
-                results.append(obj)
+        lookups = {}
+        for attr_name, attr_val in kwargs.items():
+            if attr_name == 'is_public':
+                attr_name = 'os-flavor-access:is_public'
+            lookups[attr_name] = attr_val
+
+        # Narrow candidates down using the most selective index,
+        # candidates are still checked against all the lookups
+        candidate_keys = None
+        for attr_name, attr_val in lookups.items():
+            if attr_name not in self._indexes or not self._is_hashable(attr_val):
+                continue
+            keys = self._indexes[attr_name].get(attr_val, ())
+            if candidate_keys is None or len(keys) < len(candidate_keys):
+                candidate_keys = keys
+
+        if candidate_keys is None:
+            candidates = self._objects.values()
+        else:
+            candidates = [self._objects[key] for key in candidate_keys]
 
-        return results
+        return [obj for obj in candidates
+                if all(getattr(obj, attr_name) == attr_val for attr_name, attr_val in lookups.items())]
 
+    @_simulate_latency
     def create(self, name, data):
         try:
             self.find(name=name)
         except:
             obj = self._create(id=uuid.uuid4().hex, **data)
-            self._objects.add(obj)
+            self._add(obj)
             return obj
         else:
             self.client._raise(
                 'Conflict', "Conflict occurred attempting to create OpenStack resource")
 
+    @_simulate_latency
     def delete(self, obj_id):
-        self._objects.remove(self.get(obj_id))
+        self._remove(self.get(obj_id))
 
 
 class OpenStackBaseClient(object):
@@ -365,6 +455,9 @@ class KeystoneClient(OpenStackBaseClient):
 
     class Session(object):
         def __init__(self, auth=None):
+            from keystoneclient.auth.identity import v2
+            from keystoneclient.service_catalog import ServiceCatalog
+
             if not isinstance(auth, (v2.Password, v2.Token)):
                 raise KeystoneClient.Exceptions.AuthorizationFailure(
                     "Unknown authentication identity class")
@@ -385,8 +478,11 @@ class KeystoneClient(OpenStackBaseClient):
                     tenant = keystone.tenants.create(tenant_name='test-%s' % auth.tenant_id)
                 except KeystoneClient.Exceptions.Conflict:
                     tenant = keystone.tenants.get(auth.tenant_id)
-
-                tenant.id = auth.tenant_id
+                else:
+                    # Tenants are stored by id, so re-add the tenant under the passed one
+                    keystone.tenants._remove(tenant)
+                    tenant.id = auth.tenant_id
+                    keystone.tenants._add(tenant)
             elif auth.tenant_name:
                 try:
                     tenant = keystone.tenants.find(name=auth.tenant_name)
@@ -611,7 +707,7 @@ class NovaClient(OpenStackBaseClient):
                     to_port=to_port,
                     ip_range={'cidr': cidr},
                     group={})
-                self._objects.add(obj)
+                self._add(obj)
                 return obj
             else:
                 self.client._raise(
@@ -619,6 +715,8 @@ class NovaClient(OpenStackBaseClient):
                     "Security group rule already exists. Group id is %s." % grouprole.id)
 
     def __init__(self, auth_url, username, api_key, tenant_id=None, **kwargs):
+        from keystoneclient.auth.identity import v2
+
         self.tenant_id = tenant_id
         self.client = KeystoneClient(
             session=KeystoneClient.Session(auth=v2.Password(auth_url, username, api_key)))
@@ -639,10 +737,15 @@ class GlanceClient(OpenStackBaseClient):
     Exceptions = glance_exceptions
 
     class Image(OpenStackResourceList):
-        def list(self):
-            return (i for i in super(GlanceClient.Image, self).list())
+        def list(self, filters=None, page_size=None):
+            images = super(GlanceClient.Image, self).list()
+            for attr, value in (filters or {}).items():
+                images = [i for i in images if getattr(i, attr, None) == value]
+            return (i for i in images)
 
     def __init__(self, endpoint, token, **kwargs):
+        from keystoneclient.auth.identity import v2
+
         self.client = KeystoneClient(
             session=KeystoneClient.Session(auth=v2.Token(auth_url=endpoint, token=token)))
         self.images = self._get_resources('Image')
@@ -672,6 +775,8 @@ class NeutronClient(OpenStackBaseClient):
             return super(NeutronClient.Subnet, self).create(kwargs['name'], kwargs)
 
     def __init__(self, auth_url, username, password, tenant_id=None, **kwargs):
+        from keystoneclient.auth.identity import v2
+
         self.client = KeystoneClient(
             session=KeystoneClient.Session(auth=v2.Password(auth_url, username, password)))
 
@@ -815,6 +920,8 @@ class CinderClient(OpenStackBaseClient):
                 **args))
 
     def __init__(self, auth_url, username, api_key, tenant_id=None, **kwargs):
+        from keystoneclient.auth.identity import v2
+
         self.tenant_id = tenant_id
         self.client = KeystoneClient(
             session=KeystoneClient.Session(auth=v2.Password(auth_url, username, api_key)))
@@ -1,40 +1,40 @@
 from __future__ import unicode_literals
 
 import re
+import json
 import time
 import uuid
+import hashlib
+import hmac
 import logging
 import datetime
 import pkg_resources
 import dateutil.parser
 
-from itertools import groupby
+from collections import defaultdict
+from itertools import chain, groupby
 
-from cinderclient import exceptions as cinder_exceptions
-from cinderclient.v1 import client as cinder_client
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.db.models import ProtectedError
 from django.utils import dateparse
 from django.utils import six
+from django.utils.encoding import force_bytes
 from django.utils import timezone
 from django.utils.lru_cache import lru_cache
-from glanceclient import exc as glance_exceptions
-from glanceclient.v1 import client as glance_client
-from keystoneclient import exceptions as keystone_exceptions
-from keystoneclient import session as keystone_session
-from keystoneclient.auth.identity import v2
-from keystoneclient.service_catalog import ServiceCatalog
-from keystoneclient.v2_0 import client as keystone_client
-from neutronclient.client import exceptions as neutron_exceptions
-from neutronclient.v2_0 import client as neutron_client
-from novaclient import exceptions as nova_exceptions
-from novaclient.v1_1 import client as nova_client
+from django.utils.module_loading import import_string
+from redis.exceptions import RedisError
 
+from nodeconductor.core import profiling, ratelimit
 from nodeconductor.core.log import EventLoggerAdapter
-from nodeconductor.iaas.backend import dummy, CloudBackendError, CloudBackendInternalError
+from nodeconductor.core.metrics import get_redis
+from nodeconductor.core.utils import bulk_update
+from nodeconductor.iaas.backend import (
+    dummy, CloudBackendError, CloudBackendInternalError,
+    cinder_exceptions, glance_exceptions, keystone_exceptions, neutron_exceptions, nova_exceptions)
 from nodeconductor.iaas import models
+from nodeconductor.structure import etags
 
 logger = logging.getLogger(__name__)
 event_logger = EventLoggerAdapter(logger)
@@ -64,16 +64,146 @@ def _get_nova_version():
         return '00000002', '00000017', '00000000', '*final'
 
 
+@lru_cache(maxsize=1)
+def _cinder_supports_session():
+    return _get_cinder_version() >= pkg_resources.parse_version('1.1.0')
+
+
+@lru_cache(maxsize=1)
+def _neutron_supports_session():
+    return _get_neutron_version() >= pkg_resources.parse_version('2.3.6')
+
+
+@lru_cache(maxsize=1)
+def _nova_supports_session():
+    return _get_nova_version() >= pkg_resources.parse_version('2.18.0')
+
+
+@lru_cache(maxsize=None)
+def _import_client_class(path):
+    return import_string(path)
+
+
+# Keystone tokens are shared by all workers through Redis, keyed by HMAC of credentials
+TOKEN_CACHE_KEY = 'nc:openstack:token:%s'
+# Tokens expiring sooner are neither cached nor accepted by Session.validate()
+TOKEN_EXPIRY_MARGIN = datetime.timedelta(minutes=10)
+
+
+def get_rate_limit_bucket(auth_url, service_type):
+    """
+    Return token bucket limiting calls to the service of OpenStack endpoint or None if calls are not limited.
+    Limits of the endpoint take precedence over the ones configured for any endpoint ('*').
+    """
+    rate_limits = getattr(settings, 'NODECONDUCTOR', {}).get('OPENSTACK_RATE_LIMITS', {})
+    for endpoint in (auth_url, '*'):
+        limit = rate_limits.get(endpoint, {}).get(service_type)
+        if limit:
+            rate, burst = limit
+            return ratelimit.TokenBucket('%s:%s' % (service_type, auth_url), rate, burst)
+    return None
+
+
+def _get_token_cache_key(credentials):
+    # Key is salted with the secret key, so that passwords can't be guessed by brute force of keys
+    values = [credentials.get(opt) or '' for opt in ('auth_url', 'username', 'password', 'tenant_id', 'tenant_name')]
+    digest = hmac.new(force_bytes(settings.SECRET_KEY), '\n'.join(values).encode('utf-8'), hashlib.sha256)
+    return TOKEN_CACHE_KEY % digest.hexdigest()
+
+
+def get_cached_auth_ref(credentials):
+    """
+    Return auth_ref of token issued for given credentials by any worker or None if there's no valid one.
+    """
+    redis = get_redis()
+    if redis is None:
+        return None
+
+    try:
+        auth_ref = redis.get(_get_token_cache_key(credentials))
+    except RedisError:
+        logger.warning('Failed to get OpenStack token from cache', exc_info=True)
+        return None
+
+    return json.loads(auth_ref) if auth_ref else None
+
+
+def cache_auth_ref(credentials, auth_ref):
+    """
+    Store auth_ref of token issued for given credentials until the token is about to expire.
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+
+    expires_at = dateutil.parser.parse(auth_ref['token']['expires'])
+    timeout = int((expires_at - timezone.now() - TOKEN_EXPIRY_MARGIN).total_seconds())
+    if timeout <= 0:
+        return
+
+    try:
+        redis.setex(_get_token_cache_key(credentials), timeout, json.dumps(auth_ref))
+    except RedisError:
+        logger.warning('Failed to put OpenStack token to cache', exc_info=True)
+
+
+def evict_auth_ref(credentials):
+    """
+    Remove auth_ref of token rejected by OpenStack, e.g. revoked before its expiration.
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+
+    try:
+        redis.delete(_get_token_cache_key(credentials))
+    except RedisError:
+        logger.warning('Failed to remove OpenStack token from cache', exc_info=True)
+
+
+def _get_session_credentials(session):
+    return dict(
+        (opt, session[opt]) for opt in OpenStackClient.Session.OPTIONS
+        if opt != 'auth_ref' and session.get(opt))
+
+
+def _evict_token_on_authenticate(http_client, session):
+    # Client is given the token of the session and signs in with the password only if the token is rejected
+    authenticate = http_client.authenticate
+
+    def wrapper(*args, **kwargs):
+        session.evict_token()
+        return authenticate(*args, **kwargs)
+
+    http_client.authenticate = wrapper
+
+
+def _reauthenticate_on_unauthorized(http_client, session):
+    # Client is given the token of the session only, so it can't sign in again by itself
+    http_request = http_client._http_request
+
+    def wrapper(url, method, **kwargs):
+        try:
+            return http_request(url, method, **kwargs)
+        except glance_exceptions.Unauthorized:
+            http_client.auth_token = session.reauthenticate()
+            return http_request(url, method, **kwargs)
+
+    http_client._http_request = wrapper
+
+
 class OpenStackClient(object):
     """ Generic OpenStack client with dummy mode support """
 
+    # Real client classes are given by dotted paths and imported on first use,
+    # so that processes which never talk to OpenStack don't load client libraries.
     REAL_DUMMY_CLASSES = {
-        'KeystoneSession': (keystone_session.Session, dummy.KeystoneClient.Session),
-        'KeystoneClient': (keystone_client.Client, dummy.KeystoneClient),
-        'NovaClient': (nova_client.Client, dummy.NovaClient),
-        'NeutronClient': (neutron_client.Client, dummy.NeutronClient),
-        'CinderClient': (cinder_client.Client, dummy.CinderClient),
-        'GlanceClient': (glance_client.Client, dummy.GlanceClient),
+        'KeystoneSession': ('keystoneclient.session.Session', dummy.KeystoneClient.Session),
+        'KeystoneClient': ('keystoneclient.v2_0.client.Client', dummy.KeystoneClient),
+        'NovaClient': ('novaclient.v1_1.client.Client', dummy.NovaClient),
+        'NeutronClient': ('neutronclient.v2_0.client.Client', dummy.NeutronClient),
+        'CinderClient': ('cinderclient.v1.client.Client', dummy.CinderClient),
+        'GlanceClient': ('glanceclient.v1.client.Client', dummy.GlanceClient),
     }
 
     def __init__(self, dummy=False):
@@ -81,48 +211,77 @@ class OpenStackClient(object):
 
     @classmethod
     def get_openstack_class(cls, class_name, is_dummy):
-        return cls.REAL_DUMMY_CLASSES[class_name][1 if is_dummy else 0]
+        real_class, dummy_class = cls.REAL_DUMMY_CLASSES[class_name]
+        if is_dummy:
+            return dummy_class
+        return _import_client_class(real_class)
 
     class Session(dict):
         """ Serializable session """
 
-        # There's a temporary need to pass plain text credentials
+        # Credentials are kept along with the token for the clients which can't use keystone session,
+        # they authenticate with the password again only if the token is rejected.
         # Currently packaged libraries novaclient==2.17.0, neutronclient==2.3.4
-        # and cinderclient==1.0.9 don't support token auth.
-        # TODO: Switch to token auth on libraries upgrade.
+        # and cinderclient==1.0.9 don't support keystone session.
         OPTIONS = ('auth_ref', 'auth_url', 'username', 'password', 'tenant_id', 'tenant_name')
 
-        def __init__(self, backend, ks_session=None, **credentials):
+        def __init__(self, backend, ks_session=None, auth_ref=None, **credentials):
             self.dummy = self['dummy'] = backend.dummy
             self.backend = backend.__class__(dummy=backend.dummy)
             self.keystone_session = ks_session
+            reused_auth_ref = None
 
             if not self.keystone_session:
+                from keystoneclient.auth.identity import v2
                 auth_plugin = v2.Password(**credentials)
+
+                # Reuse token passed along the chain or issued to any worker instead of signing in again
+                if not self.dummy:
+                    auth_ref = auth_ref or get_cached_auth_ref(credentials)
+                    if auth_ref:
+                        from keystoneclient.access import AccessInfoV2
+                        reused_auth_ref = auth_plugin.auth_ref = AccessInfoV2(**auth_ref)
+
                 self.keystone_session = self.backend.get_openstack_class(
                     'KeystoneSession', self.dummy)(auth=auth_plugin)
 
+            # This will eagerly sign in throwing AuthorizationFailure on bad credentials
+            # unless a valid token was reused
+            self.keystone_session.get_token()
+
             for opt in self.OPTIONS:
                 self[opt] = getattr(self.auth, opt)
 
-            # This will eagerly sign in throwing AuthorizationFailure on bad credentials
-            self.keystone_session.get_token()
+            if not self.dummy and credentials and self['auth_ref'] is not reused_auth_ref:
+                cache_auth_ref(credentials, self['auth_ref'])
 
         def __getattr__(self, name):
             return getattr(self.keystone_session, name)
 
         @classmethod
         def factory(cls, backend, session):
-            auth_plugin = v2.Token(
-                auth_url=session['auth_url'],
-                token=session['auth_ref']['token']['id'])
-            ks_session = backend.get_openstack_class(
-                'KeystoneSession', backend.dummy)(auth=auth_plugin)
-            return cls(backend, ks_session=ks_session)
+            return cls(backend, auth_ref=session['auth_ref'], **_get_session_credentials(session))
+
+        def evict_token(self):
+            """ Stop sharing the token of the session with other workers once it is rejected """
+            if not self.dummy:
+                evict_auth_ref(_get_session_credentials(self))
+
+        def reauthenticate(self):
+            """ Replace rejected token of the session with a new one and return it """
+            self.evict_token()
+            self.keystone_session.invalidate()
+            token = self.keystone_session.get_token()
+
+            self['auth_ref'] = self.auth.auth_ref
+            if not self.dummy:
+                cache_auth_ref(_get_session_credentials(self), self['auth_ref'])
+
+            return token
 
         def validate(self):
             expiresat = dateutil.parser.parse(self.auth.auth_ref['token']['expires'])
-            if expiresat > timezone.now() + datetime.timedelta(minutes=10):
+            if expiresat > timezone.now() + TOKEN_EXPIRY_MARGIN:
                 return True
 
             raise CloudBackendError('Invalid OpenStack session')
@@ -151,14 +310,32 @@ class OpenStackClient(object):
         backend = cls(dummy=session.get('dummy', False))
         return backend.Session.factory(backend, session)
 
+    @classmethod
+    def instrument_requests(cls, http_client, session, service_type, method_name='request'):
+        """
+        Profile requests sent by HTTP client of the service and limit their rate by the bucket of the endpoint.
+        Time spent waiting for a token is not counted as request time.
+        """
+        profiling.profile_requests(http_client, 'openstack', method_name)
+        bucket = get_rate_limit_bucket(session.auth.auth_url, service_type)
+        ratelimit.rate_limit_requests(http_client, bucket, method_name)
+
     @classmethod
     def create_keystone_client(cls, session):
-        return cls.get_openstack_class(
-            'KeystoneClient', session.dummy)(session=session)
+        client = cls.get_openstack_class('KeystoneClient', session.dummy)(session=session)
+        if not session.dummy:
+            cls.instrument_requests(client, session, 'identity')
+        return client
+
+    @classmethod
+    def get_service_endpoint(cls, session, service_type):
+        from keystoneclient.service_catalog import ServiceCatalog
+        catalog = ServiceCatalog.factory(session.auth.auth_ref)
+        return catalog.url_for(service_type=service_type).rstrip('/')
 
     @classmethod
     def create_nova_client(cls, session):
-        if _get_nova_version() >= pkg_resources.parse_version('2.18.0'):
+        if _nova_supports_session():
             kwargs = {'session': session.keystone_session}
         else:
             auth_plugin = session.auth
@@ -170,13 +347,22 @@ class OpenStackClient(object):
                 # project_id is tenant_name, id doesn't make sense,
                 # pretty usual for OpenStack
                 'project_id': auth_plugin.tenant_name,
+                # token of the session is used until it is rejected
+                'auth_token': session.get_token(),
+                'bypass_url': cls.get_service_endpoint(session, 'compute'),
             }
 
-        return cls.get_openstack_class('NovaClient', session.dummy)(**kwargs)
+        client = cls.get_openstack_class('NovaClient', session.dummy)(**kwargs)
+        if not session.dummy:
+            cls.instrument_requests(client.client, session, 'compute')
+            if not _nova_supports_session():
+                _evict_token_on_authenticate(client.client, session)
+
+        return client
 
     @classmethod
     def create_neutron_client(cls, session):
-        if _get_neutron_version() >= pkg_resources.parse_version('2.3.6'):
+        if _neutron_supports_session():
             kwargs = {'session': session.keystone_session}
         else:
             auth_plugin = session.auth
@@ -188,13 +374,22 @@ class OpenStackClient(object):
                 # neutron is different in a sense it is more reasonable to call
                 # tenant_name a tenant_name, rather then project_id
                 'tenant_name': auth_plugin.tenant_name,
+                # token of the session is used until it is rejected
+                'token': session.get_token(),
+                'endpoint_url': cls.get_service_endpoint(session, 'network'),
             }
 
-        return cls.get_openstack_class('NeutronClient', session.dummy)(**kwargs)
+        client = cls.get_openstack_class('NeutronClient', session.dummy)(**kwargs)
+        if not session.dummy:
+            cls.instrument_requests(client.httpclient, session, 'network')
+            if not _neutron_supports_session():
+                _evict_token_on_authenticate(client.httpclient, session)
+
+        return client
 
     @classmethod
     def create_cinder_client(cls, session):
-        if _get_cinder_version() >= pkg_resources.parse_version('1.1.0'):
+        if _cinder_supports_session():
             kwargs = {'session': session.keystone_session}
         else:
             auth_plugin = session.auth
@@ -208,12 +403,21 @@ class OpenStackClient(object):
                 'project_id': auth_plugin.tenant_name,
             }
 
-        return cls.get_openstack_class('CinderClient', session.dummy)(**kwargs)
+        client = cls.get_openstack_class('CinderClient', session.dummy)(**kwargs)
+        if not session.dummy:
+            cls.instrument_requests(client.client, session, 'volume')
+            if not _cinder_supports_session():
+                # cinderclient==1.0.9 doesn't accept token, set it along with endpoint
+                # so that the client authenticates with the password only if the token is rejected
+                client.client.auth_token = session.get_token()
+                client.client.management_url = cls.get_service_endpoint(session, 'volume')
+                _evict_token_on_authenticate(client.client, session)
+
+        return client
 
     @classmethod
     def create_glance_client(cls, session):
-        catalog = ServiceCatalog.factory(session.auth.auth_ref)
-        endpoint = catalog.url_for(service_type='image')
+        endpoint = cls.get_service_endpoint(session, 'image')
 
         kwargs = {
             'token': session.get_token(),
@@ -222,7 +426,13 @@ class OpenStackClient(object):
             'ssl_compression': True,
         }
 
-        return cls.get_openstack_class('GlanceClient', session.dummy)(endpoint, **kwargs)
+        client = cls.get_openstack_class('GlanceClient', session.dummy)(endpoint, **kwargs)
+        if not session.dummy:
+            # glanceclient==0.12.0 client is HTTP client itself, a repeated request takes another token
+            cls.instrument_requests(client, session, 'image', method_name='_http_request')
+            _reauthenticate_on_unauthorized(client, session)
+
+        return client
 
 
 class OpenStackBackend(OpenStackClient):
@@ -230,6 +440,9 @@ class OpenStackBackend(OpenStackClient):
         Test mode implies by creating an instance as OpenStackBackend(dummy=True)
     """
 
+    # Number of images fetched from glance per request
+    GLANCE_PAGE_SIZE = 100
+
     @classmethod
     def create_session(cls, keystone_url=None, instance_uuid=None, check_tenant=True, membership=None, **kwargs):
         """ Create OpenStack session using NodeConductor credentials """
@@ -332,29 +545,35 @@ class OpenStackBackend(OpenStackClient):
         session = self.create_session(keystone_url=cloud_account.auth_url, dummy=self.dummy)
         glance = self.create_glance_client(session)
 
+        # Non-public images are filtered out by glance, the check is kept for older deployments
         backend_images = dict(
             (image.id, image)
-            for image in glance.images.list()
+            for image in glance.images.list(filters={'is_public': True}, page_size=self.GLANCE_PAGE_SIZE)
             if not image.deleted
             if image.is_public
         )
 
-        from nodeconductor.iaas.models import TemplateMapping
+        from nodeconductor.iaas.models import Image, TemplateMapping
 
         with transaction.atomic():
-            # Add missing images
-            current_image_ids = set()
-
             # itertools.groupby requires the iterable to be sorted by key
             mapping_queryset = (
                 TemplateMapping.objects
                 .filter(backend_image_id__in=backend_images.keys())
+                .select_related('template')
                 .order_by('template__pk')
             )
 
-            mappings_grouped = groupby(mapping_queryset.iterator(), lambda m: m.template.pk)
+            mappings_grouped = groupby(mapping_queryset, lambda m: m.template_id)
+
+            # Image.__str__ reads template name
+            existing_images = dict(
+                (image.template_id, image) for image in cloud_account.images.select_related('template'))
+            current_image_pks = set()
+            new_images = []
+            changed_images = False
 
-            for _, mapping_iterator in mappings_grouped:
+            for template_pk, mapping_iterator in mappings_grouped:
                 # itertools.groupby shares the iterable,
                 # store mappings in own list
                 mappings = list(mapping_iterator)
@@ -367,39 +586,45 @@ class OpenStackBackend(OpenStackClient):
                         'multiple backend images matched: %s',
                         mapping.template, ', '.join(m.backend_image_id for m in mappings),
                     )
-                else:
-                    backend_image = backend_images[mapping.backend_image_id]
-                    # XXX: This might fail in READ REPEATED isolation level,
-                    # which is default on MySQL
-                    # see https://docs.djangoproject.com/en/1.6/ref/models/querysets/#django.db.models.query.QuerySet.get_or_create
-                    image, created = cloud_account.images.get_or_create(
-                        template=mapping.template,
-                        min_disk=self.get_core_disk_size(backend_image.min_disk),
-                        min_ram=self.get_core_ram_size(backend_image.min_ram),
-                        defaults={'backend_id': mapping.backend_image_id},
-                    )
+                    continue
 
-                    if created:
-                        logger.info('Created image %s pointing to %s in database', image, image.backend_id)
-                    elif (image.backend_id != mapping.backend_image_id or
-                            image.min_disk != backend_image.min_disk or
-                            image.min_ram != backend_image.min_ram):
-                        image.backend_id = mapping.backend_image_id
-                        image.min_ram = self.get_core_ram_size(backend_image.min_ram)
-                        image.min_disk = self.get_core_disk_size(backend_image.min_disk)
-                        image.save()
-                        logger.info('Updated existing image %s to point to %s in database', image, image.backend_id)
-                    else:
-                        logger.info('Image %s pointing to %s is already up to date', image, image.backend_id)
+                backend_image = backend_images[mapping.backend_image_id]
+                image_fields = {
+                    'backend_id': mapping.backend_image_id,
+                    'min_disk': self.get_core_disk_size(backend_image.min_disk),
+                    'min_ram': self.get_core_ram_size(backend_image.min_ram),
+                }
 
-                    current_image_ids.add(image.backend_id)
+                image = existing_images.get(template_pk)
+                if image is None:
+                    new_images.append(Image(cloud=cloud_account, template=mapping.template, **image_fields))
+                    continue
+
+                current_image_pks.add(image.pk)
+                if any(getattr(image, field) != value for field, value in image_fields.items()):
+                    Image.objects.filter(pk=image.pk).update(**image_fields)
+                    changed_images = True
+                    logger.info('Updated existing image %s to point to %s in database',
+                                image, mapping.backend_image_id)
+                else:
+                    logger.info('Image %s pointing to %s is already up to date', image, image.backend_id)
 
             # Remove stale images,
             # the ones that don't have any template mappings defined for them
+            stale_images = [image for image in existing_images.values() if image.pk not in current_image_pks]
+            if stale_images:
+                Image.objects.filter(pk__in=[image.pk for image in stale_images]).delete()
+                for image in stale_images:
+                    logger.info('Removed stale image %s, was pointing to %s in database', image, image.backend_id)
+
+            # Add missing images
+            Image.objects.bulk_create(new_images)
+            for image in new_images:
+                logger.info('Created image %s pointing to %s in database', image, image.backend_id)
 
-            for image in cloud_account.images.exclude(backend_id__in=current_image_ids):
-                image.delete()
-                logger.info('Removed stale image %s, was pointing to %s in database', image, image.backend_id)
+        # Queryset updates and bulk inserts don't send post_save
+        if new_images or stale_images or changed_images:
+            etags.bump_customer_versions([cloud_account.customer_id])
 
     # CloudProjectMembership related methods
     def push_membership(self, membership):
@@ -429,27 +654,48 @@ class OpenStackBackend(OpenStackClient):
             six.reraise(CloudBackendError, e)
 
     def push_ssh_public_key(self, membership, public_key):
-        key_name = self.get_key_name(public_key)
+        self.push_ssh_public_keys(membership, [public_key])
 
+    def push_ssh_public_keys(self, membership, public_keys):
+        """
+        Create missing keys and replace changed ones within single session,
+        keys are compared with existing keypairs of the tenant by name and fingerprint.
+        """
         try:
             session = self.create_session(membership=membership, dummy=self.dummy)
             nova = self.create_nova_client(session)
+            backend_fingerprints = {key.name: key.fingerprint for key in nova.keypairs.list()}
+        except (nova_exceptions.ClientException, keystone_exceptions.ClientException) as e:
+            logger.exception('Failed to list ssh public keys of cloud membership %s', membership.pk)
+            six.reraise(CloudBackendError, e)
+
+        failed_key_names = []
+        for public_key in public_keys:
+            key_name = self.get_key_name(public_key)
+
+            if key_name in backend_fingerprints:
+                if backend_fingerprints[key_name] == public_key.fingerprint:
+                    logger.debug('Ssh public key %s is already propagated to backend', key_name)
+                    continue
 
             try:
-                # There's no way to edit existing key inplace,
-                # so try to delete existing key with the same name first.
-                nova.keypairs.delete(key_name)
-                logger.info('Deleted stale ssh public key %s from backend', key_name)
-            except nova_exceptions.NotFound:
-                # There was no stale key, it's ok
-                pass
+                if key_name in backend_fingerprints:
+                    # There's no way to edit existing key inplace,
+                    # so delete existing key with the same name first.
+                    nova.keypairs.delete(key_name)
+                    logger.info('Deleted stale ssh public key %s from backend', key_name)
+
+                logger.info('Propagating ssh public key %s to backend', key_name)
+                nova.keypairs.create(name=key_name, public_key=public_key.public_key)
+                logger.info('Successfully propagated ssh public key %s to backend', key_name)
+                # Another occurrence of the same key must not be created again
+                backend_fingerprints[key_name] = public_key.fingerprint
+            except nova_exceptions.ClientException:
+                logger.exception('Failed to propagate ssh public key %s to backend', key_name)
+                failed_key_names.append(key_name)
 
-            logger.info('Propagating ssh public key %s to backend', key_name)
-            nova.keypairs.create(name=key_name, public_key=public_key.public_key)
-            logger.info('Successfully propagated ssh public key %s to backend', key_name)
-        except (nova_exceptions.ClientException, keystone_exceptions.ClientException) as e:
-            logger.exception('Failed to propagate ssh public key %s to backend', key_name)
-            six.reraise(CloudBackendError, e)
+        if failed_key_names:
+            raise CloudBackendError('Failed to propagate ssh public keys %s' % ', '.join(failed_key_names))
 
     def push_membership_quotas(self, membership, quotas):
         # mapping to openstack terminology for quotas
@@ -508,9 +754,10 @@ class OpenStackBackend(OpenStackClient):
 
         nc_security_groups = SecurityGroup.objects.filter(
             cloud_project_membership=membership,
-        )
+        ).prefetch_related('rules')
 
         try:
+            # groups are listed together with their rules
             backend_security_groups = dict((str(g.id), g) for g in nova.security_groups.list())
         except nova_exceptions.ClientException as e:
             logger.exception('Failed to get openstack security groups for membership %s', membership.id)
@@ -545,9 +792,11 @@ class OpenStackBackend(OpenStackClient):
         # updating unsynchronized security groups
         for nc_group in unsynchronized_groups:
             logger.debug('About to update security group %s in backend', nc_group.uuid)
+            backend_group = backend_security_groups[nc_group.backend_id]
             try:
-                self.update_security_group(nc_group, nova)
-                self.push_security_group_rules(nc_group, nova)
+                if backend_group.name != nc_group.name:
+                    self.update_security_group(nc_group, nova)
+                self.push_security_group_rules(nc_group, nova, backend_group)
             except nova_exceptions.ClientException:
                 logger.exception('Failed to update security group %s in backend', nc_group.uuid)
             else:
@@ -557,8 +806,8 @@ class OpenStackBackend(OpenStackClient):
         for nc_group in nonexistent_groups:
             logger.debug('About to create security group %s in backend', nc_group.uuid)
             try:
-                self.create_security_group(nc_group, nova)
-                self.push_security_group_rules(nc_group, nova)
+                backend_group = self.create_security_group(nc_group, nova)
+                self.push_security_group_rules(nc_group, nova, backend_group)
             except nova_exceptions.ClientException:
                 logger.exception('Failed to create openstack security group with for %s in backend', nc_group.uuid)
             else:
@@ -586,38 +835,34 @@ class OpenStackBackend(OpenStackClient):
 
         from nodeconductor.iaas.models import SecurityGroup
 
-        extra_groups = SecurityGroup.objects.filter(
+        nc_security_groups = list(SecurityGroup.objects.filter(
             cloud_project_membership=membership,
-        ).exclude(
-            backend_id__in=[g.id for g in backend_security_groups],
-        )
+        ).prefetch_related('rules'))
+        nc_security_groups_by_backend_id = dict((g.backend_id, g) for g in nc_security_groups)
+        matched_group_pks = set()
 
         with transaction.atomic():
             for backend_group in backend_security_groups:
-                try:
-                    nc_group = SecurityGroup.objects.get(
-                        backend_id=backend_group.id,
-                        cloud_project_membership=membership,
-                    )
-                    if not self._are_security_groups_equal(backend_group, nc_group):
-                        unsynchronized_groups.append(backend_group)
-                except SecurityGroup.DoesNotExist:
+                nc_group = nc_security_groups_by_backend_id.get(str(backend_group.id))
+                if nc_group is None:
                     nonexistent_groups.append(backend_group)
+                    continue
+
+                matched_group_pks.add(nc_group.pk)
+                if not self._are_security_groups_equal(backend_group, nc_group):
+                    unsynchronized_groups.append((backend_group, nc_group))
 
             # deleting extra security groups
-            extra_groups.delete()
+            extra_group_pks = [g.pk for g in nc_security_groups if g.pk not in matched_group_pks]
+            SecurityGroup.objects.filter(pk__in=extra_group_pks).delete()
             logger.info('Deleted stale security groups in database')
 
             # synchronizing unsynchronized security groups
-            for backend_group in unsynchronized_groups:
-                nc_security_group = SecurityGroup.objects.get(
-                    backend_id=backend_group.id,
-                    cloud_project_membership=membership,
-                )
+            for backend_group, nc_security_group in unsynchronized_groups:
                 if backend_group.name != nc_security_group.name:
                     nc_security_group.name = backend_group.name
                     nc_security_group.save()
-                self.pull_security_group_rules(nc_security_group, nova)
+                self.pull_security_group_rules(nc_security_group, nova, backend_group)
             logger.info('Updated existing security groups in database')
 
             # creating non-existed security groups
@@ -627,7 +872,7 @@ class OpenStackBackend(OpenStackClient):
                     name=backend_group.name,
                     cloud_project_membership=membership,
                 )
-                self.pull_security_group_rules(nc_security_group, nova)
+                self.pull_security_group_rules(nc_security_group, nova, backend_group)
                 logger.info('Created new security group %s in database', nc_security_group.uuid)
 
     def pull_instances(self, membership):
@@ -836,19 +1081,25 @@ class OpenStackBackend(OpenStackClient):
         if not service_stats:
             service_stats = self.get_resource_stats(cloud_account.auth_url)
 
-        cloud_stats = dict((s.key, s) for s in cloud_account.stats.all())
-        for key, val in service_stats.items():
-            stats = cloud_stats.pop(key, None)
-            if stats:
-                stats.value = val
-                stats.save()
-            else:
-                cloud_account.stats.create(key=key, value=val)
+        self.save_service_statistics([cloud_account], service_stats)
+        return service_stats
 
-        if cloud_stats:
-            cloud_account.stats.delete(key__in=cloud_stats.keys())
+    def save_service_statistics(self, cloud_accounts, service_stats):
+        """
+        Replace statistics of clouds sharing the same endpoint with a single bulk insert.
+        """
+        from nodeconductor.iaas.models import ServiceStatistics
 
-        return service_stats
+        with transaction.atomic():
+            ServiceStatistics.objects.filter(cloud__in=cloud_accounts).delete()
+            ServiceStatistics.objects.bulk_create([
+                ServiceStatistics(cloud=cloud_account, key=key, value=value)
+                for cloud_account in cloud_accounts
+                for key, value in service_stats.items()
+            ])
+
+        # Bulk inserts don't send post_save
+        etags.bump_customer_versions(set(cloud_account.customer_id for cloud_account in cloud_accounts))
 
     # Instance related methods
     def provision_instance(self, instance, backend_flavor_id, system_volume_id=None, data_volume_id=None):
@@ -1354,12 +1605,21 @@ class OpenStackBackend(OpenStackClient):
             session = self.create_session(membership=membership, dummy=self.dummy)
             cinder = self.create_cinder_client(session)
 
-            snapshot_ids = []
-            for volume_id in volume_ids:
-                # create a temporary snapshot
-                snapshot = self.create_snapshot(volume_id, cinder)
+            # Issue all snapshot requests first and wait for them together,
+            # so that backup takes as long as the slowest snapshot
+            snapshots = [
+                cinder.volume_snapshots.create(
+                    volume_id, force=True, display_name='snapshot_from_volume_%s' % volume_id)
+                for volume_id in volume_ids
+            ]
+            snapshot_ids = [snapshot.id for snapshot in snapshots]
+
+            if not self._wait_for_snapshots_status(snapshot_ids, cinder, 'available', 'error'):
+                logger.error('Timed out creating snapshots for volumes %s', ', '.join(volume_ids))
+                raise CloudBackendInternalError()
+
+            for snapshot in snapshots:
                 membership.add_quota_usage('storage', self.get_core_disk_size(snapshot.size))
-                snapshot_ids.append(snapshot.id)
 
         except (cinder_exceptions.ClientException,
                 keystone_exceptions.ClientException, CloudBackendInternalError) as e:
@@ -1375,12 +1635,19 @@ class OpenStackBackend(OpenStackClient):
             session = self.create_session(membership=membership, dummy=self.dummy)
             cinder = self.create_cinder_client(session)
 
-            promoted_volume_ids = []
-            for snapshot_id in snapshot_ids:
-                # volume
-                snapshot = cinder.volume_snapshots.get(snapshot_id)
-                promoted_volume_id = self.create_volume_from_snapshot(snapshot_id, cinder, prefix=prefix)
-                promoted_volume_ids.append(promoted_volume_id)
+            snapshots = [cinder.volume_snapshots.get(snapshot_id) for snapshot_id in snapshot_ids]
+            promoted_volume_ids = [
+                cinder.volumes.create(
+                    snapshot.size, snapshot_id=snapshot.id,
+                    display_name=prefix + (' %s' % snapshot.volume_id)).id
+                for snapshot in snapshots
+            ]
+
+            if not self._wait_for_volumes_status(promoted_volume_ids, cinder, 'available', 'error'):
+                logger.error('Timed out creating volumes from snapshots %s', ', '.join(snapshot_ids))
+                raise CloudBackendInternalError()
+
+            for snapshot in snapshots:
                 # volume size should be equal to a snapshot size
                 membership.add_quota_usage('storage', self.get_core_disk_size(snapshot.size))
 
@@ -1423,13 +1690,23 @@ class OpenStackBackend(OpenStackClient):
             session = self.create_session(membership=membership, dummy=self.dummy)
             cinder = self.create_cinder_client(session)
 
+            sizes = dict(
+                (snapshot_id, cinder.volume_snapshots.get(snapshot_id).size)
+                for snapshot_id in snapshot_ids
+            )
+
+            if not self._wait_for_snapshots_status(
+                    snapshot_ids, cinder, 'available', 'error', poll_interval=60, retries=30):
+                logger.exception('Timed out waiting for snapshots %s to become available', ', '.join(snapshot_ids))
+                raise CloudBackendInternalError()
+
             for snapshot_id in snapshot_ids:
-                # volume
-                size = cinder.volume_snapshots.get(snapshot_id).size
-                self.delete_snapshot(snapshot_id, cinder)
+                cinder.volume_snapshots.delete(snapshot_id)
 
-                if self._wait_for_snapshot_deletion(snapshot_id, cinder):
-                    membership.add_quota_usage('storage', -self.get_core_disk_size(size))
+            deleted_snapshot_ids = self._wait_for_snapshots_deletion(snapshot_ids, cinder)
+            for snapshot_id in snapshot_ids:
+                if snapshot_id in deleted_snapshot_ids:
+                    membership.add_quota_usage('storage', -self.get_core_disk_size(sizes[snapshot_id]))
                 else:
                     logger.exception('Failed to delete snapshot %s', snapshot_id)
 
@@ -1623,6 +1900,7 @@ class OpenStackBackend(OpenStackClient):
         backend_security_group = nova.security_groups.create(name=security_group.name, description='')
         security_group.backend_id = backend_security_group.id
         security_group.save()
+        return backend_security_group
 
     def update_security_group(self, security_group, nova):
         backend_security_group = nova.security_groups.find(id=security_group.backend_id)
@@ -1632,31 +1910,39 @@ class OpenStackBackend(OpenStackClient):
     def delete_security_group(self, backend_id, nova):
         nova.security_groups.delete(backend_id)
 
-    def push_security_group_rules(self, security_group, nova):
-        backend_security_group = nova.security_groups.get(group_id=security_group.backend_id)
-        backend_rules = {
-            rule['id']: self._normalize_security_group_rule(rule)
-            for rule in backend_security_group.rules
-        }
+    def push_security_group_rules(self, security_group, nova, backend_security_group=None):
+        """
+        Create and delete backend rules so that they match rules of security group,
+        rules are compared by their parameters, so matching rules are left untouched.
+        """
+        if backend_security_group is None:
+            backend_security_group = nova.security_groups.get(group_id=security_group.backend_id)
+
+        # backend rule ids by rule parameters
+        backend_rule_ids = defaultdict(list)
+        for rule in backend_security_group.rules:
+            rule = self._normalize_security_group_rule(rule)
+            backend_rule_ids[self._get_backend_rule_key(rule)].append(rule['id'])
 
         # list of nc rules, that do not exist in openstack
         nonexistent_rules = []
-        # list of nc rules, that have wrong parameters in in openstack
-        unsynchronized_rules = []
-        # list of os rule ids, that exist in openstack and do not exist in nc
-        extra_rule_ids = backend_rules.keys()
+        # nc rules which backend ids have to be updated
+        changed_backend_ids = {}
 
         for nc_rule in security_group.rules.all():
-            if nc_rule.backend_id not in backend_rules:
+            rule_ids = backend_rule_ids.get(self._get_nc_rule_key(nc_rule))
+            if not rule_ids:
                 nonexistent_rules.append(nc_rule)
-            else:
-                backend_rule = backend_rules[nc_rule.backend_id]
-                if not self._are_rules_equal(backend_rule, nc_rule):
-                    unsynchronized_rules.append(nc_rule)
-                extra_rule_ids.remove(nc_rule.backend_id)
+                continue
+
+            # prefer backend rule which is already linked to nc rule
+            backend_id = nc_rule.backend_id if nc_rule.backend_id in rule_ids else rule_ids[0]
+            rule_ids.remove(backend_id)
+            if nc_rule.backend_id != backend_id:
+                changed_backend_ids[nc_rule.pk] = backend_id
 
-        # deleting extra rules
-        for backend_rule_id in extra_rule_ids:
+        # deleting extra rules, the ones left unmatched
+        for backend_rule_id in chain.from_iterable(backend_rule_ids.values()):
             logger.debug('About to delete security group rule with id %s in backend', backend_rule_id)
             try:
                 nova.security_group_rules.delete(backend_rule_id)
@@ -1666,20 +1952,8 @@ class OpenStackBackend(OpenStackClient):
             else:
                 logger.info('Security group rule with id %s successfully deleted in backend', backend_rule_id)
 
-        # deleting unsynchronized rules
-        for nc_rule in unsynchronized_rules:
-            logger.debug('About to delete security group rule with id %s', nc_rule.backend_id)
-            try:
-                nova.security_group_rules.delete(nc_rule.backend_id)
-            except nova_exceptions.ClientException:
-                logger.exception('Failed to remove rule with id %s from security group %s in backend',
-                                 nc_rule.backend_id, security_group)
-            else:
-                logger.info('Security group rule with id %s successfully deleted in backend',
-                            nc_rule.backend_id)
-
-        # creating nonexistent and unsynchronized rules
-        for nc_rule in unsynchronized_rules + nonexistent_rules:
+        # creating nonexistent rules
+        for nc_rule in nonexistent_rules:
             logger.debug('About to create security group rule with id %s in backend', nc_rule.id)
             try:
                 # The database has empty strings instead of nulls
@@ -1688,7 +1962,7 @@ class OpenStackBackend(OpenStackClient):
                 else:
                     nc_rule_protocol = nc_rule.protocol
 
-                nova.security_group_rules.create(
+                backend_rule = nova.security_group_rules.create(
                     parent_group_id=security_group.backend_id,
                     ip_protocol=nc_rule_protocol,
                     from_port=nc_rule.from_port,
@@ -1699,55 +1973,100 @@ class OpenStackBackend(OpenStackClient):
                 logger.exception('Failed to create rule %s for security group %s in backend',
                                  nc_rule, security_group)
             else:
+                changed_backend_ids[nc_rule.pk] = str(backend_rule.id)
                 logger.info('Security group rule with id %s successfully created in backend', nc_rule.id)
 
-    def pull_security_group_rules(self, security_group, nova):
-        backend_security_group = nova.security_groups.get(group_id=security_group.backend_id)
+        bulk_update([models.SecurityGroupRule(pk=rule_pk, backend_id=backend_id)
+                     for rule_pk, backend_id in changed_backend_ids.items()], ['backend_id'])
+
+        # Queryset updates don't send post_save
+        if changed_backend_ids:
+            etags.bump_customer_versions(etags.get_customer_ids(security_group))
+
+    def pull_security_group_rules(self, security_group, nova, backend_security_group=None):
+        """
+        Make rules of security group match backend ones with minimal number of database changes.
+        """
+        if backend_security_group is None:
+            backend_security_group = nova.security_groups.get(group_id=security_group.backend_id)
         backend_rules = [
             self._normalize_security_group_rule(r)
             for r in backend_security_group.rules
         ]
 
+        # nc rules by backend id and the ones without it
+        nc_rules = {}
+        nc_rules_without_backend_id = []
+        for nc_rule in security_group.rules.all():
+            if nc_rule.backend_id and nc_rule.backend_id not in nc_rules:
+                nc_rules[nc_rule.backend_id] = nc_rule
+            else:
+                nc_rules_without_backend_id.append(nc_rule)
+
+        # openstack rules, that are not linked to nc rules
+        unlinked_rules = []
+        # nc rules with fields to update
+        changed_rules = []
+
+        for backend_rule in backend_rules:
+            nc_rule = nc_rules.pop(backend_rule['id'], None)
+            if nc_rule is None:
+                unlinked_rules.append(backend_rule)
+            elif not self._are_rules_equal(backend_rule, nc_rule):
+                changed_rules.append((nc_rule, backend_rule))
+
+        # nc rules, that are not linked to openstack rules, by rule parameters
+        unlinked_nc_rules = defaultdict(list)
+        for nc_rule in chain(nc_rules.values(), nc_rules_without_backend_id):
+            unlinked_nc_rules[self._get_nc_rule_key(nc_rule)].append(nc_rule)
+
         # list of openstack rules, that do not exist in nc
         nonexistent_rules = []
-        # list of openstack rules, that have wrong parameters in in nc
-        unsynchronized_rules = []
-        # list of nc rules, that have do not exist in openstack
-        extra_rules = security_group.rules.exclude(backend_id__in=[r['id'] for r in backend_rules])
+
+        for backend_rule in unlinked_rules:
+            same_nc_rules = unlinked_nc_rules.get(self._get_backend_rule_key(backend_rule))
+            if same_nc_rules:
+                changed_rules.append((same_nc_rules.pop(), backend_rule))
+            else:
+                nonexistent_rules.append(backend_rule)
 
         with transaction.atomic():
-            for backend_rule in backend_rules:
-                try:
-                    nc_rule = security_group.rules.get(backend_id=backend_rule['id'])
-                    if not self._are_rules_equal(backend_rule, nc_rule):
-                        unsynchronized_rules.append(backend_rule)
-                except security_group.rules.model.DoesNotExist:
-                    nonexistent_rules.append(backend_rule)
-
-            # deleting extra rules
-            extra_rules.delete()
-            logger.info('Deleted stale security group rules in database')
-
-            # synchronizing unsynchronized rules
-            for backend_rule in unsynchronized_rules:
-                security_group.rules.filter(backend_id=backend_rule['id']).update(
-                    from_port=backend_rule['from_port'],
-                    to_port=backend_rule['to_port'],
-                    protocol=backend_rule['ip_protocol'],
-                    cidr=backend_rule['ip_range']['cidr'],
-                )
-            logger.info('Updated existing security group rules in database')
+            # deleting extra rules, the ones left unmatched
+            extra_rule_pks = [nc_rule.pk for nc_rule in chain.from_iterable(unlinked_nc_rules.values())]
+            if extra_rule_pks:
+                security_group.rules.filter(pk__in=extra_rule_pks).delete()
+                logger.info('Deleted stale security group rules in database')
+
+            # synchronizing changed rules
+            for nc_rule, backend_rule in changed_rules:
+                nc_rule.from_port = backend_rule['from_port']
+                nc_rule.to_port = backend_rule['to_port']
+                nc_rule.protocol = backend_rule['ip_protocol']
+                nc_rule.cidr = backend_rule['ip_range']['cidr']
+                nc_rule.backend_id = backend_rule['id']
+            bulk_update([nc_rule for nc_rule, _ in changed_rules],
+                        ['from_port', 'to_port', 'protocol', 'cidr', 'backend_id'])
+            if changed_rules:
+                logger.info('Updated existing security group rules in database')
 
             # creating non-existed rules
-            for backend_rule in nonexistent_rules:
-                rule = security_group.rules.create(
+            security_group.rules.model.objects.bulk_create([
+                security_group.rules.model(
+                    group=security_group,
                     from_port=backend_rule['from_port'],
                     to_port=backend_rule['to_port'],
                     protocol=backend_rule['ip_protocol'],
                     cidr=backend_rule['ip_range']['cidr'],
                     backend_id=backend_rule['id'],
                 )
-                logger.info('Created new security group rule %s in database', rule.id)
+                for backend_rule in nonexistent_rules
+            ])
+            if nonexistent_rules:
+                logger.info('Created %s new security group rules in database', len(nonexistent_rules))
+
+        # Queryset updates and bulk inserts don't send post_save
+        if changed_rules or nonexistent_rules:
+            etags.bump_customer_versions(etags.get_customer_ids(security_group))
 
     def get_or_create_user(self, membership, keystone):
         # Try to sign in if credentials are already stored in membership
@@ -1926,6 +2245,47 @@ class OpenStackBackend(OpenStackClient):
         else:
             return False
 
+    def _wait_for_volumes_status(self, volume_ids, cinder, complete_status,
+                                 error_status=None, retries=300, poll_interval=3):
+        return self._wait_for_objects_status(
+            volume_ids, cinder.volumes.get, complete_status, error_status, retries, poll_interval)
+
+    def _wait_for_snapshots_status(self, snapshot_ids, cinder, complete_status, error_status,
+                                   retries=90, poll_interval=3):
+        return self._wait_for_objects_status(
+            snapshot_ids, cinder.volume_snapshots.get, complete_status, error_status, retries, poll_interval)
+
+    def _wait_for_objects_status(self, obj_ids, client_get_method, complete_status, error_status=None,
+                                 retries=30, poll_interval=3):
+        """
+        Wait for several backend objects at once.
+
+        Returns True only if every object has reached complete status,
+        False as soon as any of them reaches error status or on timeout.
+        """
+        pending_ids = list(obj_ids)
+
+        for _ in range(retries):
+            still_pending_ids = []
+            for obj_id in pending_ids:
+                obj = client_get_method(obj_id)
+
+                if obj.status == complete_status:
+                    continue
+
+                if error_status is not None and obj.status == error_status:
+                    return False
+
+                still_pending_ids.append(obj_id)
+
+            pending_ids = still_pending_ids
+            if not pending_ids:
+                return True
+
+            time.sleep(poll_interval)
+        else:
+            return False
+
     def _wait_for_volume_deletion(self, volume_id, cinder, retries=90, poll_interval=3):
         try:
             for _ in range(retries):
@@ -1946,6 +2306,28 @@ class OpenStackBackend(OpenStackClient):
         except cinder_exceptions.NotFound:
             return True
 
+    def _wait_for_snapshots_deletion(self, snapshot_ids, cinder, retries=90, poll_interval=3):
+        """
+        Wait for several snapshots to disappear from backend.
+
+        Returns ids of the snapshots that were deleted before timeout.
+        """
+        pending_ids = list(snapshot_ids)
+
+        for _ in range(retries):
+            for snapshot_id in list(pending_ids):
+                try:
+                    cinder.volume_snapshots.get(snapshot_id)
+                except cinder_exceptions.NotFound:
+                    pending_ids.remove(snapshot_id)
+
+            if not pending_ids:
+                break
+
+            time.sleep(poll_interval)
+
+        return [snapshot_id for snapshot_id in snapshot_ids if snapshot_id not in pending_ids]
+
     def _wait_for_instance_deletion(self, backend_instance_id, nova, retries=90, poll_interval=3):
         try:
             for _ in range(retries):
@@ -2245,29 +2627,31 @@ class OpenStackBackend(OpenStackClient):
 
         return new_server.id
 
+    def _get_backend_rule_key(self, backend_rule):
+        return (
+            backend_rule['ip_protocol'] or '',
+            backend_rule['from_port'],
+            backend_rule['to_port'],
+            backend_rule['ip_range'].get('cidr', ''),
+        )
+
+    def _get_nc_rule_key(self, nc_rule):
+        return nc_rule.protocol, nc_rule.from_port, nc_rule.to_port, nc_rule.cidr
+
     def _are_rules_equal(self, backend_rule, nc_rule):
         """
         Check equality of significant parameters in openstack and nodeconductor rules
         """
-        if backend_rule['from_port'] != nc_rule.from_port:
-            return False
-        if backend_rule['to_port'] != nc_rule.to_port:
-            return False
-        if backend_rule['ip_protocol'] != nc_rule.protocol:
-            return False
-        if backend_rule['ip_range'].get('cidr', '') != nc_rule.cidr:
-            return False
-        return True
+        return self._get_backend_rule_key(backend_rule) == self._get_nc_rule_key(nc_rule)
 
     def _are_security_groups_equal(self, backend_security_group, nc_security_group):
         if backend_security_group.name != nc_security_group.name:
             return False
-        if len(backend_security_group.rules) != nc_security_group.rules.count():
-            return False
-        for backend_rule, nc_rule in zip(backend_security_group.rules, nc_security_group.rules.all()):
-            if not self._are_rules_equal(backend_rule, nc_rule):
-                return False
-        return True
+        backend_rule_keys = sorted(
+            self._get_backend_rule_key(self._normalize_security_group_rule(rule))
+            for rule in backend_security_group.rules)
+        nc_rule_keys = sorted(self._get_nc_rule_key(rule) for rule in nc_security_group.rules.all())
+        return backend_rule_keys == nc_rule_keys
 
     def _get_instance_volumes(self, nova, cinder, backend_instance_id):
         try:
@@ -2330,6 +2714,9 @@ class OpenStackBackend(OpenStackClient):
             return cores, ram
 
     def _normalize_security_group_rule(self, rule):
+        # nova-network rule ids are integers, backend_id is a string
+        rule['id'] = str(rule['id'])
+
         if rule['ip_protocol'] is None:
             rule['ip_protocol'] = ''
 
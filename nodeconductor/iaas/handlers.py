@@ -42,14 +42,30 @@ def sync_openstack_settings(app_config, using=DEFAULT_DB_ALIAS, **kwargs):
             queryset.create(**opts)
 
 
+def _get_visible_cloud_ids(request):
+    # Calculated once per request, as the same request is used for all objects of a list
+    try:
+        return request.visible_cloud_ids
+    except AttributeError:
+        from nodeconductor.iaas.models import Cloud
+
+        queryset = filter_queryset_for_user(Cloud.objects.all(), request.user)
+        request.visible_cloud_ids = set(queryset.values_list('pk', flat=True))
+        return request.visible_cloud_ids
+
+
 def filter_clouds(clouds, request):
-    related_clouds = clouds.all()
+    # Clouds can be prefetched, so filter them in memory
+    related_clouds = list(clouds.all())
 
     try:
         user = request.user
-        related_clouds = filter_queryset_for_user(related_clouds, user)
     except AttributeError:
         pass
+    else:
+        if not user.is_staff:
+            visible_cloud_ids = _get_visible_cloud_ids(request)
+            related_clouds = [cloud for cloud in related_clouds if cloud.pk in visible_cloud_ids]
 
     from nodeconductor.iaas.serializers import BasicCloudSerializer
 
@@ -79,7 +95,7 @@ def propagate_new_users_key_to_his_projects_clouds(sender, instance=None, create
         # Note: importing here to avoid circular import hell
         from nodeconductor.iaas import tasks
 
-        tasks.push_ssh_public_keys.delay([public_key.uuid.hex], list(membership_pks))
+        tasks.schedule_ssh_public_keys_push([public_key.uuid.hex], list(membership_pks))
 
 
 def propagate_users_keys_to_clouds_of_newly_granted_project(sender, structure, user, role, **kwargs):
@@ -97,7 +113,7 @@ def propagate_users_keys_to_clouds_of_newly_granted_project(sender, structure, u
         # Note: importing here to avoid circular import hell
         from nodeconductor.iaas import tasks
 
-        tasks.push_ssh_public_keys.delay(
+        tasks.schedule_ssh_public_keys_push(
             list(ssh_public_key_uuids), list(membership_pks))
 
 
@@ -239,3 +255,16 @@ def check_instance_name_update(sender, instance=None, created=False, **kwargs):
     if old_name != instance.name:
         from nodeconductor.iaas.tasks.zabbix import zabbix_update_host_visible_name
         zabbix_update_host_visible_name.delay(instance.uuid)
+
+
+def increase_instance_license_stats(sender, instance=None, created=False, **kwargs):
+    if created:
+        InstanceLicenseStats = apps.get_model('iaas', 'InstanceLicenseStats')
+        InstanceLicenseStats.add(
+            instance.instance.cloud_project_membership.project_id, instance.template_license_id)
+
+
+def decrease_instance_license_stats(sender, instance=None, **kwargs):
+    InstanceLicenseStats = apps.get_model('iaas', 'InstanceLicenseStats')
+    InstanceLicenseStats.subtract(
+        instance.instance.cloud_project_membership.project_id, instance.template_license_id)
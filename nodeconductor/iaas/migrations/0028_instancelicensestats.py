@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.db.models import Count
+
+
+def init_instance_license_stats(apps, schema_editor):
+    InstanceLicense = apps.get_model('iaas', 'InstanceLicense')
+    InstanceLicenseStats = apps.get_model('iaas', 'InstanceLicenseStats')
+
+    rows = InstanceLicense.objects.values(
+        'instance__cloud_project_membership__project', 'template_license',
+    ).annotate(count=Count('id'))
+
+    InstanceLicenseStats.objects.bulk_create([
+        InstanceLicenseStats(
+            project_id=row['instance__cloud_project_membership__project'],
+            template_license_id=row['template_license'],
+            licenses_count=row['count'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('structure', '0006_inherit_namemixin'),
+        ('iaas', '0027_refactor_cron_schedule_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstanceLicenseStats',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('licenses_count', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(related_name='+', to='structure.Project')),
+                ('template_license', models.ForeignKey(related_name='+', to='iaas.TemplateLicense')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='instancelicensestats',
+            unique_together=set([('project', 'template_license')]),
+        ),
+        migrations.RunPython(init_instance_license_stats),
+    ]
@@ -557,6 +557,41 @@ class InstanceLicense(core_models.UuidMixin, models.Model):
         return 'License: %s for %s' % (self.template_license, self.instance)
 
 
+@python_2_unicode_compatible
+class InstanceLicenseStats(models.Model):
+    """
+    Number of instance licenses of template license within project.
+
+    Rollup is maintained on creation and deletion of instance licenses,
+    project groups are joined through project on aggregation.
+    """
+    project = models.ForeignKey(structure_models.Project, related_name='+')
+    template_license = models.ForeignKey(TemplateLicense, related_name='+')
+    licenses_count = models.PositiveIntegerField(default=0)
+
+    class Meta(object):
+        unique_together = ('project', 'template_license')
+
+    class Permissions(object):
+        customer_path = 'project__customer'
+        project_path = 'project'
+        project_group_path = 'project__project_groups'
+
+    @classmethod
+    def add(cls, project_id, template_license_id, count=1):
+        stats, _ = cls.objects.get_or_create(project_id=project_id, template_license_id=template_license_id)
+        cls.objects.filter(pk=stats.pk).update(licenses_count=models.F('licenses_count') + count)
+
+    @classmethod
+    def subtract(cls, project_id, template_license_id, count=1):
+        cls.objects.filter(
+            project_id=project_id, template_license_id=template_license_id, licenses_count__gte=count,
+        ).update(licenses_count=models.F('licenses_count') - count)
+
+    def __str__(self):
+        return '%s licenses: %s in %s' % (self.licenses_count, self.template_license, self.project)
+
+
 @python_2_unicode_compatible
 class SecurityGroup(core_models.UuidMixin,
                     core_models.DescribableMixin,
@@ -717,6 +717,15 @@ class ServiceSerializer(serializers.Serializer):
             'url': {'lookup_field': 'uuid'},
         }
 
+    def __init__(self, *args, **kwargs):
+        super(ServiceSerializer, self).__init__(*args, **kwargs)
+        # TODO: this could use something similar to backup's generic model for all resources
+        self.service_url_field = serializers.HyperlinkedRelatedField(
+            view_name='service-detail',
+            lookup_field='uuid',
+            read_only=True,
+        )
+
     def get_project_url(self, obj):
         try:
             request = self.context['request']
@@ -733,6 +742,11 @@ class ServiceSerializer(serializers.Serializer):
             period = self.context['period']
         except (KeyError, AttributeError):
             raise AttributeError('ServiceSerializer has to be initialized with `request` in context')
+
+        # Services list prefetches SLA of requested period for the whole page
+        if hasattr(obj, 'period_slas'):
+            return obj.period_slas[0].value if obj.period_slas else None
+
         try:
             return models.InstanceSlaHistory.objects.get(instance=obj, period=period).value
         except models.InstanceSlaHistory.DoesNotExist:
@@ -744,15 +758,7 @@ class ServiceSerializer(serializers.Serializer):
         except (KeyError, AttributeError):
             raise AttributeError('ServiceSerializer has to be initialized with `request` in context')
 
-        # TODO: this could use something similar to backup's generic model for all resources
-        view_name = 'service-detail'
-        service_instance = obj
-        hyperlinked_field = serializers.HyperlinkedRelatedField(
-            view_name=view_name,
-            lookup_field='uuid',
-            read_only=True,
-        )
-        return hyperlinked_field.get_url(service_instance, view_name, request, format=None)
+        return self.service_url_field.get_url(obj, self.service_url_field.view_name, request, format=None)
 
     # TODO: this shouldn't come from this endpoint, but UI atm depends on it
     def get_project_groups(self, obj):
@@ -762,8 +768,9 @@ class ServiceSerializer(serializers.Serializer):
             raise AttributeError('ServiceSerializer has to be initialized with `request` in context')
 
         service_instance = obj
+        # Pass the manager: serializer clones a queryset with .all() dropping the prefetched groups
         groups = structure_serializers.BasicProjectGroupSerializer(
-            service_instance.cloud_project_membership.project.project_groups.all(),
+            service_instance.cloud_project_membership.project.project_groups,
             many=True,
             read_only=True,
             context={'request': request}
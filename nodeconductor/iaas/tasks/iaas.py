@@ -2,15 +2,20 @@
 from __future__ import absolute_import, unicode_literals
 
 import logging
+from itertools import groupby
+from operator import itemgetter
 
-from celery import shared_task
+from celery import group, shared_task
+from celery.exceptions import MaxRetriesExceededError
 
 from nodeconductor.core import models as core_models
 from nodeconductor.core.models import SynchronizationStates
 from nodeconductor.core.tasks import tracked_processing, set_state, StateChangeError
 from nodeconductor.core.log import EventLoggerAdapter
+from nodeconductor.core.metrics import get_redis
 from nodeconductor.iaas import models
 from nodeconductor.iaas.backend import CloudBackendError
+from nodeconductor.iaas.tasks.services import split_services_by_endpoint
 from nodeconductor.monitoring.zabbix.api_client import ZabbixApiClient
 from nodeconductor.monitoring.zabbix.errors import ZabbixError
 
@@ -158,20 +163,29 @@ def pull_service_statistics():
     # TODO: Extract to a service
     queryset = models.Cloud.objects.filter(state=SynchronizationStates.IN_SYNC)
 
-    services = {}
-    for cloud in queryset.iterator():
-        services.setdefault(cloud.auth_url, [])
-        services[cloud.auth_url].append(cloud)
+    # statistics are requested once per endpoint, every endpoint by its own task
+    lanes = split_services_by_endpoint(queryset, concurrency=1)
+    if lanes:
+        group(
+            pull_endpoint_statistics.si(lane[0].auth_url, [cloud.pk for cloud in lane])
+            for lane in lanes
+        ).apply_async()
 
-    for auth_url in services:
-        stats, backend = None, None
-        for cloud in services[auth_url]:
-            if not backend:
-                backend = cloud.get_backend()
-            if stats:
-                backend.pull_service_statistics(cloud, service_stats=stats)
-            else:
-                stats = backend.pull_service_statistics(cloud)
+
+@shared_task
+def pull_endpoint_statistics(auth_url, cloud_pks):
+    clouds = list(models.Cloud.objects.filter(pk__in=cloud_pks, state=SynchronizationStates.IN_SYNC))
+    if not clouds:
+        return
+
+    backend = clouds[0].get_backend()
+    try:
+        service_stats = backend.get_resource_stats(auth_url)
+    except CloudBackendError:
+        logger.warn('Failed to pull statistics of endpoint %s', auth_url, exc_info=1)
+        return
+
+    backend.save_service_statistics(clouds, service_stats)
 
 
 @shared_task
@@ -218,21 +232,22 @@ def sync_cloud_membership(membership_pk):
     backend.push_membership(membership)
 
     # Propagate ssh public keys of users involved in the project
-    for public_key in core_models.SshPublicKey.objects.filter(
-            user__groups__projectrole__project=membership.project).iterator():
-        try:
-            backend.push_ssh_public_key(membership, public_key)
-        except CloudBackendError:
-            logger.warn(
-                'Failed to push public key %s to cloud membership %s',
-                public_key.uuid, membership.pk,
-                exc_info=1,
-            )
-            event_logger.warning(
-                'Failed to push public key %s to cloud membership %s.',
-                public_key.uuid, membership.pk,
-                extra={'project': membership.project, 'cloud': membership.cloud, 'event_type': 'sync_cloud_membership'}
-            )
+    # User with several roles in the project is joined several times
+    public_keys = core_models.SshPublicKey.objects.filter(
+        user__groups__projectrole__project=membership.project).distinct()
+    try:
+        backend.push_ssh_public_keys(membership, public_keys)
+    except CloudBackendError:
+        logger.warn(
+            'Failed to push public keys to cloud membership %s',
+            membership.pk,
+            exc_info=1,
+        )
+        event_logger.warning(
+            'Failed to push public keys to cloud membership %s.',
+            membership.pk,
+            extra={'project': membership.project, 'cloud': membership.cloud, 'event_type': 'sync_cloud_membership'}
+        )
 
     # Propagate membership security groups
     try:
@@ -261,50 +276,129 @@ def sync_cloud_membership(membership_pk):
         )
 
 
+# Requests to push keys to a membership arriving within this delay are merged into a single push
+SSH_PUBLIC_KEYS_PUSH_DELAY = 10
+SSH_PUBLIC_KEYS_PUSH_RETRY_DELAY = 60
+SSH_PUBLIC_KEYS_PUSH_MAX_RETRIES = 10
+
+PENDING_SSH_PUBLIC_KEYS_KEY = 'nc:iaas:ssh_public_keys:pending:%s'
+SCHEDULED_SSH_PUBLIC_KEYS_PUSH_KEY = 'nc:iaas:ssh_public_keys:scheduled:%s'
+# Keep pending keys until the last retry of push is over
+SSH_PUBLIC_KEYS_PUSH_TIMEOUT = (
+    SSH_PUBLIC_KEYS_PUSH_DELAY + SSH_PUBLIC_KEYS_PUSH_RETRY_DELAY * (SSH_PUBLIC_KEYS_PUSH_MAX_RETRIES + 1))
+
+
+def _add_pending_ssh_public_keys(redis, membership_pk, ssh_public_keys_uuids):
+    """
+    Add keys to pending ones of membership, return True if push of pending keys has to be scheduled.
+    """
+    pipe = redis.pipeline()
+    pipe.sadd(PENDING_SSH_PUBLIC_KEYS_KEY % membership_pk, *ssh_public_keys_uuids)
+    pipe.expire(PENDING_SSH_PUBLIC_KEYS_KEY % membership_pk, SSH_PUBLIC_KEYS_PUSH_TIMEOUT)
+    pipe.set(SCHEDULED_SSH_PUBLIC_KEYS_PUSH_KEY % membership_pk, 1, nx=True, ex=SSH_PUBLIC_KEYS_PUSH_TIMEOUT)
+    return bool(pipe.execute()[-1])
+
+
+def _pop_pending_ssh_public_keys(membership_pk):
+    redis = get_redis()
+    if redis is None:
+        return set()
+
+    pipe = redis.pipeline()
+    pipe.smembers(PENDING_SSH_PUBLIC_KEYS_KEY % membership_pk)
+    pipe.delete(PENDING_SSH_PUBLIC_KEYS_KEY % membership_pk)
+    pipe.delete(SCHEDULED_SSH_PUBLIC_KEYS_PUSH_KEY % membership_pk)
+    return set(pipe.execute()[0])
+
+
+def schedule_ssh_public_keys_push(ssh_public_keys_uuids, membership_pks):
+    """
+    Push ssh public keys to every membership by a separate task, tasks of one cloud are sent as a group.
+
+    If result backend is Redis, keys requested for a membership while its push is
+    scheduled or retried are added to that push instead of scheduling a new one.
+    """
+    ssh_public_keys_uuids = list(ssh_public_keys_uuids)
+    if not ssh_public_keys_uuids:
+        return
+
+    redis = get_redis()
+    memberships = (
+        models.CloudProjectMembership.objects
+        .filter(pk__in=membership_pks)
+        .order_by('cloud', 'pk')
+        .values_list('cloud', 'pk'))
+
+    for cloud_pk, cloud_memberships in groupby(memberships, key=itemgetter(0)):
+        subtasks = []
+        for _, membership_pk in cloud_memberships:
+            if redis is None:
+                subtasks.append(push_membership_ssh_public_keys.si(membership_pk, ssh_public_keys_uuids))
+            elif _add_pending_ssh_public_keys(redis, membership_pk, ssh_public_keys_uuids):
+                subtasks.append(push_membership_ssh_public_keys.si(membership_pk))
+
+        if subtasks:
+            countdown = SSH_PUBLIC_KEYS_PUSH_DELAY if redis is not None else 0
+            group(subtasks).apply_async(countdown=countdown)
+
+
 @shared_task
 def push_ssh_public_keys(ssh_public_keys_uuids, membership_pks):
+    schedule_ssh_public_keys_push(ssh_public_keys_uuids, membership_pks)
+
+
+@shared_task(bind=True, max_retries=SSH_PUBLIC_KEYS_PUSH_MAX_RETRIES,
+             default_retry_delay=SSH_PUBLIC_KEYS_PUSH_RETRY_DELAY)
+def push_membership_ssh_public_keys(self, membership_pk, ssh_public_keys_uuids=None):
+    try:
+        membership = models.CloudProjectMembership.objects.get(pk=membership_pk)
+    except models.CloudProjectMembership.DoesNotExist:
+        logger.warn('Not pushing public keys to missing cloud membership %s.', membership_pk)
+        _pop_pending_ssh_public_keys(membership_pk)
+        return
+
+    if membership.state != core_models.SynchronizationStates.IN_SYNC:
+        if membership.state != core_models.SynchronizationStates.ERRED:
+            # retry push if membership is in a sane state, pending keys are kept for the retry
+            logger.debug(
+                'Rescheduling synchronisation of keys for membership %s in state %s.',
+                membership.pk, membership.get_state_display()
+            )
+            try:
+                raise self.retry()
+            except MaxRetriesExceededError:
+                pass
+
+        logger.warn(
+            'Not pushing public keys to cloud membership %s which is in state %s.',
+            membership.pk, membership.get_state_display()
+        )
+        _pop_pending_ssh_public_keys(membership_pk)
+        return
+
+    ssh_public_keys_uuids = set(ssh_public_keys_uuids or []) | _pop_pending_ssh_public_keys(membership_pk)
     public_keys = core_models.SshPublicKey.objects.filter(uuid__in=ssh_public_keys_uuids)
 
     existing_keys = set(k.uuid.hex for k in public_keys)
-    missing_keys = set(ssh_public_keys_uuids) - existing_keys
+    missing_keys = ssh_public_keys_uuids - existing_keys
     if missing_keys:
-        logging.warn(
+        logger.warn(
             'Failed to push missing public keys: %s',
             ', '.join(missing_keys)
         )
 
-    membership_queryset = models.CloudProjectMembership.objects.filter(
-        pk__in=membership_pks)
+    if not existing_keys:
+        return
 
-    potential_rerunnable = []
-    for membership in membership_queryset.iterator():
-        if membership.state != core_models.SynchronizationStates.IN_SYNC:
-            logging.warn(
-                'Not pushing public keys to cloud membership %s which is in state %s.',
-                membership.pk, membership.get_state_display()
-            )
-            if membership.state != core_models.SynchronizationStates.ERRED:
-                # reschedule a task for this membership if membership is in a sane state
-                logging.debug(
-                    'Rescheduling synchronisation of keys for membership %s in state %s.',
-                    membership.pk, membership.get_state_display()
-                )
-                potential_rerunnable.append(membership.id)
-            continue
-
-        backend = membership.cloud.get_backend()
-        for public_key in public_keys:
-            try:
-                backend.push_ssh_public_key(membership, public_key)
-            except CloudBackendError:
-                logger.warn(
-                    'Failed to push public key %s to cloud membership %s',
-                    public_key.uuid, membership.pk,
-                    exc_info=1,
-                )
-    # reschedule sync to membership that were blocked
-    if potential_rerunnable:
-        push_ssh_public_keys.delay(ssh_public_keys_uuids, potential_rerunnable)
+    backend = membership.cloud.get_backend()
+    try:
+        backend.push_ssh_public_keys(membership, public_keys)
+    except CloudBackendError:
+        logger.warn(
+            'Failed to push public keys %s to cloud membership %s',
+            ', '.join(existing_keys), membership.pk,
+            exc_info=1,
+        )
 
 
 @shared_task
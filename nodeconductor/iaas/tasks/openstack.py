@@ -45,7 +45,14 @@ def nova_wait_for_server_status(session, server_id, status):
     return server.status == status
 
 
-@shared_task(is_heavy_task=True)
+def get_instance_auth_url(instance_uuid, *args, **kwargs):
+    return (Instance.objects
+            .filter(uuid=instance_uuid)
+            .values_list('cloud_project_membership__cloud__auth_url', flat=True)
+            .first())
+
+
+@shared_task(is_heavy_task=True, get_cloud_auth_url=staticmethod(get_instance_auth_url))
 def openstack_provision_instance(instance_uuid, backend_flavor_id,
                                  system_volume_id=None, data_volume_id=None):
     instance = Instance.objects.get(uuid=instance_uuid)
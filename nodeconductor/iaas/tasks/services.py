@@ -2,11 +2,13 @@
 from __future__ import absolute_import
 
 import logging
+from itertools import groupby
 
-from celery import shared_task, current_app
+from celery import shared_task, current_app, group
+from django.conf import settings
 
 from nodeconductor.core.log import EventLoggerAdapter
-from nodeconductor.core.tasks import transition
+from nodeconductor.core.tasks import transition, StateChangeError
 from nodeconductor.core.models import SynchronizationStates
 from nodeconductor.iaas.models import Cloud
 
@@ -15,22 +17,64 @@ logger = logging.getLogger(__name__)
 event_logger = EventLoggerAdapter(logger)
 
 
+def get_endpoint_concurrency():
+    """
+    Return maximal number of services of one OpenStack endpoint synchronized at once.
+    """
+    return getattr(settings, 'NODECONDUCTOR', {}).get('OPENSTACK_ENDPOINT_CONCURRENCY', 2)
+
+
+def split_services_by_endpoint(services, concurrency=1):
+    """
+    Group services by OpenStack endpoint and split every group into at most concurrency lanes.
+    Services of a lane are expected to be processed one by one, lanes are processed in parallel.
+    """
+    lanes = []
+    for _, endpoint_services in groupby(sorted(services, key=lambda s: s.auth_url), lambda s: s.auth_url):
+        endpoint_services = list(endpoint_services)
+        lanes_count = min(concurrency, len(endpoint_services))
+        lanes.extend(endpoint_services[index::lanes_count] for index in range(lanes_count))
+    return lanes
+
+
 @shared_task(name='nodeconductor.iaas.sync_services')
 def sync_services(service_uuids=None):
     services = Cloud.objects.filter(state=SynchronizationStates.IN_SYNC)
     if service_uuids and isinstance(service_uuids, (list, tuple)):
         services = services.filter(uuid__in=service_uuids)
 
+    scheduled_services = []
     for service in services:
         service.schedule_syncing()
         service.save()
+        scheduled_services.append(service)
+
+    lanes = split_services_by_endpoint(scheduled_services, get_endpoint_concurrency())
+    if lanes:
+        group(sync_endpoint_services.si([service.uuid.hex for service in lane]) for lane in lanes).apply_async()
+
+
+@shared_task(name='nodeconductor.iaas.sync_endpoint_services')
+def sync_endpoint_services(service_uuids):
+    """
+    Sync services one by one, so that a slow endpoint holds up only its own services.
+    """
+    for service_uuid in service_uuids:
+        try:
+            _sync_endpoint_service(service_uuid)
+        except (StateChangeError, Cloud.DoesNotExist):
+            # Service has gone or has been changed concurrently, proceed with the rest of the lane
+            logger.warning('Failed to finish synchronization of service %s', service_uuid, exc_info=True)
+
 
-        service_uuid = service.uuid.hex
-        sync_service.apply_async(
-            args=(service_uuid,),
-            link=sync_service_succeeded.si(service_uuid),
-            link_error=sync_service_log_error.s(service_uuid),
-        )
+def _sync_endpoint_service(service_uuid):
+    try:
+        sync_service(service_uuid)
+    except Exception as e:
+        log_service_sync_error(service_uuid, e)
+        sync_service_failed(service_uuid)
+    else:
+        sync_service_succeeded(service_uuid)
 
 
 @shared_task(name='nodeconductor.iaas.sync_service')
@@ -54,13 +98,17 @@ def sync_service_failed(service_uuid, transition_entity=None):
     pass
 
 
-@shared_task
-def sync_service_log_error(task_uuid, service_uuid):
-    result = current_app.AsyncResult(task_uuid)
+def log_service_sync_error(service_uuid, error):
     cloud = Cloud.objects.get(uuid=service_uuid)
     event_logger.error(
-        'Cloud service %s has failed to sync with error: %s.', cloud.name, result.result,
+        'Cloud service %s has failed to sync with error: %s.', cloud.name, error,
         extra={'cloud': cloud, 'event_type': 'iaas_service_sync_failed'},
     )
 
+
+@shared_task
+def sync_service_log_error(task_uuid, service_uuid):
+    result = current_app.AsyncResult(task_uuid)
+    log_service_sync_error(service_uuid, result.result)
+
     sync_service_failed.delay(service_uuid)
@@ -210,6 +210,21 @@ class OpenStackClientTest(TestCase):
         stats = nova.hypervisors.statistics()._info
         self.assertEqual(stats['free_ram_mb'], 477)
 
+    def test_nova_servers_lookup_by_indexed_attributes_reflects_updates(self):
+        session = self.backend.create_tenant_session(self.credentials)
+        nova = self.backend.create_nova_client(session)
+
+        server = nova.servers.list()[0]
+        nova.servers.stop(server.id)
+
+        self.assertIn(server, nova.servers.findall(status='SHUTOFF'))
+        self.assertNotIn(server, nova.servers.findall(status='ACTIVE'))
+        self.assertEqual(nova.servers.find(name=server.name, image=server.image), server)
+
+        nova.servers.start(server.id)
+
+        self.assertNotIn(server, nova.servers.findall(status='SHUTOFF'))
+
     def test_glance(self):
         session = self.backend.create_tenant_session(self.credentials)
         glance = self.backend.create_glance_client(session)
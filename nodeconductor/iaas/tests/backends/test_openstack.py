@@ -1,14 +1,21 @@
 from __future__ import unicode_literals
 
 import collections
+import datetime
+import json
 import unittest
 
-from django.test import TransactionTestCase
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from glanceclient import exc as glance_exceptions
 from keystoneclient import exceptions as keystone_exceptions
+from novaclient import exceptions as nova_exceptions
 import mock
 
 from nodeconductor.iaas.backend import CloudBackendError
-from nodeconductor.iaas.backend.openstack import OpenStackBackend
+from nodeconductor.iaas.backend import openstack
+from nodeconductor.iaas.backend.openstack import OpenStackBackend, get_rate_limit_bucket
 from nodeconductor.iaas.models import Flavor, Instance, Image, FloatingIP
 from nodeconductor.iaas.tests import factories
 
@@ -72,6 +79,179 @@ class OpenStackBackendConversionTest(unittest.TestCase):
         self.assertEqual(core_disk, 4096)
 
 
+class KeystoneSession(object):
+    """ Keystone session issuing a token unless one is set to its auth plugin """
+
+    def __init__(self, auth):
+        self.auth = auth
+        self.issued_tokens = 0
+
+    def get_token(self):
+        if not self.auth.auth_ref:
+            self.issued_tokens += 1
+            self.auth.auth_ref = {'token': {
+                'id': 'issued-token',
+                'expires': (timezone.now() + datetime.timedelta(hours=1)).isoformat(),
+            }}
+        return self.auth.auth_ref['token']['id']
+
+    def invalidate(self):
+        self.auth.auth_ref = None
+        return True
+
+
+@mock.patch('nodeconductor.iaas.backend.openstack.get_redis')
+@mock.patch.object(OpenStackBackend, 'get_openstack_class', return_value=KeystoneSession)
+class OpenStackBackendSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.credentials = {
+            'auth_url': 'http://keystone.example.com:5000/v2.0',
+            'username': 'user',
+            'password': 'secret',
+            'tenant_id': 'tenant',
+        }
+        self.cached_auth_ref = {'token': {
+            'id': 'cached-token',
+            'expires': (timezone.now() + datetime.timedelta(hours=1)).isoformat(),
+        }}
+
+    def test_token_issued_for_credentials_is_cached_until_expiration(self, mocked_class, mocked_get_redis):
+        redis = mocked_get_redis.return_value
+        redis.get.return_value = None
+
+        session = OpenStackBackend().create_tenant_session(self.credentials)
+
+        self.assertEqual(session.keystone_session.issued_tokens, 1)
+        key, timeout, auth_ref = redis.setex.call_args[0]
+        self.assertEqual(json.loads(auth_ref)['token']['id'], 'issued-token')
+        self.assertTrue(0 < timeout <= 50 * 60)
+
+    def test_cached_token_is_reused_instead_of_signing_in(self, mocked_class, mocked_get_redis):
+        redis = mocked_get_redis.return_value
+        redis.get.return_value = json.dumps(self.cached_auth_ref)
+
+        session = OpenStackBackend().create_tenant_session(self.credentials)
+
+        self.assertEqual(session.keystone_session.issued_tokens, 0)
+        self.assertEqual(session['auth_ref']['token']['id'], 'cached-token')
+        self.assertFalse(redis.setex.called)
+
+    def test_tokens_are_cached_per_tenant(self, mocked_class, mocked_get_redis):
+        redis = mocked_get_redis.return_value
+        redis.get.return_value = None
+
+        OpenStackBackend().create_tenant_session(self.credentials)
+        OpenStackBackend().create_tenant_session(dict(self.credentials, tenant_id='other-tenant'))
+
+        keys = [call[0][0] for call in redis.setex.call_args_list]
+        self.assertNotEqual(keys[0], keys[1])
+
+    def test_recovered_session_reuses_token_passed_along_chain(self, mocked_class, mocked_get_redis):
+        serialized_session = dict(self.credentials, auth_ref=self.cached_auth_ref, dummy=False)
+
+        session = OpenStackBackend.recover_session(serialized_session)
+
+        self.assertEqual(session.keystone_session.issued_tokens, 0)
+        self.assertEqual(session.get_token(), 'cached-token')
+        self.assertFalse(mocked_get_redis.return_value.get.called)
+
+    def test_tokens_are_cached_by_credentials_salted_with_secret_key(self, mocked_class, mocked_get_redis):
+        redis = mocked_get_redis.return_value
+        redis.get.return_value = None
+
+        OpenStackBackend().create_tenant_session(self.credentials)
+        with override_settings(SECRET_KEY='other-secret-key'):
+            OpenStackBackend().create_tenant_session(self.credentials)
+
+        keys = [call[0][0] for call in redis.setex.call_args_list]
+        self.assertNotEqual(keys[0], keys[1])
+
+    def test_rejected_token_is_evicted_from_cache_and_replaced(self, mocked_class, mocked_get_redis):
+        redis = mocked_get_redis.return_value
+        redis.get.return_value = json.dumps(self.cached_auth_ref)
+        session = OpenStackBackend().create_tenant_session(self.credentials)
+
+        token = session.reauthenticate()
+
+        self.assertEqual(token, 'issued-token')
+        self.assertEqual(session['auth_ref']['token']['id'], 'issued-token')
+        cache_key = redis.get.call_args[0][0]
+        redis.delete.assert_called_once_with(cache_key)
+        key, timeout, auth_ref = redis.setex.call_args[0]
+        self.assertEqual((key, json.loads(auth_ref)['token']['id']), (cache_key, 'issued-token'))
+
+    def test_glance_request_is_repeated_with_new_token_after_rejection(self, mocked_class, mocked_get_redis):
+        mocked_get_redis.return_value.get.return_value = json.dumps(self.cached_auth_ref)
+        session = OpenStackBackend().create_tenant_session(self.credentials)
+        glance = mock.Mock(auth_token=session.get_token())
+        http_request = glance._http_request
+        http_request.side_effect = [glance_exceptions.Unauthorized(), ('response', 'body')]
+
+        openstack._reauthenticate_on_unauthorized(glance, session)
+
+        self.assertEqual(glance._http_request('/v1/images/detail', 'GET'), ('response', 'body'))
+        self.assertEqual(http_request.call_count, 2)
+        self.assertEqual(glance.auth_token, 'issued-token')
+
+    def test_token_is_evicted_if_client_signs_in_with_password(self, mocked_class, mocked_get_redis):
+        redis = mocked_get_redis.return_value
+        redis.get.return_value = json.dumps(self.cached_auth_ref)
+        session = OpenStackBackend().create_tenant_session(self.credentials)
+        nova_http_client = mock.Mock()
+        authenticate = nova_http_client.authenticate
+
+        openstack._evict_token_on_authenticate(nova_http_client, session)
+        nova_http_client.authenticate()
+
+        self.assertEqual(authenticate.call_count, 1)
+        redis.delete.assert_called_once_with(redis.get.call_args[0][0])
+
+
+@override_settings(NODECONDUCTOR={'OPENSTACK_RATE_LIMITS': {
+    '*': {'compute': (10, 20), 'volume': (5, 5)},
+    'http://slow.example.com:5000/v2.0': {'volume': (1, 2)},
+}})
+class OpenStackRateLimitTest(SimpleTestCase):
+    def test_limits_of_endpoint_take_precedence_over_default_ones(self):
+        bucket = get_rate_limit_bucket('http://slow.example.com:5000/v2.0', 'volume')
+
+        self.assertEqual((bucket.rate, bucket.burst), (1, 2))
+        self.assertEqual(bucket.name, 'volume:http://slow.example.com:5000/v2.0')
+
+    def test_default_limits_are_applied_per_endpoint(self):
+        bucket = get_rate_limit_bucket('http://slow.example.com:5000/v2.0', 'compute')
+
+        self.assertEqual((bucket.rate, bucket.burst), (10, 20))
+        self.assertEqual(bucket.name, 'compute:http://slow.example.com:5000/v2.0')
+
+    def test_calls_of_not_configured_service_are_not_limited(self):
+        self.assertIsNone(get_rate_limit_bucket('http://slow.example.com:5000/v2.0', 'image'))
+
+
+@mock.patch('nodeconductor.iaas.backend.openstack.get_rate_limit_bucket')
+@mock.patch.object(OpenStackBackend, 'get_service_endpoint', return_value='http://nova.example.com:8774/v2/tenant')
+class OpenStackClientRateLimitTest(unittest.TestCase):
+    def setUp(self):
+        self.session = mock.Mock(dummy=False)
+        self.session.auth.auth_url = 'http://keystone.example.com:5000/v2.0'
+        self.session.get_token.return_value = 'token'
+
+    @mock.patch('novaclient.client.HTTPClient.request')
+    def test_requests_of_resources_returned_by_managers_are_limited(self, mocked_request,
+                                                                     mocked_get_service_endpoint,
+                                                                     mocked_get_rate_limit_bucket):
+        mocked_request.return_value = (mock.Mock(status_code=200), {'server': {'id': '1', 'name': 'vm'}})
+        bucket = mocked_get_rate_limit_bucket.return_value
+        nova = OpenStackBackend.create_nova_client(self.session)
+
+        server = nova.servers.get('1')
+        server.delete()
+
+        mocked_get_rate_limit_bucket.assert_called_once_with('http://keystone.example.com:5000/v2.0', 'compute')
+        self.assertEqual(mocked_request.call_count, 2)
+        self.assertEqual(bucket.acquire.call_count, 2)
+
+
 class OpenStackBackendCloudAccountApiTest(unittest.TestCase):
 
     def setUp(self):
@@ -292,6 +472,74 @@ class OpenStackBackendSecurityGroupsTest(TransactionTestCase):
             self.backend.push_security_groups(self.membership)
 
 
+class OpenStackBackendSecurityGroupRulesTest(TransactionTestCase):
+
+    def setUp(self):
+        self.nova_client = mock.Mock()
+        self.backend = OpenStackBackend()
+        self.security_group = factories.SecurityGroupFactory(backend_id='group-id')
+        self.ssh_rule = self.security_group.rules.create(
+            protocol='tcp', from_port=22, to_port=22, cidr='0.0.0.0/0', backend_id='ssh-rule-id')
+
+    def get_backend_group(self, *rules):
+        return mock.Mock(rules=[
+            {'id': backend_id, 'ip_protocol': 'tcp', 'from_port': port, 'to_port': port,
+             'ip_range': {'cidr': '0.0.0.0/0'}}
+            for backend_id, port in rules
+        ])
+
+    def test_push_security_group_rules_creates_and_deletes_only_different_rules(self):
+        http_rule = self.security_group.rules.create(protocol='tcp', from_port=80, to_port=80, cidr='0.0.0.0/0')
+        backend_group = self.get_backend_group(('ssh-rule-id', 22), ('ftp-rule-id', 21))
+        self.nova_client.security_group_rules.create.return_value = mock.Mock(id='http-rule-id')
+        # when
+        self.backend.push_security_group_rules(self.security_group, self.nova_client, backend_group)
+        # then
+        self.assertFalse(self.nova_client.security_groups.get.called)
+        self.nova_client.security_group_rules.delete.assert_called_once_with('ftp-rule-id')
+        self.nova_client.security_group_rules.create.assert_called_once_with(
+            parent_group_id='group-id', ip_protocol='tcp', from_port=80, to_port=80, cidr='0.0.0.0/0')
+        self.assertEqual(self.security_group.rules.get(pk=http_rule.pk).backend_id, 'http-rule-id')
+
+    def test_pull_security_group_rules_keeps_matching_rules(self):
+        stale_rule = self.security_group.rules.create(
+            protocol='tcp', from_port=21, to_port=21, cidr='0.0.0.0/0', backend_id='ftp-rule-id')
+        backend_group = self.get_backend_group(('ssh-rule-id', 22), ('http-rule-id', 80))
+        # when
+        self.backend.pull_security_group_rules(self.security_group, self.nova_client, backend_group)
+        # then
+        rules = self.security_group.rules.all()
+        self.assertItemsEqual([(rule.backend_id, rule.from_port) for rule in rules],
+                              [('ssh-rule-id', 22), ('http-rule-id', 80)])
+        self.assertTrue(rules.filter(pk=self.ssh_rule.pk).exists())
+        self.assertFalse(rules.filter(pk=stale_rule.pk).exists())
+
+    def test_pull_security_group_rules_updates_changed_rules(self):
+        http_rule = self.security_group.rules.create(protocol='tcp', from_port=80, to_port=80, cidr='0.0.0.0/0')
+        backend_group = self.get_backend_group(('ssh-rule-id', 2222), ('http-rule-id', 80))
+        # when
+        self.backend.pull_security_group_rules(self.security_group, self.nova_client, backend_group)
+        # then
+        self.assertEqual(self.security_group.rules.count(), 2)
+        ssh_rule = self.security_group.rules.get(pk=self.ssh_rule.pk)
+        self.assertEqual((ssh_rule.from_port, ssh_rule.to_port), (2222, 2222))
+        self.assertEqual(self.security_group.rules.get(pk=http_rule.pk).backend_id, 'http-rule-id')
+
+    def test_integer_backend_rule_ids_match_rule_backend_ids(self):
+        self.ssh_rule.backend_id = '5'
+        self.ssh_rule.save()
+        backend_group = self.get_backend_group((5, 22))
+        # when: rules are only read, as they match already
+        with self.assertNumQueries(1):
+            self.backend.push_security_group_rules(self.security_group, self.nova_client, backend_group)
+        # (and transaction is started)
+        with self.assertNumQueries(2):
+            self.backend.pull_security_group_rules(self.security_group, self.nova_client, backend_group)
+        # then
+        self.assertFalse(self.nova_client.security_group_rules.delete.called)
+        self.assertFalse(self.nova_client.security_group_rules.create.called)
+
+
 class OpenStackBackendFlavorApiTest(TransactionTestCase):
     def setUp(self):
         self.nova_client = mock.Mock()
@@ -382,6 +630,64 @@ class OpenStackBackendFlavorApiTest(TransactionTestCase):
         self.assertFalse(is_present, 'Flavor should have been deleted from the database')
 
 
+class OpenStackBackendSshPublicKeysTest(TransactionTestCase):
+    def setUp(self):
+        self.nova_client = mock.Mock()
+        self.membership = factories.CloudProjectMembershipFactory()
+        self.public_keys = factories.SshPublicKeyFactory.create_batch(2)
+
+        self.backend = OpenStackBackend()
+        self.backend.create_session = mock.Mock()
+        self.backend.create_nova_client = mock.Mock(return_value=self.nova_client)
+
+    def get_keypair(self, public_key, fingerprint=None):
+        keypair = mock.Mock(fingerprint=fingerprint or public_key.fingerprint)
+        keypair.name = self.backend.get_key_name(public_key)
+        return keypair
+
+    def test_push_ssh_public_keys_creates_only_missing_keys(self):
+        existing_key, missing_key = self.public_keys
+        self.nova_client.keypairs.list.return_value = [self.get_keypair(existing_key)]
+        # when
+        self.backend.push_ssh_public_keys(self.membership, self.public_keys)
+        # then
+        self.assertEqual(self.backend.create_session.call_count, 1)
+        self.assertFalse(self.nova_client.keypairs.delete.called)
+        self.nova_client.keypairs.create.assert_called_once_with(
+            name=self.backend.get_key_name(missing_key), public_key=missing_key.public_key)
+
+    def test_push_ssh_public_keys_replaces_keys_with_changed_fingerprint(self):
+        changed_key, unchanged_key = self.public_keys
+        self.nova_client.keypairs.list.return_value = [
+            self.get_keypair(changed_key, fingerprint='00:00'),
+            self.get_keypair(unchanged_key),
+        ]
+        # when
+        self.backend.push_ssh_public_keys(self.membership, self.public_keys)
+        # then
+        key_name = self.backend.get_key_name(changed_key)
+        self.nova_client.keypairs.delete.assert_called_once_with(key_name)
+        self.nova_client.keypairs.create.assert_called_once_with(name=key_name, public_key=changed_key.public_key)
+
+    def test_push_ssh_public_keys_creates_repeated_key_once(self):
+        public_key = self.public_keys[0]
+        self.nova_client.keypairs.list.return_value = []
+        # when
+        self.backend.push_ssh_public_keys(self.membership, [public_key, public_key])
+        # then
+        self.nova_client.keypairs.create.assert_called_once_with(
+            name=self.backend.get_key_name(public_key), public_key=public_key.public_key)
+
+    def test_push_ssh_public_keys_raises_cloud_backend_error_after_pushing_all_keys(self):
+        self.nova_client.keypairs.list.return_value = []
+        self.nova_client.keypairs.create.side_effect = [nova_exceptions.BadRequest(400), mock.Mock()]
+        # when
+        with self.assertRaises(CloudBackendError):
+            self.backend.push_ssh_public_keys(self.membership, self.public_keys)
+        # then
+        self.assertEqual(self.nova_client.keypairs.create.call_count, 2)
+
+
 class OpenStackBackendFloatingIPTest(TransactionTestCase):
 
     def setUp(self):
@@ -651,6 +957,27 @@ class OpenStackBackendImageApiTest(TransactionTestCase):
         except Image.DoesNotExist:
             self.fail("Image's backend_id should have been updated")
 
+    def test_pulling_updates_minimal_requirements_of_existing_image_in_place(self):
+        # Given
+        matching_mapping = self.template_mappings[0]
+        backend_image = GlanceImage(matching_mapping.backend_image_id, is_public=True, deleted=False,
+                                    min_ram=1024, min_disk=10)
+
+        self.glance_client.images.list.return_value = iter([
+            backend_image,
+        ])
+
+        # When
+        self.backend.pull_images(self.cloud_account)
+
+        # Then
+        self.glance_client.images.list.assert_called_once_with(
+            filters={'is_public': True}, page_size=OpenStackBackend.GLANCE_PAGE_SIZE)
+        image = self.cloud_account.images.get()
+        self.assertEqual(image.pk, self.image.pk)
+        self.assertEqual(image.min_ram, 1024)
+        self.assertEqual(image.min_disk, 10 * 1024)
+
 
 class OpenStackBackendInstanceApiTest(TransactionTestCase):
     def setUp(self):
@@ -664,6 +991,7 @@ class OpenStackBackendInstanceApiTest(TransactionTestCase):
         self.backend = OpenStackBackend()
         self.backend.create_session = mock.Mock(return_value=mock.Mock(dummy=False))
         self.backend.create_nova_client = mock.Mock(return_value=self.nova_client)
+        self.backend.create_cinder_client = mock.Mock()
 
     # XXX: import only the 1st data volume, sort by device name
 
@@ -762,6 +1090,59 @@ class OpenStackBackendInstanceApiTest(TransactionTestCase):
         )
 
 
+class OpenStackBackendSnapshotApiTest(unittest.TestCase):
+    def setUp(self):
+        self.cinder_client = mock.Mock()
+        self.membership = mock.Mock()
+        self.volume_ids = ['system-volume-id', 'data-volume-id']
+
+        self.snapshots = {}
+
+        def create_snapshot(volume_id, **kwargs):
+            snapshot = mock.Mock(id='snapshot-of-%s' % volume_id, size=1, volume_id=volume_id, status='creating')
+            self.snapshots[snapshot.id] = snapshot
+            return snapshot
+
+        self.cinder_client.volume_snapshots.create.side_effect = create_snapshot
+        self.cinder_client.volume_snapshots.get.side_effect = lambda snapshot_id: self.snapshots[snapshot_id]
+
+        self.backend = OpenStackBackend()
+        self.backend.create_session = mock.Mock()
+        self.backend.create_cinder_client = mock.Mock(return_value=self.cinder_client)
+
+    def test_create_snapshots_issues_all_snapshot_requests_before_waiting(self):
+        def wait_for_snapshots(snapshot_ids, *args, **kwargs):
+            self.assertEqual(self.cinder_client.volume_snapshots.create.call_count, len(self.volume_ids))
+            return True
+
+        self.backend._wait_for_snapshots_status = mock.Mock(side_effect=wait_for_snapshots)
+
+        snapshot_ids = self.backend.create_snapshots(self.membership, self.volume_ids)
+
+        self.assertEqual(snapshot_ids, ['snapshot-of-system-volume-id', 'snapshot-of-data-volume-id'])
+        self.backend._wait_for_snapshots_status.assert_called_once_with(
+            snapshot_ids, self.cinder_client, 'available', 'error')
+
+    def test_create_snapshots_raises_if_any_snapshot_fails(self):
+        self.backend._wait_for_snapshots_status = mock.Mock(return_value=False)
+
+        with self.assertRaises(CloudBackendError):
+            self.backend.create_snapshots(self.membership, self.volume_ids)
+
+        self.assertFalse(self.membership.add_quota_usage.called, 'Quota usage should not have been changed')
+
+    def test_wait_for_objects_status_polls_all_objects_in_one_round(self):
+        for volume_id in self.volume_ids:
+            self.cinder_client.volume_snapshots.create(volume_id).status = 'available'
+
+        with mock.patch('nodeconductor.iaas.backend.openstack.time.sleep') as sleep:
+            result = self.backend._wait_for_snapshots_status(
+                list(self.snapshots.keys()), self.cinder_client, 'available', 'error')
+
+        self.assertTrue(result)
+        self.assertFalse(sleep.called, 'Available snapshots should not be polled twice')
+
+
 class OpenStackBackendHelperApiTest(unittest.TestCase):
     def setUp(self):
         self.keystone_client = mock.Mock()
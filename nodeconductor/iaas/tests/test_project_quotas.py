@@ -45,3 +45,20 @@ class ProjectResourceQuotasTest(test.APITransactionTestCase):
             'max_instances': quotas1.get(name='max_instances').usage + quotas2.get(name='max_instances').usage,
         }
         self.assertEqual(response.data['resource_quota_usage'], expected_resource_quotas_usages)
+
+    def test_project_list_returns_resource_quotas_of_each_project(self):
+        other_project = structure_factories.ProjectFactory()
+        other_project.set_quota_limit('vcpu', 3)
+        other_project.set_quota_usage('vcpu', 1)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(structure_factories.ProjectFactory.get_list_url())
+
+        self.assertEqual(response.status_code, 200)
+        for project in (self.project, other_project):
+            project_data = next(p for p in response.data if p['uuid'] == project.uuid.hex)
+            quotas = project.quotas.all()
+            self.assertEqual(project_data['resource_quota'], {q.name: q.limit for q in quotas})
+            self.assertEqual(project_data['resource_quota_usage'], {q.name: q.usage for q in quotas})
+        self.assertEqual(
+            next(p for p in response.data if p['uuid'] == other_project.uuid.hex)['resource_quota']['vcpu'], 3)
@@ -1,8 +1,13 @@
 from __future__ import unicode_literals
 
+import csv
 from decimal import Decimal
+import json
+import re
 
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from mock import patch, Mock
 from rest_framework import status
 from rest_framework import test
@@ -617,6 +622,131 @@ class InstanceApiPermissionTest(UrlResolverMixin, test.APITransactionTestCase):
 # XXX: What should happen to existing instances when their project is removed?
 
 
+class InstanceListQueriesTest(test.APITransactionTestCase):
+    def setUp(self):
+        self.staff = structure_factories.UserFactory(is_staff=True)
+        self.create_instances(2)
+
+    def create_instances(self, count):
+        for instance in factories.InstanceFactory.create_batch(count, state=Instance.States.OFFLINE):
+            project_group = structure_factories.ProjectGroupFactory(
+                customer=instance.cloud_project_membership.project.customer)
+            project_group.projects.add(instance.cloud_project_membership.project)
+            factories.InstanceLicenseFactory(instance=instance)
+            factories.InstanceSecurityGroupFactory(
+                instance=instance,
+                security_group__cloud_project_membership=instance.cloud_project_membership)
+            backup_factories.BackupFactory(backup_schedule__backup_source=instance)
+
+    def test_number_of_queries_does_not_depend_on_number_of_instances(self):
+        self.client.force_authenticate(self.staff)
+
+        with CaptureQueriesContext(connection) as initial_queries:
+            self.client.get(reverse('instance-list'))
+
+        self.create_instances(5)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('instance-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(len(queries), len(initial_queries))
+
+
+class InstanceListPaginationTest(test.APITransactionTestCase):
+    def setUp(self):
+        self.staff = structure_factories.UserFactory(is_staff=True)
+        self.instances = factories.InstanceFactory.create_batch(5)
+        self.client.force_authenticate(self.staff)
+
+    def get_link(self, response, rel):
+        match = re.search(r'<([^>]+)>; rel="%s"' % rel, response['Link'])
+        return match.group(1) if match else None
+
+    def test_instances_are_paginated_by_cursor_newest_first(self):
+        response = self.client.get(reverse('instance-list'), data={'cursor': '', 'page_size': 2})
+        uuids = [instance['uuid'] for instance in response.data]
+
+        while self.get_link(response, 'next'):
+            response = self.client.get(self.get_link(response, 'next'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            uuids.extend(instance['uuid'] for instance in response.data)
+
+        expected_instances = sorted(self.instances, key=lambda i: (i.created, i.pk), reverse=True)
+        self.assertEqual(uuids, [instance.uuid.hex for instance in expected_instances])
+
+    def test_previous_link_returns_previous_page(self):
+        first_page = self.client.get(reverse('instance-list'), data={'cursor': '', 'page_size': 2})
+        second_page = self.client.get(self.get_link(first_page, 'next'))
+
+        response = self.client.get(self.get_link(second_page, 'prev'))
+
+        self.assertEqual(response.data, first_page.data)
+        self.assertEqual(self.client.get(self.get_link(second_page, 'first')).data, first_page.data)
+
+    def test_cursor_result_count_is_returned_only_if_requested(self):
+        response = self.client.get(reverse('instance-list'), data={'cursor': ''})
+        self.assertNotIn('X-Result-Count', response)
+
+        response = self.client.get(reverse('instance-list'), data={'cursor': '', 'count': 'estimate'})
+        self.assertEqual(response['X-Result-Count'], '5')
+
+    def test_page_number_pagination_is_used_by_default(self):
+        response = self.client.get(reverse('instance-list'), data={'page': 2, 'page_size': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Result-Count'], '5')
+        self.assertEqual(len(response.data), 2)
+        self.assertIn('page=3', self.get_link(response, 'last'))
+
+
+class InstanceExportTest(test.APITransactionTestCase):
+    def setUp(self):
+        self.project = structure_factories.ProjectFactory()
+        self.membership = factories.CloudProjectMembershipFactory(project=self.project)
+        self.instances = factories.InstanceFactory.create_batch(3, cloud_project_membership=self.membership)
+        factories.InstanceFactory()
+
+        self.user = structure_factories.UserFactory()
+        self.project.add_user(self.user, ProjectRole.ADMINISTRATOR)
+        self.client.force_authenticate(self.user)
+
+        self.export_url = reverse('instance-list') + 'export/'
+
+    def get_content(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_visible_instances_are_exported_as_ndjson(self):
+        response = self.client.get(self.export_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.get_content(response).splitlines()]
+        self.assertEqual([row['uuid'] for row in rows], [instance.uuid.hex for instance in self.instances])
+
+    def test_instances_are_exported_as_csv(self):
+        response = self.client.get(self.export_url, data={'export_format': 'csv'})
+
+        rows = list(csv.DictReader(self.get_content(response).splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['name'], self.instances[0].name)
+
+    def test_list_filters_are_applied_to_export(self):
+        # Renaming is not saved to avoid scheduling of backend update
+        Instance.objects.filter(pk=self.instances[1].pk).update(name='Exported instance')
+
+        response = self.client.get(self.export_url, data={'name': 'Exported instance'})
+
+        rows = [json.loads(line) for line in self.get_content(response).splitlines()]
+        self.assertEqual([row['uuid'] for row in rows], [self.instances[1].uuid.hex])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(self.export_url, data={'export_format': 'xml'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class InstanceProvisioningTest(UrlResolverMixin, test.APITransactionTestCase):
     def setUp(self):
         self.user = structure_factories.UserFactory.create()
@@ -0,0 +1,66 @@
+from __future__ import unicode_literals
+
+from django.test import TransactionTestCase
+import mock
+
+from nodeconductor.core.models import SynchronizationStates
+from nodeconductor.iaas import models
+from nodeconductor.iaas.tasks import iaas as iaas_tasks
+from nodeconductor.iaas.tasks import services as services_tasks
+from nodeconductor.iaas.tests import factories
+
+
+class ServicesSplitByEndpointTest(TransactionTestCase):
+
+    def test_services_of_one_endpoint_are_split_into_bounded_number_of_lanes(self):
+        first_endpoint_clouds = factories.CloudFactory.create_batch(5, auth_url='http://first.example.com/')
+        second_endpoint_cloud = factories.CloudFactory(auth_url='http://second.example.com/')
+
+        lanes = services_tasks.split_services_by_endpoint(first_endpoint_clouds + [second_endpoint_cloud], 2)
+
+        self.assertEqual(sorted(len(lane) for lane in lanes), [1, 2, 3])
+        self.assertIn([second_endpoint_cloud], lanes)
+
+
+class SyncEndpointServicesTest(TransactionTestCase):
+
+    def setUp(self):
+        self.clouds = factories.CloudFactory.create_batch(2, state=SynchronizationStates.SYNCING_SCHEDULED)
+
+    @mock.patch('nodeconductor.iaas.models.Cloud.get_backend')
+    def test_services_are_synced_after_deleted_one(self, mocked_get_backend):
+        deleted_cloud_uuid = factories.CloudFactory().uuid.hex
+        models.Cloud.objects.filter(uuid=deleted_cloud_uuid).delete()
+
+        services_tasks.sync_endpoint_services([deleted_cloud_uuid] + [cloud.uuid.hex for cloud in self.clouds])
+
+        for cloud in self.clouds:
+            self.assertEqual(models.Cloud.objects.get(pk=cloud.pk).state, SynchronizationStates.IN_SYNC)
+
+    @mock.patch('nodeconductor.iaas.models.Cloud.get_backend')
+    def test_services_are_synced_after_failed_one(self, mocked_get_backend):
+        mocked_get_backend.return_value.pull_cloud_account.side_effect = [Exception('Backend is down'), None]
+
+        services_tasks.sync_endpoint_services([cloud.uuid.hex for cloud in self.clouds])
+
+        states = [models.Cloud.objects.get(pk=cloud.pk).state for cloud in self.clouds]
+        self.assertEqual(states, [SynchronizationStates.ERRED, SynchronizationStates.IN_SYNC])
+
+
+class PullEndpointStatisticsTest(TransactionTestCase):
+
+    def setUp(self):
+        self.clouds = factories.CloudFactory.create_batch(
+            2, auth_url='http://example.com/', state=SynchronizationStates.IN_SYNC)
+        self.clouds[0].stats.create(key='stale', value='1')
+
+    @mock.patch('nodeconductor.iaas.backend.openstack.OpenStackBackend.get_resource_stats')
+    def test_statistics_are_pulled_once_and_replaced_for_every_cloud_of_endpoint(self, mocked_get_resource_stats):
+        mocked_get_resource_stats.return_value = {'vcpus': 10, 'memory_mb': 2048}
+
+        iaas_tasks.pull_endpoint_statistics('http://example.com/', [cloud.pk for cloud in self.clouds])
+
+        mocked_get_resource_stats.assert_called_once_with('http://example.com/')
+        for cloud in self.clouds:
+            self.assertEqual(models.Cloud.objects.get(pk=cloud.pk).get_statistics(),
+                             {'vcpus': '10', 'memory_mb': '2048'})
@@ -1,5 +1,7 @@
 from decimal import Decimal
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import test, status
 
 from nodeconductor.core.tests import helpers
@@ -118,6 +120,34 @@ class ServicesListRetrieveTest(test.APISimpleTestCase):
             'Service api returns more(or less) fields than expected')
 
 
+class ServicesListQueriesTest(test.APITransactionTestCase):
+
+    def setUp(self):
+        self.staff = structure_factories.UserFactory(is_staff=True)
+        self.create_services(2)
+
+    def create_services(self, count):
+        for service in factories.InstanceFactory.create_batch(count):
+            service.cloud_project_membership.project.project_groups.add(structure_factories.ProjectGroupFactory())
+            factories.InstanceSlaHistoryFactory(instance=service, period='2015')
+
+    def test_number_of_queries_does_not_depend_on_page_size(self):
+        self.client.force_authenticate(self.staff)
+
+        with CaptureQueriesContext(connection) as initial_queries:
+            self.client.get(_get_service_list_url(), data={'period': '2015'})
+
+        self.create_services(5)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(_get_service_list_url(), data={'period': '2015'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 7)
+        self.assertTrue(all(service['actual_sla'] == Decimal('99.9') for service in response.data))
+        self.assertEqual(len(queries), len(initial_queries))
+
+
 class PermissionsTest(helpers.PermissionsTest):
 
     def setUp(self):
@@ -2,10 +2,12 @@ from __future__ import unicode_literals
 
 import unittest
 
+from django.test import TransactionTestCase
 from rest_framework import test, status
+import mock
 
 from nodeconductor.core import models as core_models
-from nodeconductor.iaas import serializers
+from nodeconductor.iaas import serializers, tasks
 from nodeconductor.iaas import views
 from nodeconductor.iaas.tests import factories
 from nodeconductor.structure.tests import factories as structure_factories
@@ -87,3 +89,44 @@ class SshKeyCreateDeleteTest(test.APITransactionTestCase):
         self.client.force_authenticate(self.user)
         response = self.client.delete(factories.SshPublicKeyFactory.get_url(other_key))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SshKeyPropagationTest(TransactionTestCase):
+    def setUp(self):
+        self.membership = factories.CloudProjectMembershipFactory(state=core_models.SynchronizationStates.IN_SYNC)
+        self.public_key = factories.SshPublicKeyFactory()
+
+    @mock.patch('nodeconductor.iaas.tasks.iaas.group')
+    @mock.patch('nodeconductor.iaas.tasks.iaas.get_redis')
+    def test_pushes_requested_within_delay_are_merged(self, mocked_get_redis, mocked_group):
+        pipeline = mocked_get_redis.return_value.pipeline.return_value
+        # push is scheduled only if scheduling marker was not set yet
+        pipeline.execute.side_effect = [[1, True, True], [1, True, None]]
+
+        tasks.schedule_ssh_public_keys_push([self.public_key.uuid.hex], [self.membership.pk])
+        tasks.schedule_ssh_public_keys_push([self.public_key.uuid.hex], [self.membership.pk])
+
+        self.assertEqual(mocked_group.call_count, 1)
+        subtasks = mocked_group.call_args[0][0]
+        self.assertEqual([subtask.args for subtask in subtasks], [(self.membership.pk,)])
+
+    @mock.patch('nodeconductor.iaas.tasks.iaas.get_redis', return_value=None)
+    @mock.patch('nodeconductor.iaas.models.Cloud.get_backend')
+    def test_keys_are_pushed_to_membership_in_sync(self, mocked_get_backend, mocked_get_redis):
+        tasks.push_membership_ssh_public_keys(self.membership.pk, [self.public_key.uuid.hex])
+
+        backend = mocked_get_backend.return_value
+        self.assertEqual(backend.push_ssh_public_keys.call_count, 1)
+        membership, public_keys = backend.push_ssh_public_keys.call_args[0]
+        self.assertEqual(membership, self.membership)
+        self.assertEqual(list(public_keys), [self.public_key])
+
+    @mock.patch('nodeconductor.iaas.tasks.iaas.get_redis', return_value=None)
+    @mock.patch('nodeconductor.iaas.models.Cloud.get_backend')
+    def test_keys_are_not_pushed_to_erred_membership(self, mocked_get_backend, mocked_get_redis):
+        self.membership.state = core_models.SynchronizationStates.ERRED
+        self.membership.save()
+
+        tasks.push_membership_ssh_public_keys(self.membership.pk, [self.public_key.uuid.hex])
+
+        self.assertFalse(mocked_get_backend.return_value.push_ssh_public_keys.called)
@@ -1,4 +1,6 @@
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from mock import patch, Mock
 from rest_framework import test, status
 
@@ -115,6 +117,24 @@ class CustomerStatsTest(test.APITransactionTestCase):
         ]
         self.assertItemsEqual(response.data, expected_result)
 
+    def test_number_of_queries_does_not_depend_on_number_of_customers(self):
+        for user in self.staff, self.owner:
+            self.client.force_authenticate(user)
+
+            with CaptureQueriesContext(connection) as initial_queries:
+                self.client.get(self.url)
+
+            for customer in structure_factories.CustomerFactory.create_batch(3):
+                customer.add_user(self.owner, structure_models.CustomerRole.OWNER)
+                structure_factories.ProjectGroupFactory(customer=customer)
+                factories.InstanceFactory(cloud_project_membership__project__customer=customer)
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(queries), len(initial_queries))
+
 
 class UsageStatsTest(test.APITransactionTestCase):
 
@@ -0,0 +1,38 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from nodeconductor.iaas.tests import factories
+from nodeconductor.server.celery import PriorityRouter, get_queue_shard
+
+
+class CloudQueueShardsRoutingTest(TestCase):
+
+    def setUp(self):
+        self.router = PriorityRouter()
+        self.task_name = 'nodeconductor.iaas.tasks.openstack.openstack_provision_instance'
+
+    def route_instance_provisioning(self, instance):
+        return self.router.route_for_task(self.task_name, (instance.uuid.hex, 'flavor-id'), {})
+
+    def test_heavy_task_is_routed_to_heavy_queue_if_sharding_is_disabled(self):
+        instance = factories.InstanceFactory()
+
+        self.assertEqual(self.route_instance_provisioning(instance), {'queue': 'heavy'})
+
+    @override_settings(NODECONDUCTOR={'CLOUD_QUEUE_SHARDS': {'COUNT': 4}})
+    def test_provisioning_is_routed_to_shard_of_instance_cloud(self):
+        instance = factories.InstanceFactory()
+        auth_url = instance.cloud_project_membership.cloud.auth_url
+
+        route = self.route_instance_provisioning(instance)
+
+        self.assertEqual(route, {'queue': 'heavy.%s' % get_queue_shard(auth_url, 4)})
+
+    def test_cloud_shard_is_stable_and_bounded(self):
+        shards = [get_queue_shard('http://keystone-%s.example.com:5000/v2.0' % i, 4) for i in range(20)]
+
+        self.assertTrue(all(0 <= shard < 4 for shard in shards))
+        self.assertEqual(get_queue_shard('http://keystone.example.com:5000/v2.0', 4),
+                         get_queue_shard('http://keystone.example.com:5000/v2.0', 4))
@@ -247,6 +247,34 @@ class LicenseStatsTests(test.APITransactionTestCase):
                 })
         self.assertItemsEqual(response.data, expected_result)
 
+    def test_licenses_stats_rollup_is_updated_on_instance_creation_and_deletion(self):
+        stats = models.InstanceLicenseStats.objects.get(
+            project=self.first_project, template_license=self.first_template_license)
+        self.assertEqual(stats.licenses_count, 1)
+
+        factories.InstanceFactory(template=self.template, cloud_project_membership__project=self.first_project)
+        self.assertEqual(models.InstanceLicenseStats.objects.get(pk=stats.pk).licenses_count, 2)
+
+        self.first_instance.delete()
+        self.second_instance.delete()
+        self.assertEqual(models.InstanceLicenseStats.objects.get(pk=stats.pk).licenses_count, 1)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(self.url, {'aggregate': ['name', 'project']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertItemsEqual([(row['name'], row['project_name'], row['count']) for row in response.data], [
+            (self.first_template_license.name, self.first_project.name, 1),
+            (self.second_template_license.name, self.first_project.name, 1),
+        ])
+
+    def test_group_manager_can_see_aggregated_stats_only_for_his_group(self):
+        self.client.force_authenticate(self.group_manager)
+        response = self.client.get(self.url, {'aggregate': 'project_group'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{
+            'project_group_uuid': str(self.first_group.uuid), 'project_group_name': self.first_group.name, 'count': 2,
+        }])
+
     def test_owner_can_see_stats_only_for_his_customer(self):
         self.client.force_authenticate(self.owner)
         # instance license for other customer:
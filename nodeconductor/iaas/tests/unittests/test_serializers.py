@@ -137,6 +137,26 @@ class InstanceSerializerTest(TestCase):
         data = self.serialize_instance(external_ips='8.8.8.8')
         self.assertDictContainsSubset({'external_ips': ['8.8.8.8']}, data)
 
+    def test_eager_loading_paths_cover_related_objects(self):
+        serializer = serializers.InstanceSerializer()
+        select_related_paths, prefetch_related_paths = serializer.get_eager_loading_paths()
+
+        self.assertItemsEqual(select_related_paths, [
+            'cloud_project_membership',
+            'cloud_project_membership__cloud',
+            'cloud_project_membership__project',
+            'cloud_project_membership__project__customer',
+            'template',
+        ])
+        for path in (
+            'cloud_project_membership__project__project_groups',
+            'backups',
+            'backup_schedules',
+            'security_groups__security_group__rules',
+            'instance_licenses__template_license',
+        ):
+            self.assertIn(path, prefetch_related_paths)
+
     def serialize_instance(self, **kwargs):
         instance = factories.InstanceFactory(**kwargs)
         factory = RequestFactory()
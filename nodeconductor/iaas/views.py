@@ -25,12 +25,15 @@ from nodeconductor.core import models as core_models
 from nodeconductor.core import exceptions as core_exceptions
 from nodeconductor.core.filters import DjangoMappingFilterBackend
 from nodeconductor.core.log import EventLoggerAdapter
+from nodeconductor.core.pagination import KeysetLinkHeaderPagination
 from nodeconductor.core.models import SynchronizationStates
 from nodeconductor.core.utils import sort_dict
 from nodeconductor.iaas import models
 from nodeconductor.iaas import serializers
 from nodeconductor.iaas import tasks
+from nodeconductor.quotas import utils as quotas_utils
 from nodeconductor.iaas.serializers import ServiceSerializer
+from nodeconductor.structure import etags as structure_etags
 from nodeconductor.structure import filters as structure_filters
 from nodeconductor.structure.models import ProjectRole, Project, Customer, ProjectGroup, CustomerRole
 
@@ -230,7 +233,10 @@ class InstanceFilter(django_filters.FilterSet):
         }
 
 
-class InstanceViewSet(mixins.CreateModelMixin,
+class InstanceViewSet(structure_etags.ConditionalListMixin,
+                      core_mixins.EagerLoadMixin,
+                      core_mixins.ExportMixin,
+                      mixins.CreateModelMixin,
                       mixins.RetrieveModelMixin,
                       mixins.UpdateModelMixin,
                       mixins.ListModelMixin,
@@ -245,6 +251,7 @@ class InstanceViewSet(mixins.CreateModelMixin,
     filter_backends = (structure_filters.GenericRoleFilter, DjangoMappingFilterBackend)
     permission_classes = (permissions.IsAuthenticated, permissions.DjangoObjectPermissions)
     filter_class = InstanceFilter
+    pagination_class = KeysetLinkHeaderPagination
 
     def get_queryset(self):
         queryset = super(InstanceViewSet, self).get_queryset()
@@ -571,7 +578,8 @@ class TemplateLicenseViewSet(viewsets.ModelViewSet):
     lookup_field = 'uuid'
 
     def get_queryset(self):
-        if not self.request.user.is_staff:
+        # Statistics are filtered by user permissions, licenses are visible to staff only
+        if not self.request.user.is_staff and self.action != 'stats':
             raise Http404()
         queryset = super(TemplateLicenseViewSet, self).get_queryset()
         if 'customer' in self.request.query_params:
@@ -579,10 +587,10 @@ class TemplateLicenseViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(templates__images__cloud__customer__uuid=customer_uuid)
         return queryset
 
-    def _filter_queryset(self, queryset):
+    def _filter_queryset(self, queryset, project_path='instance__cloud_project_membership__project'):
         if 'customer' in self.request.query_params:
             customer_uuid = self.request.query_params['customer']
-            queryset = queryset.filter(instance__cloud_project_membership__project__customer__uuid=customer_uuid)
+            queryset = queryset.filter(**{project_path + '__customer__uuid': customer_uuid})
         if 'name' in self.request.query_params:
             queryset = queryset.filter(template_license__name=self.request.query_params['name'])
         if 'type' in self.request.query_params:
@@ -591,21 +599,25 @@ class TemplateLicenseViewSet(viewsets.ModelViewSet):
 
     @list_route()
     def stats(self, request):
-        queryset = structure_filters.filter_queryset_for_user(models.InstanceLicense.objects.all(), request.user)
-        queryset = self._filter_queryset(queryset)
-
         aggregate_parameters = self.request.query_params.getlist('aggregate', [])
+
+        if not aggregate_parameters:
+            queryset = structure_filters.filter_queryset_for_user(models.InstanceLicense.objects.all(), request.user)
+            queryset = self._filter_queryset(queryset)
+            return Response(queryset.values().annotate(count=django_models.Count('id', distinct=True)))
+
+        # Pairs of rollup field path and its name in response
         aggregate_parameter_to_field_map = {
             'project': [
-                'instance__cloud_project_membership__project__uuid',
-                'instance__cloud_project_membership__project__name',
+                ('project__uuid', 'project_uuid'),
+                ('project__name', 'project_name'),
             ],
             'project_group': [
-                'instance__cloud_project_membership__project__project_groups__uuid',
-                'instance__cloud_project_membership__project__project_groups__name',
+                ('project__project_groups__uuid', 'project_group_uuid'),
+                ('project__project_groups__name', 'project_group_name'),
             ],
-            'type': ['template_license__license_type'],
-            'name': ['template_license__name'],
+            'type': [('template_license__license_type', 'type')],
+            'name': [('template_license__name', 'name')],
         }
 
         aggregate_fields = []
@@ -615,24 +627,24 @@ class TemplateLicenseViewSet(viewsets.ModelViewSet):
                                 status=status.HTTP_400_BAD_REQUEST)
             aggregate_fields += aggregate_parameter_to_field_map[aggregate_parameter]
 
-        queryset = queryset.values(*aggregate_fields).annotate(count=django_models.Count('id', distinct=True))
+        queryset = models.InstanceLicenseStats.objects.filter(licenses_count__gt=0)
+        if not request.user.is_staff:
+            # Filter by subquery, joins over user roles would multiply summed counts
+            visible_stats = structure_filters.filter_queryset_for_user(queryset, request.user)
+            queryset = queryset.filter(pk__in=visible_stats.values('pk'))
+        queryset = self._filter_queryset(queryset, project_path='project')
+
+        queryset = queryset.values(*[db_name for db_name, _ in aggregate_fields]).annotate(
+            count=django_models.Sum('licenses_count'))
         # This hack can be removed when https://code.djangoproject.com/ticket/16735 will be closed
-        # Replace databases paths by normal names. Ex: instance__project__uuid is replaced by project_uuid
-        name_replace_map = {
-            'instance__cloud_project_membership__project__uuid': 'project_uuid',
-            'instance__cloud_project_membership__project__name': 'project_name',
-            'instance__cloud_project_membership__project__project_groups__uuid': 'project_group_uuid',
-            'instance__cloud_project_membership__project__project_groups__name': 'project_group_name',
-            'template_license__license_type': 'type',
-            'template_license__name': 'name',
-        }
-        for d in queryset:
-            for db_name, output_name in name_replace_map.iteritems():
-                if db_name in d:
-                    d[output_name] = d[db_name]
-                    del d[db_name]
+        # Replace databases paths by normal names. Ex: project__uuid is replaced by project_uuid
+        data = []
+        for row in queryset:
+            item = {output_name: row[db_name] for db_name, output_name in aggregate_fields}
+            item['count'] = row['count']
+            data.append(item)
 
-        return Response(queryset)
+        return Response(data)
 
 
 class ServiceFilter(django_filters.FilterSet):
@@ -731,7 +743,7 @@ class ServiceFilter(django_filters.FilterSet):
 
 
 # XXX: This view has to be rewritten or removed after haystack implementation
-class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
+class ServiceViewSet(core_mixins.ExportMixin, viewsets.ReadOnlyModelViewSet):
     queryset = models.Instance.objects.exclude(
         state=models.Instance.States.DELETING,
     )
@@ -747,6 +759,18 @@ class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
             period = '%s-%s' % (today.year, today.month)
         return period
 
+    def get_queryset(self):
+        queryset = super(ServiceViewSet, self).get_queryset()
+
+        period_slas = models.InstanceSlaHistory.objects.filter(period=self._get_period())
+        return queryset.select_related(
+            'template',
+            'cloud_project_membership__project__customer',
+        ).prefetch_related(
+            'cloud_project_membership__project__project_groups',
+            django_models.Prefetch('slas', queryset=period_slas, to_attr='period_slas'),
+        )
+
     def get_serializer_context(self):
         """
         Extra context provided to the serializer class.
@@ -797,8 +821,8 @@ class ResourceStatsView(views.APIView):
             )
 
         memberships = models.CloudProjectMembership.objects.filter(cloud__auth_url=auth_url)
-        quota_values = models.CloudProjectMembership.get_sum_of_quotas_as_dict(
-            memberships, ('vcpu', 'ram', 'storage'), fields=['limit'])
+        quota_values = quotas_utils.QuotaLoader(
+            memberships, ('vcpu', 'ram', 'storage'), fields=['limit']).get_sum()
         # for backward compatibility we need to use this names:
         quota_stats = {
             'vcpu_quota': quota_values['vcpu'],
@@ -814,23 +838,37 @@ class ResourceStatsView(views.APIView):
 
 class CustomerStatsView(views.APIView):
 
+    def _get_counts_per_customer(self, model, user):
+        """
+        Return dict of customer pk to number of visible objects of given model.
+
+        Counts are calculated with a single grouped query regardless of number of customers.
+        """
+        customer_path = model.Permissions.customer_path
+        queryset = structure_filters.filter_queryset_for_user(model.objects.all(), user)
+        counts = (
+            queryset
+            .order_by()
+            .values_list(customer_path)
+            .annotate(count=django_models.Count('pk', distinct=True))
+        )
+        return dict(counts)
+
     def get(self, request, format=None):
-        customer_statistics = []
         customer_queryset = structure_filters.filter_queryset_for_user(Customer.objects.all(), request.user)
+
+        projects_counts = self._get_counts_per_customer(Project, request.user)
+        project_groups_counts = self._get_counts_per_customer(ProjectGroup, request.user)
+        instances_counts = self._get_counts_per_customer(models.Instance, request.user)
+
+        customer_statistics = []
         for customer in customer_queryset:
-            projects_count = structure_filters.filter_queryset_for_user(
-                Project.objects.filter(customer=customer), request.user).count()
-            project_groups_count = structure_filters.filter_queryset_for_user(
-                ProjectGroup.objects.filter(customer=customer), request.user).count()
-            instances_count = structure_filters.filter_queryset_for_user(
-                models.Instance.objects.filter(cloud_project_membership__project__customer=customer),
-                request.user).count()
             customer_statistics.append({
                 'name': customer.name,
                 'abbreviation': customer.abbreviation,
-                'projects': projects_count,
-                'project_groups': project_groups_count,
-                'instances': instances_count,
+                'projects': projects_counts.get(customer.pk, 0),
+                'project_groups': project_groups_counts.get(customer.pk, 0),
+                'instances': instances_counts.get(customer.pk, 0),
             })
 
         return Response(customer_statistics, status=status.HTTP_200_OK)
@@ -1174,6 +1212,6 @@ class QuotaStatsView(views.APIView):
         serializer.is_valid(raise_exception=True)
 
         memberships = serializer.get_memberships(request.user)
-        sum_of_quotas = models.CloudProjectMembership.get_sum_of_quotas_as_dict(
-            memberships, ['vcpu', 'ram', 'storage', 'max_instances'])
+        sum_of_quotas = quotas_utils.QuotaLoader(
+            memberships, ['vcpu', 'ram', 'storage', 'max_instances']).get_sum()
         return Response(sum_of_quotas, status=status.HTTP_200_OK)
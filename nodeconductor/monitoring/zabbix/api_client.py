@@ -7,6 +7,7 @@ from django.conf import settings
 from django.utils import six
 from pyzabbix import ZabbixAPI, ZabbixAPIException
 
+from nodeconductor.core import profiling
 from nodeconductor.monitoring.zabbix.errors import ZabbixError
 
 
@@ -202,6 +203,7 @@ class ZabbixApiClient(object):
         unsafe_session.verify = False
 
         api = ZabbixAPI(server=self.server, session=unsafe_session)
+        profiling.profile_requests(api, 'zabbix', method_name='do_request')
         api.login(self.username, self.password)
         return api
 
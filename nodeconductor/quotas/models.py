@@ -4,7 +4,7 @@ from django.db import models, transaction
 from django.db.models import Sum
 from django.utils.encoding import python_2_unicode_compatible
 
-from nodeconductor.quotas import exceptions, managers
+from nodeconductor.quotas import exceptions, managers, signals
 from nodeconductor.core.models import UuidMixin, NameMixin
 
 
@@ -74,6 +74,8 @@ class QuotaModelMixin(models.Model):
 
     def set_quota_limit(self, quota_name, limit):
         self.quotas.filter(name=quota_name).update(limit=limit)
+        signals.quota_limit_updated.send(
+            sender=self.__class__, instance=self, quota_name=quota_name, limit=limit)
 
     def set_quota_usage(self, quota_name, usage):
         with transaction.atomic():
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Quota limit is changed with queryset update, so no post_save is sent for the quota
+# sender = scope class, e.g. Customer or Project
+quota_limit_updated = Signal(providing_args=['instance', 'quota_name', 'limit'])
@@ -4,6 +4,7 @@ from django.test import TestCase
 
 from nodeconductor.iaas import models as iaas_models
 from nodeconductor.iaas.tests import factories as iaas_factories
+from nodeconductor.quotas import utils
 
 
 class QuotaModelMixinTest(TestCase):
@@ -30,3 +31,36 @@ class QuotaModelMixinTest(TestCase):
                 owner.quotas.get(name=quota_name).usage for owner in owners)
 
         self.assertEqual(expected_sum_of_quotas, sum_of_quotas)
+
+
+class QuotaLoaderTest(TestCase):
+
+    def setUp(self):
+        self.memberships = iaas_factories.CloudProjectMembershipFactory.create_batch(3)
+        for membership in self.memberships:
+            for quota_name in membership.QUOTAS_NAMES:
+                limit = random.choice([10, 20, 30, 40])
+                membership.set_quota_limit(quota_name, limit)
+                membership.set_quota_usage(quota_name, limit / 2)
+
+    def test_loader_sum_is_equal_to_sum_of_quotas_as_dict(self):
+        owners = self.memberships[:2]
+
+        loader = utils.QuotaLoader(owners)
+
+        self.assertEqual(
+            loader.get_sum(), iaas_models.CloudProjectMembership.get_sum_of_quotas_as_dict(owners))
+
+    def test_loader_returns_quotas_of_each_scope(self):
+        loader = utils.QuotaLoader(iaas_models.CloudProjectMembership.objects.all(), fields=['limit'])
+
+        for membership in self.memberships:
+            expected_quotas = {quota.name: quota.limit for quota in membership.quotas.all()}
+            self.assertEqual(loader.get_values(membership), expected_quotas)
+
+    def test_loader_fetches_quotas_of_all_scopes_with_one_query(self):
+        loader = utils.QuotaLoader(self.memberships)
+
+        with self.assertNumQueries(1):
+            for membership in self.memberships:
+                loader.get_values(membership)
@@ -1,6 +1,95 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes import models as ct_models
 from django.db import models as django_models
-from nodeconductor.quotas import models
+
+from nodeconductor.quotas import exceptions, models
 
 
 def get_models_with_quotas():
     return [m for m in django_models.get_models() if issubclass(m, models.QuotaModelMixin)]
+
+
+class QuotaLoader(object):
+    """
+    Load quotas of many scopes with one query and pivot them in python.
+
+    `scopes` is a queryset or a list of instances of the same model with quotas.
+
+    Example:
+        loader = QuotaLoader(projects, ['ram', 'vcpu'], fields=['limit'])
+        loader.get_values(project)  # {'ram': 1024.0, 'vcpu': 2.0}
+        loader.get_sum()  # same format as QuotaModelMixin.get_sum_of_quotas_as_dict
+    """
+
+    def __init__(self, scopes, quota_names=None, fields=('usage', 'limit')):
+        self.scopes = scopes
+        self.fields = tuple(fields)
+        self._values = None
+
+        if isinstance(scopes, django_models.query.QuerySet):
+            self.model = scopes.model
+        else:
+            scope_models = set(scope._meta.model for scope in scopes)
+            if len(scope_models) > 1:
+                raise exceptions.QuotaError('All scopes have to be instances of the same model')
+            self.model = scope_models.pop() if scope_models else None
+
+        if quota_names is None and self.model is not None:
+            quota_names = self.model.QUOTAS_NAMES
+        self.quota_names = quota_names
+
+    def _load(self):
+        if isinstance(self.scopes, django_models.query.QuerySet):
+            object_ids = self.scopes.values('pk')
+        else:
+            object_ids = [scope.pk for scope in self.scopes]
+
+        values = defaultdict(dict)
+        if self.model is not None:
+            quotas = models.Quota.objects.filter(
+                content_type=ct_models.ContentType.objects.get_for_model(self.model),
+                object_id__in=object_ids,
+                name__in=self.quota_names,
+            ).values_list('object_id', 'name', *self.fields)
+
+            for quota in quotas:
+                object_id, name = quota[:2]
+                values[object_id][name] = dict(zip(self.fields, quota[2:]))
+
+        return values
+
+    def _format(self, quotas):
+        result = {}
+        for name, quota in quotas.items():
+            if 'usage' in quota:
+                result[name + '_usage'] = quota['usage']
+            if 'limit' in quota:
+                result[name] = quota['limit']
+        return result
+
+    def get_quotas(self):
+        """
+        Return dictionary of quotas values keyed by scope primary key.
+        """
+        if self._values is None:
+            self._values = self._load()
+        return self._values
+
+    def get_values(self, scope):
+        """
+        Return dictionary of scope quotas in get_sum_of_quotas_as_dict format.
+        """
+        return self._format(self.get_quotas().get(scope.pk, {}))
+
+    def get_sum(self):
+        """
+        Return dictionary of sum of all scopes' quotas in get_sum_of_quotas_as_dict format.
+        """
+        sums = {}
+        for quotas in self.get_quotas().values():
+            for name, quota in quotas.items():
+                quota_sum = sums.setdefault(name, dict.fromkeys(quota, 0))
+                for field, value in quota.items():
+                    quota_sum[field] += value
+        return self._format(sums)
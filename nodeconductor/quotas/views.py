@@ -6,9 +6,11 @@ from rest_framework import viewsets
 from nodeconductor.core.pagination import UnlimitedLinkHeaderPagination
 
 from nodeconductor.quotas import models, serializers
+from nodeconductor.structure import etags
 
 
-class QuotaViewSet(mixins.UpdateModelMixin,
+class QuotaViewSet(etags.ConditionalListMixin,
+                   mixins.UpdateModelMixin,
                    viewsets.ReadOnlyModelViewSet):
 
     queryset = models.Quota.objects.all()
@@ -35,6 +35,7 @@ INSTALLED_APPS = (
     'nodeconductor.ldapsync',
 
     'nodeconductor.testdata',
+    'nodeconductor.benchmarks',
 
     # Template overrides need to happen before admin is imported.
     'django.contrib.admin',
@@ -47,6 +48,7 @@ INSTALLED_APPS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    'nodeconductor.core.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -1,13 +1,22 @@
 from __future__ import absolute_import
 
+import calendar
+import hashlib
+import logging
 import os
+import time
+
+import dateutil.parser
 
 from celery import Celery
 from celery import signals
 from django.conf import settings
 
+from nodeconductor.core import metrics, profiling
 from nodeconductor.core.middleware import set_current_user, get_current_user, reset_current_user
 
+logger = logging.getLogger(__name__)
+
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nodeconductor.server.settings')  # XXX:
 
@@ -19,14 +28,48 @@ app.config_from_object('django.conf:settings')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
 
+def get_queue_shards_settings():
+    """
+    Return number of queue shards and mapping of worker pools to the shards they consume.
+    Sharding is disabled unless there are at least two shards.
+    """
+    shards_settings = getattr(settings, 'NODECONDUCTOR', {}).get('CLOUD_QUEUE_SHARDS', {})
+    return shards_settings.get('COUNT', 1), shards_settings.get('POOLS', {})
+
+
+def get_queue_shard(auth_url, shards_count):
+    """
+    Return shard of the cloud, it stays the same for every process and restart.
+    """
+    return int(hashlib.md5(auth_url.encode('utf-8')).hexdigest(), 16) % shards_count
+
+
+def get_shard_queue(queue, shard):
+    return '%s.%s' % (queue, shard)
+
+
 class PriorityRouter(object):
     """ Run heavy tasks in a separate queue.
         One must supply is_heavy_task=True as a keyword argument to task decorator.
+
+        Tasks targeting a cloud are routed to a shard of their queue derived from auth_url of the cloud,
+        so that a slow cloud blocks only workers of its shard. One must supply get_cloud_auth_url
+        as a keyword argument to task decorator, it receives arguments of the task and returns auth_url.
     """
-    def route_for_task(self, task_name, *args, **kwargs):
+    def route_for_task(self, task_name, args=None, kwargs=None):
         task = app.tasks.get(task_name)
-        if getattr(task, 'is_heavy_task', False):
-            return {'queue': 'heavy'}
+        queue = 'heavy' if getattr(task, 'is_heavy_task', False) else None
+
+        get_cloud_auth_url = getattr(task, 'get_cloud_auth_url', None)
+        shards_count, _ = get_queue_shards_settings()
+        if get_cloud_auth_url is not None and shards_count > 1:
+            auth_url = get_cloud_auth_url(*(args or ()), **(kwargs or {}))
+            if auth_url:
+                queue = get_shard_queue(queue or settings.CELERY_DEFAULT_QUEUE,
+                                        get_queue_shard(auth_url, shards_count))
+
+        if queue is not None:
+            return {'queue': queue}
         return None
 
 
@@ -93,3 +136,64 @@ def bind_current_user(sender=None, **kwargs):
 @signals.task_postrun.connect
 def unbind_current_user(sender=None, **kwargs):
     reset_current_user()
+
+
+# Profiles of the sampled tasks being executed, keyed by task id
+_task_profiles = {}
+
+
+@signals.task_prerun.connect
+def start_task_profiling(task_id=None, **kwargs):
+    profile = profiling.start_profiling()
+    if profile is not None:
+        _task_profiles[task_id] = profile
+
+
+@signals.task_postrun.connect
+def stop_task_profiling(sender=None, task_id=None, **kwargs):
+    profile = profiling.stop_profiling(_task_profiles.pop(task_id, None))
+    if profile is not None:
+        logger.info('Task %s (%s) profile: %s', sender.name, task_id, profile.get_server_timing())
+
+
+# Start times of the tasks being executed, keyed by task id
+_task_start_times = {}
+
+
+@signals.before_task_publish.connect
+def stamp_publish_time(sender=None, body=None, **kwargs):
+    if body is None:
+        return
+
+    # tasks scheduled for later are considered waiting since their ETA
+    if body.get('eta'):
+        eta = dateutil.parser.parse(body['eta'])
+        if eta.tzinfo is None:
+            published_at = time.mktime(eta.timetuple())
+        else:
+            published_at = calendar.timegm(eta.utctimetuple())
+    else:
+        published_at = time.time()
+
+    body['kwargs']['published_at'] = published_at
+
+
+@signals.task_prerun.connect
+def start_task_timing(task_id=None, task=None, **kwargs):
+    published_at = kwargs['kwargs'].pop('published_at', None)
+
+    if task.request.is_eager:
+        return
+
+    start_time = time.time()
+    _task_start_times[task_id] = start_time
+
+    if published_at is not None:
+        metrics.record_task(task.name, wait_time=max(start_time - published_at, 0))
+
+
+@signals.task_postrun.connect
+def stop_task_timing(task_id=None, task=None, state=None, **kwargs):
+    start_time = _task_start_times.pop(task_id, None)
+    if start_time is not None:
+        metrics.record_task(task.name, run_time=time.time() - start_time, state=state)
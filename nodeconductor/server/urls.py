@@ -35,6 +35,7 @@ urlpatterns = patterns(
     url(r'^api/', include('nodeconductor.iaas.urls')),
     url(r'^api/', include('nodeconductor.structure.urls')),
     url(r'^api/version/', 'nodeconductor.core.views.version_detail'),
+    url(r'^api/metrics/', 'nodeconductor.core.views.metrics_detail'),
     url(r'^api-auth/password/', 'nodeconductor.core.views.obtain_auth_token'),
     url(r'^api-auth/saml2/', 'nodeconductor.core.views.assertion_consumer_service'),
     url(r'^api-auth/', include('rest_framework.urls',
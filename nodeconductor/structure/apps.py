@@ -5,6 +5,8 @@ from django.contrib.auth import get_user_model
 from django.db.models import signals
 
 from nodeconductor.quotas import handlers as quotas_handlers
+from nodeconductor.quotas import signals as quotas_signals
+from nodeconductor.quotas.models import Quota
 from nodeconductor.structure import filters
 from nodeconductor.structure import handlers
 from nodeconductor.structure import signals as structure_signals
@@ -133,3 +135,45 @@ class StructureConfig(AppConfig):
                 sender=model,
                 dispatch_uid='nodeconductor.iaas.handlers.decrease_customer_nc_users_quota_on_customer_user_deletion',
             )
+
+        # invalidate ETags of customers on change of objects listed by ETagged endpoints,
+        # models of other applications are connected by these applications
+        for model in (Customer, Project, ProjectGroup, Quota):
+            name = model.__name__
+            signals.post_save.connect(
+                handlers.bump_etag_customer_versions,
+                sender=model,
+                dispatch_uid='nodeconductor.structure.handlers.bump_etag_customer_versions_on_%s_save' % name,
+            )
+
+            signals.pre_delete.connect(
+                handlers.collect_etag_customers_before_delete,
+                sender=model,
+                dispatch_uid='nodeconductor.structure.handlers.collect_etag_customers_before_%s_delete' % name,
+            )
+
+            signals.post_delete.connect(
+                handlers.bump_etag_customer_versions,
+                sender=model,
+                dispatch_uid='nodeconductor.structure.handlers.bump_etag_customer_versions_on_%s_delete' % name,
+            )
+
+        quotas_signals.quota_limit_updated.connect(
+            handlers.bump_etag_customer_versions,
+            dispatch_uid='nodeconductor.structure.handlers.bump_etag_customer_versions_on_quota_limit_update',
+        )
+
+        for model in structure_models_with_roles:
+            structure_signals.structure_role_granted.connect(
+                handlers.bump_etag_user_version,
+                sender=model,
+                dispatch_uid='nodeconductor.structure.handlers.bump_etag_user_version_on_%s_role_grant' % (
+                    model.__name__),
+            )
+
+            structure_signals.structure_role_revoked.connect(
+                handlers.bump_etag_user_version,
+                sender=model,
+                dispatch_uid='nodeconductor.structure.handlers.bump_etag_user_version_on_%s_role_revoke' % (
+                    model.__name__),
+            )
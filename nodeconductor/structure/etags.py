@@ -0,0 +1,189 @@
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import logging
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+from redis.exceptions import RedisError
+from rest_framework import status
+from rest_framework.response import Response
+
+from nodeconductor.core.metrics import get_redis
+from nodeconductor.structure.filters import filter_queryset_for_user
+from nodeconductor.structure.models import Customer
+
+logger = logging.getLogger(__name__)
+
+# Versions are bumped by web and Celery worker processes alike, so they are kept
+# in Redis of Celery result backend, ETags are not issued if result backend is not Redis.
+# Versions are random tokens rather than counters, so that a lost version is never reissued.
+ALL_CUSTOMERS_VERSION_KEY = 'nc:structure:version:customers'
+CUSTOMER_VERSION_KEY = 'nc:structure:version:customer:%s'
+USER_VERSION_KEY = 'nc:structure:version:user:%s'
+USER_CUSTOMERS_KEY = 'nodeconductor:structure:user:%s:customers:%s'
+
+
+def _get_versions(redis, keys):
+    versions = redis.mget(keys)
+
+    missing_keys = [key for key, version in zip(keys, versions) if version is None]
+    if missing_keys:
+        for key in missing_keys:
+            redis.set(key, uuid.uuid4().hex, nx=True)
+        versions = redis.mget(keys)
+
+    return versions
+
+
+def _write_versions(keys):
+    redis = get_redis()
+    if redis is None:
+        return
+
+    try:
+        redis.mset(dict((key, uuid.uuid4().hex) for key in keys))
+    except RedisError:
+        logger.warning('Failed to bump ETag versions %s', ', '.join(keys), exc_info=True)
+
+
+def _set_versions(keys):
+    """
+    Set new versions once the current transaction is committed. Otherwise a poll made before the commit
+    would get ETag of new versions along with old data, and would be answered with 304 until the next change.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _write_versions(keys)
+        return
+
+    # Django 1.7 has no commit hooks, commit and rollback of the connection are wrapped instead
+    pending_keys = getattr(connection, 'etag_pending_keys', None)
+    if pending_keys is None:
+        pending_keys = connection.etag_pending_keys = set()
+        commit, rollback = connection.commit, connection.rollback
+
+        def commit_and_write_versions():
+            commit()
+            if pending_keys:
+                committed_keys = list(pending_keys)
+                pending_keys.clear()
+                _write_versions(committed_keys)
+
+        def rollback_and_discard_versions():
+            pending_keys.clear()
+            rollback()
+
+        connection.commit = commit_and_write_versions
+        connection.rollback = rollback_and_discard_versions
+
+    pending_keys.update(keys)
+
+
+def bump_customer_versions(customer_ids):
+    """
+    Mark data visible within given customers as changed.
+    """
+    keys = [CUSTOMER_VERSION_KEY % customer_id for customer_id in customer_ids]
+    keys.append(ALL_CUSTOMERS_VERSION_KEY)
+    _set_versions(keys)
+
+
+def bump_all_customer_versions():
+    """
+    Mark data visible within all customers as changed, e.g. templates shared by them.
+    """
+    bump_customer_versions(Customer.objects.values_list('pk', flat=True))
+
+
+def bump_user_version(user):
+    """
+    Mark set of customers visible to user as changed.
+    """
+    _set_versions([USER_VERSION_KEY % user.pk])
+
+
+def get_customer_ids(instance):
+    """
+    Return ids of customers that can see the instance according to its model permissions.
+    """
+    model = instance._meta.model
+    customer_path = getattr(getattr(model, 'Permissions', None), 'customer_path', None)
+
+    if customer_path is None:
+        return []
+
+    if customer_path == 'self':
+        return [instance.pk]
+
+    customer_ids = model._default_manager.filter(pk=instance.pk).values_list(customer_path, flat=True)
+    return [customer_id for customer_id in customer_ids if customer_id is not None]
+
+
+def _get_visible_customer_ids(user, user_version):
+    # Key includes the shared user version, so the list can be kept in a per-process cache
+    key = USER_CUSTOMERS_KEY % (user.pk, user_version)
+    customer_ids = cache.get(key)
+
+    if customer_ids is None:
+        customer_ids = sorted(filter_queryset_for_user(
+            Customer.objects.all(), user).values_list('pk', flat=True))
+        cache.set(key, customer_ids)
+
+    return customer_ids
+
+
+def get_etag(request):
+    """
+    Return ETag of response to request made by user or None if versions are not available.
+
+    ETag changes whenever data of any customer visible to user is changed,
+    or set of visible customers is changed.
+    """
+    redis = get_redis()
+    if redis is None:
+        return None
+
+    user = request.user
+
+    try:
+        if user.is_staff:
+            versions = _get_versions(redis, [ALL_CUSTOMERS_VERSION_KEY])
+        else:
+            user_version, = _get_versions(redis, [USER_VERSION_KEY % user.pk])
+            customer_ids = _get_visible_customer_ids(user, user_version)
+            versions = [user_version] + _get_versions(redis, [CUSTOMER_VERSION_KEY % pk for pk in customer_ids])
+    except RedisError:
+        logger.warning('Failed to get ETag versions', exc_info=True)
+        return None
+
+    if None in versions:
+        return None
+
+    etag_source = [user.pk, request.get_full_path(), request.META.get('HTTP_ACCEPT', '')] + versions
+    return hashlib.md5(json.dumps(etag_source).encode('utf-8')).hexdigest()
+
+
+class ConditionalListMixin(object):
+    """
+    Answer list requests having ETag of the current data in If-None-Match header
+    with "304 Not Modified" before queryset is evaluated.
+    """
+
+    def list(self, request, *args, **kwargs):
+        etag = get_etag(request)
+
+        if etag is not None:
+            if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+            if etag in if_none_match or '*' in if_none_match:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': quote_etag(etag)})
+
+        response = super(ConditionalListMixin, self).list(request, *args, **kwargs)
+
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = quote_etag(etag)
+
+        return response
@@ -5,9 +5,11 @@ import logging
 from django.contrib.auth.models import Group
 from django.db import models, transaction
 
+from nodeconductor.backup.models import BackupSourceAbstractModel
 from nodeconductor.core.log import EventLoggerAdapter
 from nodeconductor.quotas import handlers as quotas_handlers
-from nodeconductor.structure import signals
+from nodeconductor.quotas.models import Quota
+from nodeconductor.structure import etags, signals
 from nodeconductor.structure.models import CustomerRole, Project, ProjectRole, ProjectGroupRole, Customer, ProjectGroup
 
 
@@ -139,3 +141,42 @@ def change_customer_nc_users_quota(sender, structure, user, role, signal, **kwar
             customer.add_quota_usage('nc_user_count', 1)
         else:
             customer.add_quota_usage('nc_user_count', -1)
+
+
+def _get_etag_customer_ids(instance):
+    # Quotas and backups are listed along with the objects they belong to
+    if isinstance(instance, Quota):
+        instance = instance.scope
+    elif isinstance(instance, BackupSourceAbstractModel):
+        instance = instance.backup_source
+
+    if instance is None:
+        return []
+
+    return etags.get_customer_ids(instance)
+
+
+def collect_etag_customers_before_delete(sender, instance, **kwargs):
+    # Relations of the instance can't be followed after its deletion
+    instance._etag_customer_ids = _get_etag_customer_ids(instance)
+
+
+def bump_etag_customer_versions(sender, instance, **kwargs):
+    """ Invalidate ETags of customers the saved, deleted or transitioned instance is visible to """
+    customer_ids = getattr(instance, '_etag_customer_ids', None)
+    if customer_ids is None:
+        customer_ids = _get_etag_customer_ids(instance)
+
+    if customer_ids:
+        etags.bump_customer_versions(customer_ids)
+
+
+def bump_etag_all_customer_versions(sender, instance, **kwargs):
+    """ Invalidate ETags of all customers on change of the instance shared by them """
+    etags.bump_all_customer_versions()
+
+
+def bump_etag_user_version(sender, structure, user, role, **kwargs):
+    """ Invalidate ETags of user whose set of visible customers is changed by role grant or revoke """
+    etags.bump_user_version(user)
+    etags.bump_customer_versions(etags.get_customer_ids(structure))
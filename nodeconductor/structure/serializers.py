@@ -2,12 +2,12 @@ from __future__ import unicode_literals
 
 from django.core.validators import RegexValidator
 from django.contrib import auth
-from django.db import models as django_models
+from django.db import connections, models as django_models
 from rest_framework import serializers
 
 from nodeconductor.core import serializers as core_serializers, utils as core_utils
 from nodeconductor.core.fields import MappedChoiceField
-from nodeconductor.quotas import serializers as quotas_serializers
+from nodeconductor.quotas import serializers as quotas_serializers, utils as quotas_utils
 from nodeconductor.structure import models, filters
 from nodeconductor.structure.filters import filter_queryset_for_user
 
@@ -122,17 +122,28 @@ class ProjectSerializer(PermissionFieldFilteringMixin,
 
         return project
 
+    def _get_resource_quotas(self, obj):
+        # Quotas of all the projects being serialized are loaded with one query
+        loader = getattr(self, '_quota_loader', None)
+        if loader is None or obj.pk not in self._quota_scope_ids:
+            scopes = [obj]
+            if isinstance(self.parent, serializers.ListSerializer) and self.parent.instance is not None:
+                scopes = self.parent.instance
+                if isinstance(scopes, django_models.Manager):
+                    scopes = scopes.all()
+                scopes = list(scopes)
+            self._quota_scope_ids = set(scope.pk for scope in scopes)
+            if obj.pk not in self._quota_scope_ids:
+                scopes, self._quota_scope_ids = [obj], {obj.pk}
+            loader = self._quota_loader = quotas_utils.QuotaLoader(
+                scopes, ['ram', 'storage', 'max_instances', 'vcpu'], fields=['limit', 'usage'])
+        return loader.get_quotas().get(obj.pk, {})
+
     def get_resource_quotas(self, obj):
-        return models.Project.get_sum_of_quotas_as_dict(
-            [obj], ['ram', 'storage', 'max_instances', 'vcpu'], fields=['limit'])
+        return {name: quota['limit'] for name, quota in self._get_resource_quotas(obj).items()}
 
     def get_resource_quotas_usage(self, obj):
-        quota_values = models.Project.get_sum_of_quotas_as_dict(
-            [obj], ['ram', 'storage', 'max_instances', 'vcpu'], fields=['usage'])
-        # No need for '_usage' suffix in quotas names
-        return {
-            key[:-6]: value for key, value in quota_values.iteritems()
-        }
+        return {name: quota['usage'] for name, quota in self._get_resource_quotas(obj).items()}
 
     def get_filtered_field_names(self):
         return 'customer',
@@ -142,7 +153,7 @@ class CustomerSerializer(core_serializers.AugmentedSerializerMixin,
                          serializers.HyperlinkedModelSerializer):
     projects = serializers.SerializerMethodField()
     project_groups = serializers.SerializerMethodField()
-    owners = BasicUserSerializer(source='get_owners', many=True, read_only=True)
+    owners = serializers.SerializerMethodField()
 
     class Meta(object):
         model = models.Customer
@@ -157,14 +168,39 @@ class CustomerSerializer(core_serializers.AugmentedSerializerMixin,
             'url': {'lookup_field': 'uuid'},
         }
 
+    def _get_visible_ids(self, model, user):
+        """
+        Return ids of objects visible to user, calculated once per serializer.
+
+        The same serializer instance is used for all customers of a page,
+        thus permission-filtered query is executed once per request.
+        """
+        try:
+            visible_ids = self._visible_ids
+        except AttributeError:
+            visible_ids = self._visible_ids = {}
+
+        if model not in visible_ids:
+            queryset = filter_queryset_for_user(model.objects.all(), user)
+            visible_ids[model] = set(queryset.values_list('pk', flat=True))
+
+        return visible_ids[model]
+
     def _get_filtered_data(self, objects, serializer):
         try:
             user = self.context['request'].user
         except (KeyError, AttributeError):
             return None
 
-        queryset = filter_queryset_for_user(objects, user)
-        serializer_instance = serializer(queryset, many=True, context=self.context)
+        # Objects are expected to be prefetched, so filter them in memory.
+        # Queryset is not passed to serializer as it would be cloned and queried again.
+        if user.is_staff:
+            objects = list(objects)
+        else:
+            visible_ids = self._get_visible_ids(objects.model, user)
+            objects = [obj for obj in objects if obj.pk in visible_ids]
+
+        serializer_instance = serializer(objects, many=True, context=self.context)
         return serializer_instance.data
 
     def get_projects(self, obj):
@@ -173,6 +209,16 @@ class CustomerSerializer(core_serializers.AugmentedSerializerMixin,
     def get_project_groups(self, obj):
         return self._get_filtered_data(obj.project_groups.all(), BasicProjectGroupSerializer)
 
+    def get_owners(self, obj):
+        # Same as obj.get_owners(), but makes use of prefetched roles
+        owners = [
+            user
+            for role in obj.roles.all() if role.role_type == models.CustomerRole.OWNER
+            for user in role.permission_group.user_set.all()
+        ]
+        serializer_instance = BasicUserSerializer(owners, many=True, context=self.context)
+        return serializer_instance.data
+
 
 class ProjectGroupSerializer(PermissionFieldFilteringMixin,
                              core_serializers.AugmentedSerializerMixin,
@@ -513,6 +559,15 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
 class CreationTimeStatsSerializer(serializers.Serializer):
     MODEL_NAME_CHOICES = (('project', 'project'), ('customer', 'customer'), ('project_group', 'project_group'))
     MODEL_CLASSES = {'project': models.Project, 'customer': models.Customer, 'project_group': models.ProjectGroup}
+    # Segment index of creation time per database vendor. MySQL and SQLite store UTC time without zone,
+    # it is converted to seconds since epoch independently of the time zone of connection.
+    SEGMENT_SQL = {
+        'postgresql': ('FLOOR((EXTRACT(EPOCH FROM {column}) - {start}) / {step})', ()),
+        'mysql': ("FLOOR((TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', {column}) - {start}) / {step})", ()),
+        # Integer division, creation time is not earlier than start. Format is passed as a parameter,
+        # as it would be taken for a placeholder otherwise.
+        'sqlite': ('(CAST(STRFTIME(%s, {column}) AS INTEGER) - {start}) / {step}', ('%s',)),
+    }
 
     model_name = serializers.ChoiceField(choices=MODEL_NAME_CHOICES)
     start_timestamp = serializers.IntegerField(min_value=0)
@@ -520,23 +575,68 @@ class CreationTimeStatsSerializer(serializers.Serializer):
     segments_count = serializers.IntegerField(min_value=0)
 
     def get_stats(self, user):
-        start_datetime = core_utils.timestamp_to_datetime(self.data['start_timestamp'])
-        end_datetime = core_utils.timestamp_to_datetime(self.data['end_timestamp'])
-
-        model = self.MODEL_CLASSES[self.data['model_name']]
-        filtered_queryset = filters.filter_queryset_for_user(model.objects.all(), user)
-        created_datetimes = (
-            filtered_queryset
-            .filter(created__gte=start_datetime, created__lte=end_datetime)
+        start_timestamp = self.data['start_timestamp']
+        end_timestamp = self.data['end_timestamp']
+        segments_count = self.data['segments_count']
+        time_step = (end_timestamp - start_timestamp) // segments_count if segments_count else 0
+
+        segment_values = [0] * segments_count
+        if time_step:
+            model = self.MODEL_CLASSES[self.data['model_name']]
+            filtered_queryset = filters.filter_queryset_for_user(model.objects.all(), user)
+            # the last segment ends before end_timestamp if interval is not divisible by segments count
+            filtered_queryset = filtered_queryset.filter(
+                created__gte=core_utils.timestamp_to_datetime(start_timestamp),
+                created__lt=core_utils.timestamp_to_datetime(start_timestamp + time_step * segments_count),
+            )
+
+            for segment, count in self._count_by_segments(filtered_queryset, start_timestamp, time_step):
+                if 0 <= segment < segments_count:
+                    segment_values[segment] += count
+
+        return [
+            {
+                'from': start_timestamp + time_step * index,
+                'to': start_timestamp + time_step * (index + 1),
+                'value': value,
+            }
+            for index, value in enumerate(segment_values)
+        ]
+
+    def _count_by_segments(self, queryset, start_timestamp, time_step):
+        """
+        Return pairs of segment index and number of objects created within the segment.
+        """
+        connection = connections[queryset.db]
+        if connection.vendor in self.SEGMENT_SQL:
+            segment_sql, segment_params = self.SEGMENT_SQL[connection.vendor]
+            # Timestamps are validated integers, so they are safe to be inlined
+            segment_sql = segment_sql.format(
+                column='%s.%s' % (
+                    connection.ops.quote_name(queryset.model._meta.db_table),
+                    connection.ops.quote_name('created'),
+                ),
+                start=start_timestamp,
+                step=time_step,
+            )
+            rows = (
+                queryset
+                .extra(select={'segment': segment_sql}, select_params=segment_params)
+                .values('segment')
+                .annotate(count=django_models.Count('id', distinct=True))
+                .order_by())
+            return [(int(row['segment']), row['count']) for row in rows]
+
+        # Portable fallback: group by creation time in database and compute segments in one pass
+        rows = (
+            queryset
             .values('created')
-            .annotate(count=django_models.Count('id', distinct=True)))
-
-        time_and_value_list = [
-            (core_utils.datetime_to_timestamp(dt['created']), dt['count']) for dt in created_datetimes]
-
-        return core_utils.format_time_and_value_to_segment_list(
-            time_and_value_list, self.data['segments_count'],
-            self.data['start_timestamp'], self.data['end_timestamp'])
+            .annotate(count=django_models.Count('id', distinct=True))
+            .order_by())
+        return [
+            ((core_utils.datetime_to_timestamp(row['created']) - start_timestamp) // time_step, row['count'])
+            for row in rows
+        ]
 
 
 class PasswordSerializer(serializers.Serializer):
@@ -3,11 +3,14 @@ from __future__ import unicode_literals
 from unittest import TestCase
 
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from mock_django import mock_signal_receiver
 from rest_framework import status
 from rest_framework import test
 
+from nodeconductor.iaas.tests import factories as iaas_factories
 from nodeconductor.structure import signals
 from nodeconductor.structure.models import Customer
 from nodeconductor.structure.models import CustomerRole
@@ -533,6 +536,27 @@ class CustomerListTest(test.APITransactionTestCase):
             response.data[0]['project_groups'][0]['uuid'], self.project_group.uuid.hex,
             'Customer list response should contain related project groups uuid')
 
+    def test_number_of_queries_does_not_depend_on_number_of_customers(self):
+        owner = factories.UserFactory()
+        self.customer.add_user(owner, CustomerRole.OWNER)
+
+        for user in self.staff, owner:
+            with CaptureQueriesContext(connection) as initial_queries:
+                self.get_list_response(user)
+
+            for customer in factories.CustomerFactory.create_batch(3):
+                customer.add_user(owner, CustomerRole.OWNER)
+                factories.ProjectFactory(customer=customer)
+                factories.ProjectGroupFactory(customer=customer)
+                iaas_factories.CloudFactory(customer=customer)
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.get_list_response(user)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(any(customer['clouds'] for customer in response.data))
+            self.assertEqual(len(queries), len(initial_queries))
+
 
 class CustomerQuotasTest(test.APITransactionTestCase):
 
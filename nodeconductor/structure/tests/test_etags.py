@@ -0,0 +1,200 @@
+from __future__ import unicode_literals
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework import test
+import mock
+
+from nodeconductor.backup.tests import factories as backup_factories
+from nodeconductor.iaas.tests import factories as iaas_factories
+from nodeconductor.structure.models import ProjectRole
+from nodeconductor.structure.tests import factories
+
+
+class FakeRedis(object):
+    """ Redis client shared by all processes, commands used by ETag versions only """
+
+    def __init__(self):
+        self.data = {}
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def mset(self, mapping):
+        self.data.update(mapping)
+        return True
+
+
+class ProjectListETagTest(test.APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+        patcher = mock.patch('nodeconductor.structure.etags.get_redis', return_value=FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = factories.UserFactory()
+        self.project = factories.ProjectFactory()
+        self.project.add_user(self.user, ProjectRole.ADMINISTRATOR)
+
+        self.client.force_authenticate(self.user)
+
+    def get_list(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(factories.ProjectFactory.get_list_url(), **headers)
+
+    def test_list_is_not_modified_if_etag_matches(self):
+        etag = self.get_list()['ETag']
+
+        response = self.get_list(etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_is_modified_after_project_update(self):
+        etag = self.get_list()['ETag']
+
+        self.project.name = 'New project name'
+        self.project.save()
+        response = self.get_list(etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data[0]['name'], 'New project name')
+
+    def test_list_is_modified_after_quota_limit_update(self):
+        etag = self.get_list()['ETag']
+
+        self.project.set_quota_limit('vcpu', 10)
+        response = self.get_list(etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_is_modified_after_role_grant(self):
+        etag = self.get_list()['ETag']
+
+        factories.ProjectFactory().add_user(self.user, ProjectRole.MANAGER)
+        response = self.get_list(etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+    def test_list_is_not_modified_after_update_of_invisible_project(self):
+        etag = self.get_list()['ETag']
+
+        other_project = factories.ProjectFactory()
+        other_project.name = 'New project name'
+        other_project.save()
+
+        self.assertEqual(self.get_list(etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_is_not_modified_after_save_of_model_not_listed_by_etagged_endpoints(self):
+        etag = self.get_list()['ETag']
+
+        flavor = iaas_factories.FlavorFactory()
+        flavor.name = 'New flavor name'
+        flavor.save()
+
+        self.assertEqual(self.get_list(etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_polled_before_commit_of_update_is_modified_after_commit(self):
+        etag = self.get_list()['ETag']
+
+        with transaction.atomic():
+            self.project.name = 'New project name'
+            self.project.save()
+            # poll of other process sees old data until commit, ETag has to stay the same
+            self.assertEqual(self.get_list(etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.assertEqual(self.get_list(etag).status_code, status.HTTP_200_OK)
+
+    def test_list_is_not_modified_after_rolled_back_update(self):
+        etag = self.get_list()['ETag']
+
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                self.project.name = 'New project name'
+                self.project.save()
+                raise ValueError
+
+        self.assertEqual(self.get_list(etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_is_modified_after_update_of_project_cloud(self):
+        cloud = iaas_factories.CloudFactory(customer=self.project.customer)
+        iaas_factories.CloudProjectMembershipFactory(cloud=cloud, project=self.project)
+        etag = self.get_list()['ETag']
+
+        cloud.name = 'New cloud name'
+        cloud.save()
+
+        self.assertEqual(self.get_list(etag).status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_user(self):
+        etag = self.get_list()['ETag']
+
+        self.client.force_authenticate(factories.UserFactory(is_staff=True))
+
+        self.assertEqual(self.get_list(etag).status_code, status.HTTP_200_OK)
+
+    def test_etag_is_not_issued_without_shared_redis(self):
+        with mock.patch('nodeconductor.structure.etags.get_redis', return_value=None):
+            response = self.get_list()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class InstanceListETagTest(test.APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+        patcher = mock.patch('nodeconductor.structure.etags.get_redis', return_value=FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = factories.UserFactory()
+        self.instance = iaas_factories.InstanceFactory()
+        self.instance.cloud_project_membership.project.add_user(self.user, ProjectRole.ADMINISTRATOR)
+
+        self.client.force_authenticate(self.user)
+
+    def get_list(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(iaas_factories.InstanceFactory.get_list_url(), **headers)
+
+    def test_list_is_modified_after_template_update(self):
+        etag = self.get_list()['ETag']
+
+        self.instance.template.name = 'New template name'
+        self.instance.template.save()
+        response = self.get_list(etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['template_name'], 'New template name')
+
+    def test_list_is_modified_after_backup_creation(self):
+        etag = self.get_list()['ETag']
+
+        backup_factories.BackupFactory(backup_source=self.instance)
+        response = self.get_list(etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data[0]['backups']), 1)
+
+    def test_list_is_modified_after_backup_schedule_deletion(self):
+        schedule = backup_factories.BackupScheduleFactory(backup_source=self.instance)
+        etag = self.get_list()['ETag']
+
+        schedule.delete()
+        response = self.get_list(etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['backup_schedules'], [])
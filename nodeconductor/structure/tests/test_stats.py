@@ -5,6 +5,7 @@ from datetime import timedelta
 from django.core.urlresolvers import reverse
 from django.utils import timezone
 from rest_framework import test, status
+import mock
 
 # This test contains dependencies from iaas and backup app,
 # but it will be moved to separate app 'stats' in future, so this is ok
@@ -111,3 +112,31 @@ class CreationTimeStatsTest(test.APITransactionTestCase):
         self.assertEqual(len(response.data), 2, 'Response has to contain 2 datapoints')
         self.assertEqual(response.data[0]['value'], 0, 'First datapoint has to contain 0 project_groups')
         self.assertEqual(response.data[1]['value'], 0, 'Second datapoint has to contain 0 project_groups')
+
+    def test_objects_created_on_segment_bounds_are_counted_in_following_segment(self):
+        start = core_utils.datetime_to_timestamp(timezone.now() - timedelta(days=100))
+        step = 60 * 60 * 24 * 10
+        for index in range(3):
+            factories.CustomerFactory(created=core_utils.timestamp_to_datetime(start + step * index))
+        # customer created exactly at the end of interval is not counted
+        factories.CustomerFactory(created=core_utils.timestamp_to_datetime(start + step * 3))
+
+        data = {'from': start, 'to': start + step * 3, 'datapoints': 3, 'type': 'customer'}
+        response = self.execute_request_with_data(self.staff, data)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([segment['value'] for segment in response.data], [1, 1, 1])
+        self.assertEqual([segment['from'] for segment in response.data], [start, start + step, start + step * 2])
+
+    @mock.patch('nodeconductor.structure.serializers.CreationTimeStatsSerializer.SEGMENT_SQL', {})
+    def test_objects_are_counted_in_segments_on_unknown_database(self):
+        start = core_utils.datetime_to_timestamp(timezone.now() - timedelta(days=100))
+        step = 60 * 60 * 24 * 10
+        for index in range(3):
+            factories.CustomerFactory(created=core_utils.timestamp_to_datetime(start + step * index))
+
+        data = {'from': start, 'to': start + step * 3, 'datapoints': 3, 'type': 'customer'}
+        response = self.execute_request_with_data(self.staff, data)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([segment['value'] for segment in response.data], [1, 1, 1])
@@ -19,6 +19,7 @@ from rest_framework.response import Response
 from nodeconductor.core import filters as core_filters
 from nodeconductor.core.log import EventLoggerAdapter
 from nodeconductor.quotas import views as quotas_views
+from nodeconductor.structure import etags
 from nodeconductor.structure import filters
 from nodeconductor.structure import permissions
 from nodeconductor.structure import models
@@ -80,6 +81,19 @@ class CustomerViewSet(viewsets.ModelViewSet):
     filter_backends = (filters.GenericRoleFilter, rf_filters.DjangoFilterBackend,)
     filter_class = CustomerFilter
 
+    def get_queryset(self):
+        queryset = super(CustomerViewSet, self).get_queryset()
+        # Related objects are filtered by user permissions in serializer
+        queryset = queryset.prefetch_related(
+            'projects',
+            'project_groups',
+            'roles__permission_group__user_set',
+        )
+        # Clouds are contributed to serializer by iaas application if it is installed
+        if hasattr(models.Customer, 'clouds'):
+            queryset = queryset.prefetch_related('clouds')
+        return queryset
+
 
 class ProjectFilter(quotas_views.QuotaFilterMixin, django_filters.FilterSet):
     customer = django_filters.CharFilter(
@@ -171,7 +185,7 @@ class ProjectFilter(quotas_views.QuotaFilterMixin, django_filters.FilterSet):
         }
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(etags.ConditionalListMixin, viewsets.ModelViewSet):
     """List of projects that are accessible by this user.
 
     http://nodeconductor.readthedocs.org/en/latest/api/api.html#project-management
@@ -0,0 +1,420 @@
+from __future__ import unicode_literals
+
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from nodeconductor.core.models import SynchronizationStates, User
+from nodeconductor.iaas import handlers as iaas_handlers
+from nodeconductor.iaas.models import (
+    Cloud, CloudProjectMembership, Flavor, Image, Instance, InstanceSecurityGroup, InstanceSlaHistory,
+    SecurityGroup, SecurityGroupRule, Template)
+from nodeconductor.quotas.models import Quota
+from nodeconductor.structure import etags
+from nodeconductor.structure.models import (
+    Customer, CustomerRole, Project, ProjectRole, ProjectGroup, ProjectGroupRole)
+
+
+# Credentials known to the dummy OpenStack deployment, see nodeconductor.iaas.backend.dummy
+DUMMY_AUTH_URL = 'http://keystone.example.com:5000/v2.0'
+
+FLAVORS = (
+    {'name': 'm1.small', 'cores': 1, 'ram': 2048, 'disk': 20 * 1024},
+    {'name': 'm1.medium', 'cores': 2, 'ram': 4096, 'disk': 40 * 1024},
+)
+
+TEMPLATES = (
+    {'name': 'Bulk CentOS 7 64-bit', 'os': 'CentOS 7', 'sla_level': Decimal('99.9')},
+    {'name': 'Bulk Ubuntu 14.04 64-bit', 'os': 'Ubuntu 14.04', 'sla_level': Decimal('99.5')},
+)
+
+
+def _random_ip(prefix):
+    return '%s.%s' % (prefix, '.'.join('%s' % random.randint(0, 255) for _ in range(3)))
+
+
+class BulkDataGenerator(object):
+    """
+    Generate large data set with bulk_create().
+
+    Model signals are not sent by bulk_create(), so their side effects are replayed in bulk:
+    permission groups and roles of customers, projects and project groups, auth tokens of users,
+    quotas with usage consistent with created objects and default security groups of cloud memberships.
+    Event logging and Zabbix host groups are not replayed.
+
+    Data is created in chunks of customers, so memory consumption doesn't depend on scale.
+    """
+
+    def __init__(self, projects_per_customer=10, instances_per_project=10,
+                 chunk_size=100, batch_size=1000, sla_months=3, stdout=None):
+        self.projects_per_customer = projects_per_customer
+        self.instances_per_project = instances_per_project
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.sla_months = sla_months
+        self.stdout = stdout
+
+        # Unique suffix of customer names, so that generator can be run multiple times
+        self.run_id = uuid.uuid4().hex[:8]
+        self.password = make_password(None)
+        self.content_types = {
+            model: ContentType.objects.get_for_model(model)
+            for model in (Customer, Project, CloudProjectMembership)
+        }
+
+    def write(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def generate(self, customers):
+        self.templates = self.create_templates()
+
+        for offset in range(0, customers, self.chunk_size):
+            count = min(self.chunk_size, customers - offset)
+            self.write('Creating customers %s-%s of %s...' % (offset + 1, offset + count, customers))
+            created_customers = self.create_chunk(offset, count)
+            etags.bump_customer_versions([customer.pk for customer in created_customers])
+
+    def create_templates(self):
+        templates = []
+        for params in TEMPLATES:
+            params = params.copy()
+            template, _ = Template.objects.get_or_create(
+                name=params.pop('name'), defaults=dict(is_active=True, **params))
+            templates.append(template)
+        return templates
+
+    # Helpers
+
+    def bulk_create(self, model, objects, lookup_field='uuid'):
+        """
+        Create objects and return them reloaded from database, so that primary keys are set.
+        Objects are found by unique lookup field which has to be set before creation.
+        """
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+        values = [getattr(obj, lookup_field) for obj in objects]
+        created = []
+        for start in range(0, len(values), self.batch_size):
+            lookup = {'%s__in' % lookup_field: values[start:start + self.batch_size]}
+            created.extend(model.objects.filter(**lookup))
+
+        order = {self._normalize(value): index for index, value in enumerate(values)}
+        created.sort(key=lambda obj: order[self._normalize(getattr(obj, lookup_field))])
+        return created
+
+    @staticmethod
+    def _normalize(value):
+        # UUIDField returns StringUUID instances which are equal to the hex strings they were created from
+        return getattr(value, 'hex', value)
+
+    def create_roles(self, role_model, scope_field, scopes, role_types):
+        """
+        Replay create_<scope>_roles handlers: create permission group and role of every type for every scope.
+        Return dictionary of permission groups keyed by scope pk and role type.
+        """
+        groups = []
+        for scope in scopes:
+            for role_type, group_suffix in role_types:
+                groups.append(Group(name='Role: {0} {1}'.format(scope.uuid, group_suffix)))
+        groups = self.bulk_create(Group, groups, lookup_field='name')
+
+        roles = []
+        permission_groups = {}
+        groups = iter(groups)
+        for scope in scopes:
+            for role_type, _ in role_types:
+                group = next(groups)
+                permission_groups[scope.pk, role_type] = group
+                role = role_model(role_type=role_type, permission_group=group, **{scope_field: scope})
+                if hasattr(role_model, 'uuid'):
+                    role.uuid = uuid.uuid4().hex
+                roles.append(role)
+        role_model.objects.bulk_create(roles, batch_size=self.batch_size)
+
+        return permission_groups
+
+    def create_quotas(self, scopes, get_values):
+        """
+        Replay add_quotas_to_scope handler. Usage and limit of quotas are returned by get_values(scope, name).
+        """
+        quotas = []
+        for scope in scopes:
+            model = scope._meta.model
+            for name in model.QUOTAS_NAMES:
+                usage, limit = get_values(scope, name)
+                quotas.append(Quota(
+                    uuid=uuid.uuid4().hex,
+                    name=name,
+                    content_type=self.content_types[model],
+                    object_id=scope.pk,
+                    usage=usage,
+                    limit=limit,
+                ))
+        Quota.objects.bulk_create(quotas, batch_size=self.batch_size)
+
+    # Chunk
+
+    def create_chunk(self, offset, count):
+        customers = self.bulk_create(Customer, [
+            Customer(
+                uuid=uuid.uuid4().hex,
+                name='Bulk customer %s-%s' % (self.run_id, offset + index),
+                abbreviation='BC%s' % (offset + index),
+                contact_details='Contacts of bulk customer %s' % (offset + index),
+            )
+            for index in range(count)
+        ])
+        customer_groups = self.create_roles(CustomerRole, 'customer', customers, (
+            (CustomerRole.OWNER, 'owner'),
+        ))
+
+        project_groups = self.bulk_create(ProjectGroup, [
+            ProjectGroup(uuid=uuid.uuid4().hex, name='Bulk project group', customer=customer)
+            for customer in customers
+        ])
+        project_group_groups = self.create_roles(ProjectGroupRole, 'project_group', project_groups, (
+            (ProjectGroupRole.MANAGER, 'group mgr'),
+        ))
+
+        projects = self.bulk_create(Project, [
+            Project(uuid=uuid.uuid4().hex, name='Bulk project %s' % index, customer=customer)
+            for customer in customers
+            for index in range(self.projects_per_customer)
+        ])
+        project_groups_by_customer = {group.customer_id: group for group in project_groups}
+        ProjectGroup.projects.through.objects.bulk_create([
+            ProjectGroup.projects.through(
+                projectgroup_id=project_groups_by_customer[project.customer_id].pk, project_id=project.pk)
+            for project in projects
+        ], batch_size=self.batch_size)
+        project_role_groups = self.create_roles(ProjectRole, 'project', projects, (
+            (ProjectRole.ADMINISTRATOR, 'admin'),
+            (ProjectRole.MANAGER, 'mgr'),
+        ))
+
+        users_count = self.create_users(
+            customers, customer_groups, project_groups, project_group_groups, projects, project_role_groups)
+
+        clouds = self.create_clouds(customers)
+        memberships, security_groups = self.create_memberships(clouds, projects)
+        instances = self.create_instances(memberships, security_groups)
+
+        self.create_quotas_of_chunk(customers, projects, memberships, instances, users_count)
+
+        return customers
+
+    def create_users(self, customers, customer_groups, project_groups, project_group_groups,
+                     projects, project_role_groups):
+        """
+        Create owner of every customer, manager of every project group and
+        administrator and manager of every project. Return number of users per customer pk.
+        """
+        memberships = []
+        for customer in customers:
+            memberships.append((customer, customer_groups[customer.pk, CustomerRole.OWNER], 'owner'))
+        for project_group in project_groups:
+            memberships.append((
+                project_group, project_group_groups[project_group.pk, ProjectGroupRole.MANAGER], 'group-manager'))
+        for project in projects:
+            memberships.append((project, project_role_groups[project.pk, ProjectRole.ADMINISTRATOR], 'admin'))
+            memberships.append((project, project_role_groups[project.pk, ProjectRole.MANAGER], 'manager'))
+
+        users = []
+        for scope, _, role in memberships:
+            username = 'bulk%s' % uuid.uuid4().hex[:26]
+            users.append(User(
+                uuid=uuid.uuid4().hex,
+                username=username,
+                email='%s@example.com' % username,
+                full_name='Bulk %s of %s' % (role, scope.name),
+                password=self.password,
+            ))
+        users = self.bulk_create(User, users, lookup_field='username')
+
+        # Replay create_auth_token handler
+        Token.objects.bulk_create([
+            Token(key=Token().generate_key(), user=user) for user in users
+        ], batch_size=self.batch_size)
+
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=user.pk, group_id=group.pk)
+            for user, (_, group, _) in zip(users, memberships)
+        ], batch_size=self.batch_size)
+
+        users_count = {customer.pk: 0 for customer in customers}
+        for scope, _, _ in memberships:
+            users_count[getattr(scope, 'customer_id', scope.pk)] += 1
+        return users_count
+
+    def create_clouds(self, customers):
+        clouds = self.bulk_create(Cloud, [
+            Cloud(
+                uuid=uuid.uuid4().hex,
+                name='Bulk cloud of %s' % customer.name,
+                customer=customer,
+                auth_url=DUMMY_AUTH_URL,
+                dummy=True,
+                state=SynchronizationStates.IN_SYNC,
+            )
+            for customer in customers
+        ])
+
+        Flavor.objects.bulk_create([
+            Flavor(uuid=uuid.uuid4().hex, cloud=cloud, backend_id=str(index + 1), **params)
+            for cloud in clouds
+            for index, params in enumerate(FLAVORS)
+        ], batch_size=self.batch_size)
+
+        Image.objects.bulk_create([
+            Image(cloud=cloud, template=template, backend_id=uuid.uuid4().hex)
+            for cloud in clouds
+            for template in self.templates
+        ], batch_size=self.batch_size)
+
+        return clouds
+
+    def create_memberships(self, clouds, projects):
+        """
+        Connect every project to cloud of its customer.
+        Return memberships and dictionary of their first security groups keyed by membership pk.
+        """
+        clouds_by_customer = {cloud.customer_id: cloud for cloud in clouds}
+
+        memberships = self.bulk_create(CloudProjectMembership, [
+            CloudProjectMembership(
+                cloud=clouds_by_customer[project.customer_id],
+                project=project,
+                tenant_id=uuid.uuid4().hex,
+                state=SynchronizationStates.IN_SYNC,
+            )
+            for project in projects
+        ], lookup_field='tenant_id')
+
+        # Replay create_initial_security_groups handler
+        default_groups = iaas_handlers._get_default_security_groups()
+        security_groups = self.bulk_create(SecurityGroup, [
+            SecurityGroup(
+                uuid=uuid.uuid4().hex,
+                name=group['name'],
+                description=group['description'],
+                cloud_project_membership=membership,
+            )
+            for membership in memberships
+            for group in default_groups
+        ])
+
+        rules = []
+        first_security_groups = {}
+        security_groups = iter(security_groups)
+        for membership in memberships:
+            for group in default_groups:
+                security_group = next(security_groups)
+                first_security_groups.setdefault(membership.pk, security_group)
+                rules.extend(SecurityGroupRule(group=security_group, **rule) for rule in group['rules'])
+        SecurityGroupRule.objects.bulk_create(rules, batch_size=self.batch_size)
+
+        return memberships, first_security_groups
+
+    def create_instances(self, memberships, security_groups):
+        now = timezone.now()
+
+        instances = []
+        for membership in memberships:
+            for index in range(self.instances_per_project):
+                template = self.templates[index % len(self.templates)]
+                flavor = FLAVORS[index % len(FLAVORS)]
+                instances.append(Instance(
+                    uuid=uuid.uuid4().hex,
+                    name='bulk-instance-%s' % index,
+                    template=template,
+                    cloud_project_membership=membership,
+                    state=Instance.States.ONLINE,
+                    start_time=now - timedelta(days=random.randint(0, 365)),
+                    external_ips=_random_ip('84'),
+                    internal_ips=_random_ip('10'),
+                    cores=flavor['cores'],
+                    ram=flavor['ram'],
+                    system_volume_size=flavor['disk'],
+                    data_volume_size=20 * 1024,
+                    backend_id=uuid.uuid4().hex,
+                    agreed_sla=template.sla_level,
+                ))
+        instances = self.bulk_create(Instance, instances)
+
+        InstanceSecurityGroup.objects.bulk_create([
+            InstanceSecurityGroup(
+                instance=instance, security_group=security_groups[instance.cloud_project_membership_id])
+            for instance in instances
+            if instance.cloud_project_membership_id in security_groups
+        ], batch_size=self.batch_size)
+
+        periods = []
+        month = now.replace(day=1)
+        for _ in range(self.sla_months):
+            month = (month - timedelta(days=1)).replace(day=1)
+            periods.append('%s-%s' % (month.year, month.month))
+
+        InstanceSlaHistory.objects.bulk_create([
+            InstanceSlaHistory(
+                instance=instance,
+                period=period,
+                value=Decimal(random.randint(9500, 10000)) / 100,
+            )
+            for instance in instances
+            for period in periods
+        ], batch_size=self.batch_size)
+
+        return instances
+
+    def create_quotas_of_chunk(self, customers, projects, memberships, instances, users_count):
+        """
+        Create quotas of customers, projects and memberships with usage matching created objects,
+        as if quota handlers were run and usage was propagated to quota parents.
+        """
+        membership_usage = {}
+        for instance in instances:
+            usage = membership_usage.setdefault(instance.cloud_project_membership_id, {
+                'vcpu': 0, 'ram': 0, 'storage': 0, 'max_instances': 0,
+            })
+            usage['vcpu'] += instance.cores
+            usage['ram'] += instance.ram
+            usage['storage'] += instance.system_volume_size + instance.data_volume_size
+            usage['max_instances'] += 1
+
+        empty_usage = dict.fromkeys(CloudProjectMembership.QUOTAS_NAMES, 0)
+        project_usage = {
+            membership.project_id: membership_usage.get(membership.pk, empty_usage) for membership in memberships
+        }
+
+        def get_membership_values(membership, name):
+            usage = membership_usage.get(membership.pk, empty_usage)[name]
+            return usage, usage * 2 or -1
+
+        def get_project_values(project, name):
+            usage = project_usage[project.pk][name]
+            return usage, -1
+
+        resources_count = {}
+        for project in projects:
+            resources_count[project.customer_id] = \
+                resources_count.get(project.customer_id, 0) + project_usage[project.pk]['max_instances']
+
+        def get_customer_values(customer, name):
+            usage = {
+                'nc_project_count': self.projects_per_customer,
+                'nc_resource_count': resources_count.get(customer.pk, 0),
+                'nc_user_count': users_count[customer.pk],
+            }[name]
+            return usage, -1
+
+        self.create_quotas(customers, get_customer_values)
+        self.create_quotas(projects, get_project_values)
+        self.create_quotas(memberships, get_membership_values)
@@ -5,8 +5,10 @@ from __future__ import unicode_literals
 import random
 import string
 from decimal import Decimal
+from optparse import make_option
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
 from nodeconductor.core.models import User, SshPublicKey
@@ -14,6 +16,7 @@ from nodeconductor.iaas.models import (
     Cloud, CloudProjectMembership, IpMapping, SecurityGroup,
     Template, TemplateLicense, Instance, InstanceSecurityGroup, OpenStackSettings)
 from nodeconductor.structure.models import *
+from nodeconductor.testdata.bulk import BulkDataGenerator
 
 
 def random_string(min_length, max_length=None, alphabet=string.ascii_letters, with_spaces=False):
@@ -39,9 +42,25 @@ class Command(BaseCommand):
 
 Arguments:
   alice                 create sample data: users Alice, Bob, etc.
-  random                create random data (can be used multiple times)"""
+  random                create random data (can be used multiple times)
+
+Use --scale option to generate large data set in bulk instead."""
+
+    option_list = BaseCommand.option_list + (
+        make_option('--scale', type='int', default=None,
+                    help='Generate given number of customers with projects, instances, users, '
+                         'quotas and SLA history in bulk.'),
+        make_option('--projects', type='int', default=10,
+                    help='Number of projects per customer generated with --scale, default is 10.'),
+        make_option('--instances', type='int', default=10,
+                    help='Number of instances per project generated with --scale, default is 10.'),
+    )
 
     def handle(self, *args, **options):
+        if options['scale']:
+            self.add_bulk_data(options['scale'], options['projects'], options['instances'])
+            return
+
         if len(args) < 1:
             self.stdout.write('Missing argument.')
             return
@@ -54,6 +73,15 @@ Arguments:
             else:
                 self.stdout.write('Unknown argument: "%s"' % arg)
 
+    def add_bulk_data(self, customers, projects, instances):
+        self.stdout.write('Generating %s customers with %s projects and %s instances per project in bulk...'
+                          % (customers, projects, instances))
+        generator = BulkDataGenerator(
+            projects_per_customer=projects, instances_per_project=instances, stdout=self.stdout)
+
+        with transaction.atomic():
+            generator.generate(customers)
+
     def add_random_data(self):
         self.stdout.write('Generating random data...')
         customer1, projects1 = self.create_customer()
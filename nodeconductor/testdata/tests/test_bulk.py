@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+import mock
+
+from nodeconductor.iaas.models import CloudProjectMembership, Instance, SecurityGroup
+from nodeconductor.structure.models import Customer, CustomerRole, ProjectRole
+from nodeconductor.testdata.bulk import BulkDataGenerator
+
+
+class BulkDataGeneratorTest(TestCase):
+
+    def setUp(self):
+        # Test settings have no default security groups
+        default_security_groups = [{
+            'name': 'ssh',
+            'description': 'Security group for secure shell access',
+            'rules': [{'protocol': 'tcp', 'cidr': '0.0.0.0/0', 'from_port': 22, 'to_port': 22}],
+        }]
+        with mock.patch('nodeconductor.iaas.handlers._get_default_security_groups',
+                        return_value=default_security_groups):
+            generator = BulkDataGenerator(projects_per_customer=2, instances_per_project=3, chunk_size=2)
+            generator.generate(3)
+
+    def test_objects_are_created_for_every_customer(self):
+        self.assertEqual(Customer.objects.count(), 3)
+        self.assertEqual(CloudProjectMembership.objects.count(), 6)
+        self.assertEqual(Instance.objects.count(), 18)
+
+    def test_roles_are_granted(self):
+        customer = Customer.objects.first()
+        project = customer.projects.first()
+
+        self.assertEqual(customer.roles.get(role_type=CustomerRole.OWNER).permission_group.user_set.count(), 1)
+        self.assertEqual(project.roles.get(role_type=ProjectRole.ADMINISTRATOR).permission_group.user_set.count(), 1)
+
+    def test_quota_usage_matches_created_objects(self):
+        customer = Customer.objects.first()
+        project = customer.projects.first()
+
+        self.assertEqual(customer.quotas.get(name='nc_project_count').usage, 2)
+        self.assertEqual(customer.quotas.get(name='nc_resource_count').usage, 6)
+        self.assertEqual(project.quotas.get(name='max_instances').usage, 3)
+
+    def test_default_security_groups_are_created(self):
+        membership = CloudProjectMembership.objects.first()
+
+        security_group = SecurityGroup.objects.get(cloud_project_membership=membership)
+        self.assertEqual(security_group.name, 'ssh')
+        self.assertEqual(security_group.rules.get().from_port, 22)